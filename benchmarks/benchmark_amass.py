@@ -0,0 +1,106 @@
+import argparse
+import glob
+import multiprocessing
+import os
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+import scipy.io as sio
+from benchmarks.synthetic import create_amass_file
+from common.profiling import get_peak_memory
+from data.prepare_dataset import AMASS_MOVE_FIELDS, extract_amass_moves
+
+LOADERS = ('legacy', 'lazy')
+
+
+def get_flags():
+    """Get command flags.
+
+    :return: flags
+    :rtype: argparse.ArgumentParser
+    """
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--amass',
+                        help='Directory of AMASS .mat files, a synthetic file is created if it isn\'t set.',
+                        default=None)
+    parser.add_argument('--moves',
+                        help='Number of moves of the synthetic file.',
+                        default=20,
+                        type=int)
+    parser.add_argument('--frames',
+                        help='Number of frames of each move of the synthetic file.',
+                        default=2000,
+                        type=int)
+    return parser
+
+
+def legacy_extract_amass_moves(path):
+    """Extraction which was used before the lazy loading (the whole file converted into dicts).
+
+    :param path: path of the Amass file
+    :type path: str
+    :return: list of moves' fields
+    :rtype: list of dict
+    """
+    amass_file = sio.loadmat(path, simplify_cells=True)
+    key = [key for key in amass_file.keys() if key.startswith('Subject')][0]
+    extracted_moves = []
+    for val in amass_file[key]['move']:
+        move = {'id': amass_file[key]['id'], 'subject': amass_file[key]['subject']}
+        move.update({name: val[mat_name] for name, mat_name in AMASS_MOVE_FIELDS.items()})
+        extracted_moves.append(move)
+    return extracted_moves
+
+
+def measure(loader, path):
+    """Extract all moves of the file (runs in a fresh process, so peak RSS isn't shared).
+
+    :param loader: 'legacy' or 'lazy'
+    :type loader: str
+    :param path: path of the Amass file
+    :type path: str
+    :return: seconds, peak RSS in MiB and its increase over the RSS before the extraction in MiB
+    :rtype: tuple
+    """
+    baseline = get_peak_memory()
+    start = time.perf_counter()
+    moves = legacy_extract_amass_moves(path) if loader == 'legacy' else extract_amass_moves(path)
+    for _ in moves:
+        pass
+    seconds = time.perf_counter() - start
+    peak = get_peak_memory()
+    return seconds, peak, peak - baseline
+
+
+def run(amass_paths):
+    """Measure time and peak RSS of the extraction of each file.
+
+    :param amass_paths: paths of Amass files
+    :type amass_paths: list of str
+    :return: {file name: {loader: (seconds, peak RSS, RSS increase)}}
+    :rtype: dict
+    """
+    results = {}
+    context = multiprocessing.get_context('spawn')
+    for path in amass_paths:
+        results[os.path.basename(path)] = {}
+        for loader in LOADERS:
+            with ProcessPoolExecutor(max_workers=1, mp_context=context) as executor:
+                results[os.path.basename(path)][loader] = executor.submit(measure, loader, path).result()
+    return results
+
+
+if __name__ == '__main__':
+    args = get_flags().parse_args()
+    with tempfile.TemporaryDirectory() as temp_dir:
+        if args.amass is None:
+            paths = [os.path.join(temp_dir, 'F_amass_Subject_1.mat')]
+            create_amass_file(paths[0], [args.frames] * args.moves)
+        else:
+            paths = sorted(glob.glob(args.amass + '/*.mat'))
+
+        for name, loaders in run(paths).items():
+            print('{} ({:.1f} MiB)'.format(name, os.path.getsize(os.path.join(args.amass or temp_dir, name)) / 2 ** 20))
+            for loader, (seconds, peak, increase) in loaders.items():
+                print('  {:<8} {:>8.2f} s  peak RSS {:>8.1f} MiB  (+{:.1f} MiB)'.format(loader, seconds, peak, increase))
@@ -0,0 +1,109 @@
+import argparse
+import time
+import cv2
+import numpy as np
+from benchmarks.synthetic import create_skeleton
+from data_player.overlay import QUALITY_MODES, OverlayRenderer
+
+
+def get_flags():
+    """Get command flags.
+
+    :return: flags
+    :rtype: argparse.ArgumentParser
+    """
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--frames',
+                        help='Number of the rendered frames.',
+                        default=500,
+                        type=int)
+    parser.add_argument('--joints',
+                        help='Number of the joints.',
+                        default=52,
+                        type=int)
+    parser.add_argument('--width',
+                        help='Width of the frames.',
+                        default=800,
+                        type=int)
+    parser.add_argument('--height',
+                        help='Height of the frames.',
+                        default=600,
+                        type=int)
+    return parser
+
+
+def legacy_draw(frame, frame_points):
+    """Per joint drawing which was used before the overlay renderer (joints only).
+
+    :param frame: BGR frame
+    :type frame: np.ndarray
+    :param frame_points: joints on the image plane (joints, 2)
+    :type frame_points: np.ndarray
+    :return: frame with joints
+    :rtype: np.ndarray
+    """
+    for idx, val in enumerate(frame_points):
+        frame = cv2.circle(
+            frame,
+            (int(val[0]), int(val[1])),
+            radius=2,
+            color=(124, 252, 0),
+            lineType=cv2.LINE_AA,
+            thickness=-1
+        )
+    return frame
+
+
+def measure_fps(draw, frame, image_points):
+    """Measure frames per second of the drawing.
+
+    :param draw: drawing function (frame, frame points) -> frame
+    :type draw: callable
+    :param frame: frame which is drawn on
+    :type frame: np.ndarray
+    :param image_points: joints (frames, joints, 2)
+    :type image_points: np.ndarray
+    :return: frames per second
+    :rtype: float
+    """
+    start = time.perf_counter()
+    for frame_points in image_points:
+        draw(frame, frame_points)
+    return image_points.shape[0] / (time.perf_counter() - start)
+
+
+def run(frames, joints, width, height):
+    """Measure frames per second of the overlay renderers.
+
+    :param frames: number of the rendered frames
+    :type frames: int
+    :param joints: number of the joints
+    :type joints: int
+    :param width: width of the frames
+    :type width: int
+    :param height: height of the frames
+    :type height: int
+    :return: frames per second of each renderer
+    :rtype: dict
+    """
+    random = np.random.RandomState(0)
+    image_points = np.stack((
+        random.randint(0, width, (frames, joints)),
+        random.randint(0, height, (frames, joints)),
+    ), axis=-1)
+    frame = np.zeros((height, width, 3), dtype=np.uint8)
+    skeleton = create_skeleton(joints)
+
+    results = {'legacy_joints_fps': measure_fps(legacy_draw, frame, image_points)}
+    for quality in QUALITY_MODES:
+        joints_renderer = OverlayRenderer(None, quality)
+        results[quality + '_joints_fps'] = measure_fps(joints_renderer.draw, frame, image_points)
+        renderer = OverlayRenderer(skeleton, quality)
+        results[quality + '_joints_and_bones_fps'] = measure_fps(renderer.draw, frame, image_points)
+    return results
+
+
+if __name__ == '__main__':
+    args = get_flags().parse_args()
+    for name, fps in run(args.frames, args.joints, args.width, args.height).items():
+        print('{:<28} {:>10.1f} frames/s'.format(name, fps))
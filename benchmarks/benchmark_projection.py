@@ -0,0 +1,139 @@
+import argparse
+import time
+import numpy as np
+from common import projection
+from common.camera import Camera
+from benchmarks.synthetic import create_camera
+
+
+def get_flags():
+    """Get command flags.
+
+    :return: flags
+    :rtype: argparse.ArgumentParser
+    """
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--frames',
+                        help='Number of the video frames.',
+                        default=10000,
+                        type=int)
+    parser.add_argument('--joints',
+                        help='Number of the joints.',
+                        default=52,
+                        type=int)
+    parser.add_argument('--cameras',
+                        help='Number of the cameras.',
+                        default=2,
+                        type=int)
+    parser.add_argument('--repeats',
+                        help='How many times each implementation is run.',
+                        default=3,
+                        type=int)
+    return parser
+
+
+def legacy_convert_world_points_to_image_points(camera, world_points):
+    """Per point projection loop which was used before the batched projection.
+
+    :param camera: camera's params
+    :type camera: Camera
+    :param world_points: World points (size, 3)
+    :type world_points: numpy.ndarray
+    :return: image plane points (size, 2)
+    :rtype: numpy.ndarray of ints
+    """
+    translation_vector_expand = np.expand_dims(camera.translation_vector, axis=0)
+    rot_tran_matrix = np.concatenate((camera.rotation_matrix, translation_vector_expand), axis=0)
+    camera_matrix = np.dot(rot_tran_matrix, camera.intrinsic_matrix)
+    image_points = np.zeros((world_points.shape[0], 2), dtype=int)
+
+    for idx, val in enumerate(world_points):
+        temp_matrix = np.append(val, 1)
+        result = np.dot(temp_matrix, camera_matrix)
+        u = result[0] / result[2]
+        v = result[1] / result[2]
+        image_points[idx, :] = [u, v]
+
+    return image_points
+
+
+def legacy_project(markers, camera):
+    """Per joint, per point projection which was used before the batched projection.
+
+    :param markers: world points (frames, joints, 3)
+    :type markers: numpy.ndarray
+    :param camera: camera's params
+    :type camera: Camera
+    :return: image plane points (frames, joints, 2)
+    :rtype: numpy.ndarray
+    """
+    image_points = np.full((markers.shape[0], markers.shape[1], 2), 0, dtype=int)
+    for i in range(0, markers.shape[1]):
+        world_points = np.squeeze(markers[:, i, :])
+        image_points[:, i] = legacy_convert_world_points_to_image_points(camera, world_points)
+    return image_points
+
+
+def measure(function, repeats):
+    """Measure the best run time of the function.
+
+    :param function: function without arguments
+    :type function: callable
+    :param repeats: number of runs
+    :type repeats: int
+    :return: best time in seconds and the result of the last run
+    :rtype: tuple
+    """
+    best_time = float('inf')
+    result = None
+    for _ in range(repeats):
+        start = time.perf_counter()
+        result = function()
+        best_time = min(best_time, time.perf_counter() - start)
+    return best_time, result
+
+
+def run(frames, joints, cameras_num, repeats):
+    """Compare the per point loop with the batched projection.
+
+    :param frames: number of the video frames
+    :type frames: int
+    :param joints: number of the joints
+    :type joints: int
+    :param cameras_num: number of the cameras
+    :type cameras_num: int
+    :param repeats: number of runs
+    :type repeats: int
+    :return: timings in seconds
+    :rtype: dict
+    """
+    random = np.random.RandomState(0)
+    markers = random.uniform(-1000, 1000, (frames, joints, 3))
+    cameras = [create_camera(seed) for seed in range(cameras_num)]
+
+    legacy_time, legacy_points = measure(
+        lambda: [legacy_project(markers, camera) for camera in cameras],
+        repeats
+    )
+    batched_time, batched_points = measure(
+        lambda: projection.project_points(markers, cameras, dtype=int),
+        repeats
+    )
+    max_difference = np.max(np.abs(np.stack(legacy_points) - batched_points))
+    assert max_difference <= 1, 'Batched projection differs from the loop.'
+
+    return {
+        'points': frames * joints * cameras_num,
+        'legacy_seconds': legacy_time,
+        'batched_seconds': batched_time,
+        'speedup': legacy_time / batched_time,
+    }
+
+
+if __name__ == '__main__':
+    args = get_flags().parse_args()
+    results = run(args.frames, args.joints, args.cameras, args.repeats)
+    print('Projected points: {}'.format(results['points']))
+    print('Per point loop:   {:.4f} s'.format(results['legacy_seconds']))
+    print('Batched:          {:.4f} s'.format(results['batched_seconds']))
+    print('Speedup:          {:.1f}x'.format(results['speedup']))
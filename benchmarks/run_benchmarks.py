@@ -0,0 +1,299 @@
+import os
+import json
+import time
+import shutil
+import argparse
+import platform
+import tempfile
+import subprocess
+import numpy as np
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.figure import Figure
+from common import utils
+from common.camera import CompactCamera
+from common.motion_capture import MotionCapture
+from benchmarks import synthetic
+from data.prepare_dataset import split_amass_file, split_video
+from data_player.overlay import QUALITY_MODES, OverlayRenderer
+from data_player.visualizer.pose_3d_visualizer import Pose3DVisualizer
+
+DEFAULT_RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'results')
+
+
+def get_flags():
+    """Get command flags.
+
+    :return: flags
+    :rtype: argparse.ArgumentParser
+    """
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--seconds',
+                        help='Duration of the projected motion capture sequence.',
+                        default=600,
+                        type=int)
+    parser.add_argument('--moves',
+                        help='Number of moves of the synthetic subject.',
+                        default=4,
+                        type=int)
+    parser.add_argument('--move_seconds',
+                        help='Duration of each move of the synthetic subject.',
+                        default=20,
+                        type=int)
+    parser.add_argument('--cameras',
+                        help='Number of the synthetic cameras.',
+                        default=2,
+                        type=int)
+    parser.add_argument('--width',
+                        help='Width of the synthetic videos.',
+                        default=400,
+                        type=int)
+    parser.add_argument('--height',
+                        help='Height of the synthetic videos.',
+                        default=300,
+                        type=int)
+    parser.add_argument('--repeats',
+                        help='How many times each benchmark is run (the best time is reported).',
+                        default=3,
+                        type=int)
+    parser.add_argument('--output',
+                        help='Path to the JSON file of the results (benchmarks/results/<time>.json by default).',
+                        type=str)
+    parser.add_argument('--compare',
+                        help='Path to the JSON file of previous results, which are compared with these ones.',
+                        type=str)
+    return parser
+
+
+def measure(function, repeats, setup=None):
+    """Measure the best run time of the function.
+
+    :param function: function without arguments
+    :type function: callable
+    :param repeats: number of runs
+    :type repeats: int
+    :param setup: function without arguments which is run (and not measured) before every run, optional
+    :type setup: callable
+    :return: best time in seconds
+    :rtype: float
+    """
+    best_time = float('inf')
+    for _ in range(repeats):
+        if setup is not None:
+            setup()
+        start = time.perf_counter()
+        function()
+        best_time = min(best_time, time.perf_counter() - start)
+    return best_time
+
+
+def blit_pose_3d_frames(motion_capture):
+    """Draw every frame of the 3D pose as blitting does (only the animated artists), off screen.
+
+    :param motion_capture: motion capture data
+    :type motion_capture: MotionCapture
+    :return: number of drawn frames
+    :rtype: int
+    """
+    fig = Figure()
+    FigureCanvasAgg(fig)
+    ax = fig.add_subplot(projection='3d')
+    visualizer = Pose3DVisualizer(fig, ax, motion_capture, show_fps=False)
+    visualizer.init()
+    fig.canvas.draw()
+
+    frames_num = visualizer.joints.shape[0]
+    for frame in range(frames_num):
+        for artist in visualizer.update(frame):
+            ax.draw_artist(artist)
+        assert len(visualizer.bones.get_segments()) > 0, 'Bones of frame {} weren\'t drawn.'.format(frame)
+    return frames_num
+
+
+def get_environment():
+    """Get versions of the environment, so results of different machines aren't mixed up.
+
+    :return: environment
+    :rtype: dict
+    """
+    try:
+        commit = subprocess.run(
+            ['git', 'rev-parse', 'HEAD'],
+            cwd=os.path.dirname(os.path.abspath(__file__)),
+            stdout=subprocess.PIPE,
+            stderr=subprocess.DEVNULL,
+            check=True
+        ).stdout.decode().strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+
+    import cv2
+    import scipy
+    return {
+        'commit': commit,
+        'machine': platform.machine(),
+        'processor': platform.processor(),
+        'cpus': os.cpu_count(),
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'scipy': scipy.__version__,
+        'opencv': cv2.__version__,
+    }
+
+
+def run(data_path, seconds, moves_num, move_seconds, cameras_num, size, repeats):
+    """Time the hot paths on synthetic MoVi-shaped data.
+
+    :param data_path: path of a temporary directory for the synthetic dataset and outputs
+    :type data_path: str
+    :param seconds: duration of the projected motion capture sequence
+    :type seconds: int
+    :param moves_num: number of moves of the synthetic subject
+    :type moves_num: int
+    :param move_seconds: duration of each move
+    :type move_seconds: int
+    :param cameras_num: number of the synthetic cameras
+    :type cameras_num: int
+    :param size: size of the synthetic videos (width, height)
+    :type size: tuple of int
+    :param repeats: number of runs of each benchmark
+    :type repeats: int
+    :return: {benchmark: {'seconds', 'items', 'items_per_second'}}
+    :rtype: dict
+    """
+    cameras = ['PG{}'.format(idx + 1) for idx in range(cameras_num)]
+    paths = synthetic.create_dataset(data_path, 1, moves_num, move_seconds, cameras, size)
+    output_path = os.path.join(data_path, 'output')
+
+    def reset_output():
+        shutil.rmtree(output_path, ignore_errors=True)
+        os.makedirs(output_path)
+
+    results = {}
+
+    def add_result(name, seconds_num, items):
+        results[name] = {'seconds': seconds_num, 'items': items, 'items_per_second': items / seconds_num}
+        print('{:<36} {:>10.4f} s {:>14.1f} items/s'.format(name, seconds_num, items / seconds_num))
+
+    camera = synthetic.create_camera()
+    joints = synthetic.create_joints(seconds * synthetic.MOTION_CAPTURE_FPS)
+    world_points = joints.reshape(-1, 3)
+    add_result(
+        'convert_world_points_to_image_points',
+        measure(lambda: utils.convert_world_points_to_image_points(camera, world_points), repeats),
+        world_points.shape[0]
+    )
+    compact_camera = CompactCamera.from_camera(camera)
+    add_result(
+        'convert_world_points_compact_camera',
+        measure(lambda: utils.convert_world_points_to_image_points(compact_camera, world_points), repeats),
+        world_points.shape[0]
+    )
+
+    motion_capture = MotionCapture(joints, synthetic.create_skeleton(), synthetic.MOTION_CAPTURE_FPS)
+    video_frames_num = joints.shape[0] // (synthetic.MOTION_CAPTURE_FPS // synthetic.VIDEO_FPS)
+    add_result(
+        'adapt_motion_data_for_video',
+        measure(lambda: utils.adapt_motion_data_for_video(motion_capture, camera), repeats),
+        video_frames_num
+    )
+
+    video_path = os.path.join(paths['Videos'], 'F_PG1_Subject_1_L.avi')
+    v3d_path = os.path.join(paths['V3D'], 'F_v3d_Subject_1.mat')
+    split_frames_num = moves_num * move_seconds * synthetic.VIDEO_FPS
+    for backend in ('opencv', 'copy'):
+        if backend == 'copy' and shutil.which('ffmpeg') is None:
+            continue
+        add_result(
+            'split_video_' + backend,
+            measure(lambda: split_video(video_path, v3d_path, output_path, backend=backend), repeats, reset_output),
+            split_frames_num
+        )
+
+    amass_path = os.path.join(paths['AMASS'], 'F_amass_Subject_1.mat')
+    add_result(
+        'split_amass_file',
+        measure(lambda: split_amass_file(amass_path, output_path), repeats, reset_output),
+        moves_num
+    )
+
+    # read_dataset needs sub videos of every camera and moves' files
+    reset_output()
+    for camera_name in cameras:
+        camera_video_path = os.path.join(paths['Videos'], 'F_{}_Subject_1_L.avi'.format(camera_name))
+        split_video(camera_video_path, v3d_path, output_path, backend='opencv')
+    split_amass_file(amass_path, output_path)
+    add_result(
+        'read_dataset',
+        measure(lambda: utils.read_dataset(output_path, output_path), repeats),
+        len(os.listdir(output_path))
+    )
+
+    add_result(
+        'pose_3d_blit',
+        measure(lambda: blit_pose_3d_frames(motion_capture), repeats),
+        video_frames_num
+    )
+
+    width, height = size
+    random = np.random.RandomState(0)
+    image_points = np.stack((
+        random.randint(0, width, (video_frames_num, synthetic.JOINTS_NUM)),
+        random.randint(0, height, (video_frames_num, synthetic.JOINTS_NUM)),
+    ), axis=-1)
+    frame = np.zeros((height, width, 3), dtype=np.uint8)
+    for quality in QUALITY_MODES:
+        renderer = OverlayRenderer(motion_capture.skeleton, quality)
+        add_result(
+            'overlay_' + quality,
+            measure(lambda: [renderer.draw(frame, frame_points) for frame_points in image_points], repeats),
+            video_frames_num
+        )
+    return results
+
+
+def compare(results, previous_results):
+    """Print speed of the results relative to previous results.
+
+    :param results: results (see run)
+    :type results: dict
+    :param previous_results: previous results (see run)
+    :type previous_results: dict
+    """
+    print('\nCompared with {}:'.format(previous_results.get('environment', {}).get('commit')))
+    for name, result in results.items():
+        if name not in previous_results['results']:
+            continue
+        ratio = previous_results['results'][name]['seconds'] / result['seconds']
+        print('{:<36} {:>8.2f}x {}'.format(name, ratio, 'faster' if ratio >= 1 else 'slower'))
+
+
+if __name__ == '__main__':
+    args = get_flags().parse_args()
+    parameters = vars(args).copy()
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        benchmark_results = run(
+            temp_dir,
+            args.seconds,
+            args.moves,
+            args.move_seconds,
+            args.cameras,
+            (args.width, args.height),
+            args.repeats
+        )
+
+    report = {
+        'time': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'environment': get_environment(),
+        'parameters': {name: parameters[name] for name in parameters if name not in ('output', 'compare')},
+        'results': benchmark_results,
+    }
+    output = args.output or os.path.join(DEFAULT_RESULTS_DIR, time.strftime('%Y%m%d-%H%M%S') + '.json')
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, 'w') as file:
+        json.dump(report, file, indent=2)
+    print('\nResults saved: ' + output)
+
+    if args.compare:
+        with open(args.compare) as file:
+            compare(benchmark_results, json.load(file))
@@ -0,0 +1,277 @@
+import os
+import cv2
+import numpy as np
+import scipy.io as sio
+from common.camera import Camera
+
+# Shapes of the MoVi dataset
+MOTION_CAPTURE_FPS = 120
+VIDEO_FPS = 30
+JOINTS_NUM = 52
+BETAS_NUM = 16
+
+
+def create_camera(seed=0, size=(800, 600)):
+    """Create a camera which looks at the origin from a few meters away.
+
+    :param seed: random seed
+    :type seed: int
+    :param size: size of frames (width, height)
+    :type size: tuple of int
+    :return: camera's params
+    :rtype: Camera
+    """
+    random = np.random.RandomState(seed)
+    angle = random.uniform(-np.pi, np.pi)
+    rotation_matrix = np.array([
+        [np.cos(angle), 0, np.sin(angle)],
+        [0, 1, 0],
+        [-np.sin(angle), 0, np.cos(angle)],
+    ])
+    translation_vector = np.array([random.uniform(-100, 100), random.uniform(-100, 100), 4000.])
+    width, height = size
+    focal_length = 1.875 * width
+    intrinsic_matrix = np.array([
+        [focal_length, 0, 0],
+        [0, focal_length, 0],
+        [width / 2, height / 2, 1],
+    ])
+    return Camera(rotation_matrix, translation_vector, intrinsic_matrix)
+
+
+def create_skeleton(joints_num=JOINTS_NUM, seed=0):
+    """Create a random skeleton (synonym jointsParent), parents are counted from 1.
+
+    :param joints_num: number of the joints
+    :type joints_num: int
+    :param seed: random seed
+    :type seed: int
+    :return: skeleton
+    :rtype: np.ndarray
+    """
+    random = np.random.RandomState(seed)
+    skeleton = np.zeros(joints_num, dtype=int)
+    for idx in range(1, joints_num):
+        skeleton[idx] = random.randint(1, idx + 1)
+    return skeleton
+
+
+def create_joints(frames_num, joints_num=JOINTS_NUM, fps=MOTION_CAPTURE_FPS, seed=0):
+    """Create smooth joints' locations of a body walking around the origin (millimeters).
+
+    :param frames_num: number of frames
+    :type frames_num: int
+    :param joints_num: number of the joints
+    :type joints_num: int
+    :param fps: frames per second
+    :type fps: float
+    :param seed: random seed
+    :type seed: int
+    :return: joints (frames, joints, 3)
+    :rtype: np.ndarray
+    """
+    random = np.random.RandomState(seed)
+    times = np.arange(frames_num) / fps
+    root = np.stack((500 * np.cos(times / 4), np.zeros(frames_num), 500 * np.sin(times / 4)), axis=1)
+    offsets = random.uniform([-300, -900, -150], [300, 800, 150], (joints_num, 3))
+    phases = random.uniform(0, 2 * np.pi, (joints_num, 1))
+    swing = 50 * np.sin(2 * np.pi * times[:, np.newaxis] + phases.T)
+    joints = root[:, np.newaxis, :] + offsets[np.newaxis]
+    joints[:, :, 2] = joints[:, :, 2] + swing
+    return joints
+
+
+def create_move(frames_num, joints_num=JOINTS_NUM, seed=0):
+    """Create fields of an AMASS move (the same names as in AMASS .mat files).
+
+    :param frames_num: number of frames (120 fps)
+    :type frames_num: int
+    :param joints_num: number of the joints
+    :type joints_num: int
+    :param seed: random seed
+    :type seed: int
+    :return: fields of the move
+    :rtype: dict
+    """
+    random = np.random.RandomState(seed)
+    joints = create_joints(frames_num, joints_num, seed=seed)
+    return {
+        'RootTranslation_amass': joints[:, 0, :].T / 1000,
+        'jointsBetas_amass': random.rand(BETAS_NUM),
+        'jointsLocation_amass': joints,
+        'jointsExpMaps_amass': random.uniform(-0.5, 0.5, (frames_num, joints_num, 3)),
+        'jointsParent': create_skeleton(joints_num, seed),
+        'description': 'synthetic move {}'.format(seed + 1),
+    }
+
+
+def create_amass_file(path, moves_frames, subject=1, joints_num=JOINTS_NUM):
+    """Create an AMASS .mat file with the same layout as the MoVi files.
+
+    :param path: path of the created file
+    :type path: str
+    :param moves_frames: number of frames (120 fps) of each move
+    :type moves_frames: list of int
+    :param subject: subject's number
+    :type subject: int
+    :param joints_num: number of the joints
+    :type joints_num: int
+    """
+    moves = np.array(
+        [create_move(frames_num, joints_num, idx) for idx, frames_num in enumerate(moves_frames)],
+        dtype=object
+    )
+    sio.savemat(
+        path,
+        {'Subject_{}_F_amass'.format(subject): {'id': subject, 'subject': 'Subject_{}'.format(subject), 'move': moves}},
+        do_compression=True
+    )
+
+
+def create_motion_capture_file(path, frames_num, subject=1, joints_num=JOINTS_NUM, seed=0):
+    """Create a motion capture file of a single move (.npz, as written by prepare_dataset.py).
+
+    :param path: path of the created file
+    :type path: str
+    :param frames_num: number of frames (120 fps)
+    :type frames_num: int
+    :param subject: subject's number
+    :type subject: int
+    :param joints_num: number of the joints
+    :type joints_num: int
+    :param seed: random seed
+    :type seed: int
+    """
+    move = create_move(frames_num, joints_num, seed)
+    np.savez(
+        path,
+        id=subject,
+        subject='Subject_{}'.format(subject),
+        root_translation=move['RootTranslation_amass'],
+        joints_betas=move['jointsBetas_amass'],
+        joints_location=move['jointsLocation_amass'],
+        joints_exponential_mapping=move['jointsExpMaps_amass'],
+        joints_parent=move['jointsParent'],
+        description=move['description']
+    )
+
+
+def get_video_ranges(moves_frames, gap=15):
+    """Get ranges of moves in a video (30 fps) of moves with motion capture frames (120 fps).
+
+    :param moves_frames: number of frames (120 fps) of each move
+    :type moves_frames: list of int
+    :param gap: frames between moves in the video
+    :type gap: int
+    :return: ranges [[start, end],...] counted from 1 (30 fps) and the number of frames of the video
+    :rtype: tuple
+    """
+    ratio = MOTION_CAPTURE_FPS // VIDEO_FPS
+    ranges = []
+    start = gap + 1
+    for frames_num in moves_frames:
+        end = start + frames_num // ratio - 1
+        ranges.append([start, end])
+        start = end + gap + 1
+    return np.array(ranges), start - 1
+
+
+def create_v3d_file(path, moves_frames, subject=1):
+    """Create a V3D .mat file with moves' names and ranges.
+
+    :param path: path of the created file
+    :type path: str
+    :param moves_frames: number of frames (120 fps) of each move
+    :type moves_frames: list of int
+    :param subject: subject's number
+    :type subject: int
+    """
+    ranges, _ = get_video_ranges(moves_frames)
+    ratio = MOTION_CAPTURE_FPS // VIDEO_FPS
+    move = {
+        'motions_list': np.array(['synthetic move {}'.format(idx + 1) for idx in range(len(moves_frames))], object),
+        'flags30': ranges,
+        'flags120': (ranges - 1) * ratio + 1,
+    }
+    sio.savemat(path, {'Subject_{}_F'.format(subject): {'move': move}}, do_compression=True)
+
+
+def create_video(path, frames_num, size=(200, 150), fps=VIDEO_FPS):
+    """Create a video of a moving gradient (XVID).
+
+    :param path: path of the created video
+    :type path: str
+    :param frames_num: number of frames
+    :type frames_num: int
+    :param size: size of frames (width, height)
+    :type size: tuple of int
+    :param fps: frames per second
+    :type fps: float
+    """
+    width, height = size
+    video = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*'XVID'), fps, (width, height))
+    x, y = np.meshgrid(np.arange(width), np.arange(height))
+    for frame_num in range(frames_num):
+        frame = np.stack(((x + frame_num) % 256, (y + 2 * frame_num) % 256, (x + y) % 256), axis=-1)
+        video.write(frame.astype(np.uint8))
+    video.release()
+
+
+def create_calibration(calib_dir, camera_name, seed=0, size=(800, 600)):
+    """Create camera's params files (Extrinsics_<camera>.npz and cameraParams_<camera>.npz).
+
+    :param calib_dir: directory of camera's params
+    :type calib_dir: str
+    :param camera_name: name of the camera (e.g. PG1)
+    :type camera_name: str
+    :param seed: random seed
+    :type seed: int
+    :param size: size of frames (width, height)
+    :type size: tuple of int
+    """
+    camera = create_camera(seed, size)
+    np.savez(
+        os.path.join(calib_dir, 'Extrinsics_{}.npz'.format(camera_name)),
+        rotationMatrix=camera.rotation_matrix,
+        translationVector=camera.translation_vector
+    )
+    np.savez(
+        os.path.join(calib_dir, 'cameraParams_{}.npz'.format(camera_name)),
+        IntrinsicMatrix=camera.intrinsic_matrix
+    )
+
+
+def create_dataset(root_path, subjects_num=1, moves_num=4, move_seconds=10, cameras=('PG1', 'PG2'), size=(200, 150)):
+    """Create a synthetic MoVi-shaped dataset (AMASS/, V3D/, Videos/, Calib/ directories).
+
+    :param root_path: path of the dataset
+    :type root_path: str
+    :param subjects_num: number of subjects
+    :type subjects_num: int
+    :param moves_num: number of moves of each subject
+    :type moves_num: int
+    :param move_seconds: duration of each move
+    :type move_seconds: float
+    :param cameras: names of cameras
+    :type cameras: tuple of str
+    :param size: size of video frames (width, height)
+    :type size: tuple of int
+    :return: paths of AMASS/, V3D/, Videos/ and Calib/ directories
+    :rtype: dict
+    """
+    paths = {name: os.path.join(root_path, name) for name in ('AMASS', 'V3D', 'Videos', 'Calib')}
+    for path in paths.values():
+        os.makedirs(path, exist_ok=True)
+
+    moves_frames = [int(move_seconds * MOTION_CAPTURE_FPS)] * moves_num
+    _, video_frames_num = get_video_ranges(moves_frames)
+    for subject in range(1, subjects_num + 1):
+        create_amass_file(os.path.join(paths['AMASS'], 'F_amass_Subject_{}.mat'.format(subject)), moves_frames, subject)
+        create_v3d_file(os.path.join(paths['V3D'], 'F_v3d_Subject_{}.mat'.format(subject)), moves_frames, subject)
+        for camera_name in cameras:
+            video_name = 'F_{}_Subject_{}_L.avi'.format(camera_name, subject)
+            create_video(os.path.join(paths['Videos'], video_name), video_frames_num, size)
+
+    for seed, camera_name in enumerate(cameras):
+        create_calibration(paths['Calib'], camera_name, seed, size)
+    return paths
@@ -1,5 +1,6 @@
 from dataclasses import dataclass
 import numpy as np
+from common.validation import validate_array
 
 
 @dataclass
@@ -12,7 +13,96 @@ class Camera:
     :type translation_vector: np.ndarray
     :param intrinsic_matrix: camera's intrinsic matrix
     :type intrinsic_matrix: np.ndarray
+    :param radial_distortion: camera's radial distortion coefficients, optional
+    :type radial_distortion: np.ndarray
+    :param tangential_distortion: camera's tangential distortion coefficients, optional
+    :type tangential_distortion: np.ndarray
     """
     rotation_matrix: np.ndarray
     translation_vector: np.ndarray
     intrinsic_matrix: np.ndarray
+    radial_distortion: np.ndarray = None
+    tangential_distortion: np.ndarray = None
+
+
+class CompactCamera:
+    """Immutable camera's parameters with the cached projection matrix.
+
+    Parameters are validated and converted into read-only float64 arrays at creation, so a broken calibration
+    file fails at loading. The camera matrix (see projection.get_camera_matrix) is computed once.
+
+    :param rotation_matrix: camera's rotation matrix (3, 3)
+    :type rotation_matrix: np.ndarray
+    :param translation_vector: camera's translation vector (3 values)
+    :type translation_vector: np.ndarray
+    :param intrinsic_matrix: camera's intrinsic matrix (3, 3)
+    :type intrinsic_matrix: np.ndarray
+    :param radial_distortion: camera's radial distortion coefficients (2 or 3 values), optional
+    :type radial_distortion: np.ndarray
+    :param tangential_distortion: camera's tangential distortion coefficients (2 values), optional
+    :type tangential_distortion: np.ndarray
+    """
+    __slots__ = (
+        'rotation_matrix',
+        'translation_vector',
+        'intrinsic_matrix',
+        'radial_distortion',
+        'tangential_distortion',
+        'projection_matrix',
+    )
+
+    def __init__(self, rotation_matrix, translation_vector, intrinsic_matrix, radial_distortion=None,
+                 tangential_distortion=None):
+        from common.projection import get_camera_matrix
+
+        set_attribute = super().__setattr__
+        set_attribute('rotation_matrix', validate_array('rotation_matrix', rotation_matrix, (3, 3), finite=True))
+        set_attribute('translation_vector', validate_array(
+            'translation_vector', np.reshape(translation_vector, -1), (3,), finite=True
+        ))
+        set_attribute('intrinsic_matrix', validate_array('intrinsic_matrix', intrinsic_matrix, (3, 3), finite=True))
+        if radial_distortion is not None:
+            radial_distortion = validate_array(
+                'radial_distortion', np.reshape(radial_distortion, -1), (None,), finite=True
+            )
+            assert radial_distortion.shape[0] in (2, 3), 'radial_distortion should have 2 or 3 coefficients.'
+        set_attribute('radial_distortion', radial_distortion)
+        if tangential_distortion is not None:
+            tangential_distortion = validate_array(
+                'tangential_distortion', np.reshape(tangential_distortion, -1), (2,), finite=True
+            )
+        set_attribute('tangential_distortion', tangential_distortion)
+        set_attribute('projection_matrix', None)
+        projection_matrix = get_camera_matrix(self)
+        projection_matrix.setflags(write=False)
+        set_attribute('projection_matrix', projection_matrix)
+
+    def __setattr__(self, name, value):
+        raise AttributeError('CompactCamera is immutable.')
+
+    def __repr__(self):
+        return 'CompactCamera(translation_vector={})'.format(self.translation_vector.tolist())
+
+    def __getstate__(self):
+        return {name: getattr(self, name) for name in self.__slots__}
+
+    def __setstate__(self, state):
+        for name, value in state.items():
+            super().__setattr__(name, value)
+
+    @classmethod
+    def from_camera(cls, camera):
+        """Create the compact camera from camera's parameters.
+
+        :param camera: camera's params
+        :type camera: Camera
+        :return: compact camera
+        :rtype: CompactCamera
+        """
+        return cls(
+            camera.rotation_matrix,
+            camera.translation_vector,
+            camera.intrinsic_matrix,
+            camera.radial_distortion,
+            camera.tangential_distortion
+        )
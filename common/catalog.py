@@ -0,0 +1,214 @@
+import os
+import re
+import json
+from dataclasses import dataclass, asdict
+from pathlib import Path
+import numpy as np
+
+# E.g. F_PG1_Subject_1_L.avi, F_PG1_Subject_1_L_1.avi, F_amass_Subject_1.mat, F_amass_Subject_1_1.npz, F_v3d_Subject_1.mat
+FILE_NAME_PATTERN = re.compile(r'^(?P<round>[^_]+)_(?P<source>[^_]+)_Subject_(?P<subject>\d+)(?:_L)?(?:_(?P<move>\d+))?$')
+
+# E.g. Extrinsics_PG1.npz, cameraParams_PG1.npz
+CALIBRATION_FILE_NAME_PATTERN = re.compile(r'^(?P<kind>Extrinsics|cameraParams)_(?P<camera>[^_]+)$')
+
+CALIBRATION_KINDS = {'Extrinsics': 'extrinsics', 'cameraParams': 'camera_params'}
+
+TABLE_DTYPE = [
+    ('path', object),
+    ('kind', object),
+    ('round', object),
+    ('camera', object),
+    ('subject', int),
+    ('move', int),
+    ('size', int),
+    ('mtime', float),
+]
+
+
+@dataclass
+class CatalogEntry:
+    """Parsed file of the dataset.
+
+    :param path: path to the file
+    :type path: str
+    :param kind: 'video', 'amass', 'motion_capture', 'v3d', 'extrinsics' or 'camera_params'
+    :type kind: str
+    :param round: MoVi round (e.g. 'F'), empty for calibration files
+    :type round: str
+    :param camera: camera (e.g. 'PG1'), empty if the file isn't bound to a camera
+    :type camera: str
+    :param subject: subject's number, 0 if the file isn't bound to a subject
+    :type subject: int
+    :param move: move's number (counted from 1), 0 if the file isn't bound to a move
+    :type move: int
+    :param size: size of the file in bytes
+    :type size: int
+    :param mtime: modification time of the file
+    :type mtime: float
+    """
+    path: str
+    kind: str
+    round: str
+    camera: str
+    subject: int
+    move: int
+    size: int = 0
+    mtime: float = 0.
+
+
+def parse_file_name(path):
+    """Parse the name of a dataset's file.
+
+    :param path: path to the file
+    :type path: str
+    :return: parsed file (size and modification time are not filled) or None if the name is unknown
+    :rtype: CatalogEntry
+    """
+    path_obj = Path(path)
+    extension = path_obj.suffix.lower()
+
+    match = FILE_NAME_PATTERN.match(path_obj.stem)
+    if match is not None:
+        source = match.group('source')
+        subject = int(match.group('subject'))
+        move = int(match.group('move')) if match.group('move') else 0
+        if extension == '.avi':
+            return CatalogEntry(str(path), 'video', match.group('round'), source, subject, move)
+        if source.lower() == 'amass' and extension == '.mat':
+            return CatalogEntry(str(path), 'amass', match.group('round'), '', subject, move)
+        if source.lower() == 'amass' and extension == '.npz':
+            return CatalogEntry(str(path), 'motion_capture', match.group('round'), '', subject, move)
+        if source.lower() == 'v3d' and extension == '.mat':
+            return CatalogEntry(str(path), 'v3d', match.group('round'), '', subject, move)
+        return None
+
+    match = CALIBRATION_FILE_NAME_PATTERN.match(path_obj.stem)
+    if match is not None and extension == '.npz':
+        return CatalogEntry(str(path), CALIBRATION_KINDS[match.group('kind')], '', match.group('camera'), 0, 0)
+    return None
+
+
+class DatasetCatalog:
+    """
+    Index of the dataset's files keyed by (kind, subject, camera, move).
+
+    Directories are scanned once, file names are parsed once and the result can be
+    persisted, so later refreshes only parse files which were added or changed.
+
+    :param directories: directories of the dataset (e.g. Videos/, AMASS/, V3D/, Calib/, output/)
+    :type directories: list of str
+    :param catalog_path: path to the persisted catalog (.json), optional
+    :type catalog_path: str
+    """
+
+    def __init__(self, directories, catalog_path=None):
+        self.directories = [str(directory) for directory in directories]
+        self.catalog_path = catalog_path
+        self.entries = {}
+        self.index = {}
+
+        if catalog_path is not None and os.path.isfile(catalog_path):
+            self.load()
+        self.refresh()
+
+    def load(self):
+        """Load the persisted catalog.
+        """
+        with open(self.catalog_path) as file:
+            data = json.load(file)
+        self.entries = {entry['path']: CatalogEntry(**entry) for entry in data.get('entries', [])}
+
+    def save(self):
+        """Persist the catalog atomically.
+        """
+        assert self.catalog_path is not None, 'Path to the catalog is not set.'
+        temp_path = self.catalog_path + '.tmp'
+        with open(temp_path, 'w') as file:
+            json.dump({'entries': [asdict(entry) for entry in self.entries.values()]}, file)
+        os.replace(temp_path, self.catalog_path)
+
+    def refresh(self):
+        """Scan directories and update entries of added, changed or removed files.
+
+        :return: True if anything changed
+        :rtype: bool
+        """
+        entries = {}
+        for directory in self.directories:
+            if not os.path.isdir(directory):
+                continue
+
+            with os.scandir(directory) as iterator:
+                for dir_entry in iterator:
+                    if not dir_entry.is_file():
+                        continue
+
+                    stat = dir_entry.stat()
+                    path = os.path.join(directory, dir_entry.name)
+                    entry = self.entries.get(path)
+                    if entry is None or entry.size != stat.st_size or entry.mtime != stat.st_mtime:
+                        entry = parse_file_name(path)
+                        if entry is None:
+                            continue
+                        entry.size = stat.st_size
+                        entry.mtime = stat.st_mtime
+                    entries[path] = entry
+
+        changed = entries != self.entries
+        self.entries = entries
+        self.index = {}
+        for entry in entries.values():
+            self.index.setdefault((entry.kind, entry.subject, entry.camera, entry.move), []).append(entry)
+
+        if changed and self.catalog_path is not None:
+            self.save()
+        return changed
+
+    def get(self, kind, subject=0, camera='', move=0):
+        """Get paths of the files with exactly this key.
+
+        :param kind: kind of the file (see CatalogEntry)
+        :type kind: str
+        :param subject: subject's number
+        :type subject: int
+        :param camera: camera (e.g. 'PG1')
+        :type camera: str
+        :param move: move's number
+        :type move: int
+        :return: paths of the files
+        :rtype: list of str
+        """
+        return [entry.path for entry in self.index.get((kind, subject, camera, move), [])]
+
+    def query(self, **conditions):
+        """Get entries which match all conditions (e.g. kind='video', subject=1).
+
+        :return: entries
+        :rtype: list of CatalogEntry
+        """
+        return [
+            entry for entry in self.entries.values()
+            if all(getattr(entry, name) == value for name, value in conditions.items())
+        ]
+
+    def get_cameras(self):
+        """Get cameras which have both calibration files.
+
+        :return: sorted list of cameras
+        :rtype: list of str
+        """
+        extrinsics = {entry.camera for entry in self.query(kind='extrinsics')}
+        camera_params = {entry.camera for entry in self.query(kind='camera_params')}
+        return sorted(extrinsics & camera_params)
+
+    def to_table(self, **conditions):
+        """Get entries as a table.
+
+        :return: structured array with the fields of CatalogEntry
+        :rtype: numpy.ndarray
+        """
+        entries = self.query(**conditions)
+        table = np.empty(len(entries), dtype=TABLE_DTYPE)
+        for idx, entry in enumerate(entries):
+            table[idx] = tuple(getattr(entry, name) for name, _ in TABLE_DTYPE)
+        return table
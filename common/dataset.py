@@ -0,0 +1,326 @@
+import os
+from collections import OrderedDict
+from dataclasses import dataclass
+import cv2
+import numpy as np
+import torch
+from torch.utils.data import Dataset, IterableDataset, get_worker_info
+from common import keyframe_index
+from common import utils
+from common.camera import Camera
+from common.catalog import DatasetCatalog
+from common.shards import ShardReader
+
+
+@dataclass
+class Clip:
+    """Sub video paired with its motion capture data.
+
+    :param video_path: path to the sub video
+    :type video_path: str
+    :param motion_capture_path: path to the motion capture file (.npz)
+    :type motion_capture_path: str
+    :param camera: camera's params of the video
+    :type camera: Camera
+    """
+    video_path: str
+    motion_capture_path: str
+    camera: Camera
+
+
+def get_clips(videos_dir, amass_dir, calib_dir, cameras=None, catalog_path=None):
+    """Pair sub videos with motion capture files and camera's params.
+
+    :param videos_dir: directory of sub videos
+    :type videos_dir: str
+    :param amass_dir: directory of motion capture files (.npz)
+    :type amass_dir: str
+    :param calib_dir: directory of camera's params
+    :type calib_dir: str
+    :param cameras: cameras to use (e.g. ['PG1']), all calibrated cameras by default
+    :type cameras: list of str
+    :param catalog_path: path to the persisted catalog of the directories, optional
+    :type catalog_path: str
+    :return: clips
+    :rtype: list of Clip
+    """
+    catalog = DatasetCatalog([videos_dir, amass_dir, calib_dir], catalog_path)
+    cameras = catalog.get_cameras() if cameras is None else cameras
+
+    clips = []
+    for camera_name in cameras:
+        camera = utils.read_camera_params(
+            catalog.get('extrinsics', camera=camera_name)[0],
+            catalog.get('camera_params', camera=camera_name)[0]
+        )
+        for entry in sorted(catalog.query(kind='video', camera=camera_name), key=lambda e: (e.subject, e.move)):
+            motion_capture_paths = catalog.get('motion_capture', entry.subject, move=entry.move)
+            if entry.move > 0 and len(motion_capture_paths) > 0:
+                clips.append(Clip(entry.path, motion_capture_paths[0], camera))
+    return clips
+
+
+def to_sample(frame, image_points, joints):
+    """Convert a decoded frame and its joints into a sample.
+
+    :param frame: BGR frame (height, width, 3)
+    :type frame: numpy.ndarray
+    :param image_points: projected joints (joints, 2)
+    :type image_points: numpy.ndarray
+    :param joints: 3D joints (joints, 3)
+    :type joints: numpy.ndarray
+    :return: RGB frame (height, width, 3) uint8, 2D joints (joints, 2), 3D joints (joints, 3)
+    :rtype: tuple of torch.Tensor
+    """
+    frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+    return torch.from_numpy(frame), torch.from_numpy(image_points), torch.from_numpy(joints)
+
+
+class VideoHandles:
+    """
+    LRU of open video handles.
+
+    Handles are never shared between processes: after a fork (e.g. in DataLoader workers)
+    the handles of the parent process are dropped and opened again.
+
+    :param max_open: maximum number of open videos
+    :type max_open: int
+    """
+
+    def __init__(self, max_open=4):
+        self.max_open = max_open
+        self.pid = os.getpid()
+        self.handles = OrderedDict()
+
+    def __getstate__(self):
+        # Open handles can't be pickled (e.g. for spawned DataLoader workers)
+        return {'max_open': self.max_open, 'pid': self.pid, 'handles': OrderedDict()}
+
+    def close(self):
+        """Release all handles.
+        """
+        for cap, _, _ in self.handles.values():
+            cap.release()
+        self.handles = OrderedDict()
+
+    def read(self, video_path, frame_num):
+        """Read a frame. Sequential reads of the same video don't seek, random reads seek through
+        the keyframe index of the video (see common/keyframe_index.py), so they decode at most a keyframe interval.
+
+        :param video_path: path to the video
+        :type video_path: str
+        :param frame_num: frame number (counted from 0)
+        :type frame_num: int
+        :return: BGR frame (height, width, 3)
+        :rtype: numpy.ndarray
+        """
+        if self.pid != os.getpid():
+            self.handles = OrderedDict()
+            self.pid = os.getpid()
+
+        if video_path in self.handles:
+            self.handles.move_to_end(video_path)
+            cap, next_frame_num, keyframes = self.handles[video_path]
+        else:
+            if len(self.handles) >= self.max_open:
+                _, (oldest_cap, _, _) = self.handles.popitem(last=False)
+                oldest_cap.release()
+            cap, next_frame_num = cv2.VideoCapture(video_path), 0
+            index = keyframe_index.read_keyframe_index(video_path)
+            keyframes = np.array(index['keyframes'], dtype=int) if index is not None else None
+
+        keyframe_index.seek(cap, next_frame_num, frame_num, keyframes)
+        ret, frame = cap.read()
+        assert ret, 'Frame {} of {} couldn\'t be read.'.format(frame_num, video_path)
+        self.handles[video_path] = (cap, frame_num + 1, keyframes)
+        return frame
+
+
+class ClipsData:
+    """
+    Joints of the clips projected once for their cameras.
+
+    :param clips: clips
+    :type clips: list of Clip
+    :param fps: frames per second of the videos, the real frame rate of every video by default
+    :type fps: float
+    :param method: resampling of motion capture frames (see MotionCapture.resample),
+        every n-th frame is taken if None
+    :type method: str
+    """
+
+    def __init__(self, clips, fps=None, method='linear'):
+        self.clips = clips
+        self.image_points = []
+        self.joints = []
+        self.frames_nums = []
+
+        for clip in clips:
+            cap = cv2.VideoCapture(clip.video_path)
+            video_frames_num = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+            video_fps = fps if fps is not None else cap.get(cv2.CAP_PROP_FPS)
+            cap.release()
+
+            motion_capture = utils.read_motion_capture_data(clip.motion_capture_path)
+            joints = utils.get_joints_for_video(motion_capture, video_fps, method)
+            image_points = utils.convert_world_points_to_image_points(clip.camera, joints, dtype=np.float32)
+            joints = joints.astype(np.float32)
+
+            self.image_points.append(image_points)
+            self.joints.append(joints)
+            self.frames_nums.append(min(video_frames_num, image_points.shape[0]))
+
+        self.offsets = np.concatenate(([0], np.cumsum(self.frames_nums))).astype(int)
+
+
+class MoViFrameDataset(Dataset):
+    """
+    Map-style dataset of (frame, 2D joints, 3D joints) samples of all clips.
+
+    Frames are decoded lazily, only a few video handles are kept open per worker.
+
+    :param clips: clips
+    :type clips: list of Clip
+    :param fps: frames per second of the videos, the real frame rate of every video by default
+    :type fps: float
+    :param max_open_videos: maximum number of open videos per worker
+    :type max_open_videos: int
+    :param transform: function applied to every sample, optional
+    :type transform: callable
+    :param method: resampling of motion capture frames (see ClipsData)
+    :type method: str
+    """
+
+    def __init__(self, clips, fps=None, max_open_videos=4, transform=None, method='linear'):
+        self.data = ClipsData(clips, fps, method)
+        self.handles = VideoHandles(max_open_videos)
+        self.transform = transform
+
+    def __len__(self):
+        return int(self.data.offsets[-1])
+
+    def __getitem__(self, idx):
+        if idx < 0:
+            idx = len(self) + idx
+        if not 0 <= idx < len(self):
+            raise IndexError('Index {} is out of range.'.format(idx))
+
+        clip_idx = int(np.searchsorted(self.data.offsets, idx, side='right')) - 1
+        frame_num = idx - int(self.data.offsets[clip_idx])
+
+        frame = self.handles.read(self.data.clips[clip_idx].video_path, frame_num)
+        sample = to_sample(frame, self.data.image_points[clip_idx][frame_num], self.data.joints[clip_idx][frame_num])
+        return self.transform(sample) if self.transform else sample
+
+
+class MoViClipIterableDataset(IterableDataset):
+    """
+    Iterable dataset of (frame, 2D joints, 3D joints) samples.
+
+    Each clip is decoded sequentially in a single pass, clips are split between DataLoader workers.
+    Only one frame per worker is held in memory, no matter how long the video is.
+
+    :param clips: clips
+    :type clips: list of Clip
+    :param fps: frames per second of the videos, the real frame rate of every video by default
+    :type fps: float
+    :param shuffle: shuffle the order of the clips every epoch
+    :type shuffle: bool
+    :param seed: random seed of the shuffling
+    :type seed: int
+    :param transform: function applied to every sample, optional
+    :type transform: callable
+    :param method: resampling of motion capture frames (see ClipsData)
+    :type method: str
+    """
+
+    def __init__(self, clips, fps=None, shuffle=False, seed=0, transform=None, method='linear'):
+        self.data = ClipsData(clips, fps, method)
+        self.shuffle = shuffle
+        self.seed = seed
+        self.epoch = 0
+        self.transform = transform
+
+    def set_epoch(self, epoch):
+        """Set the epoch, so every epoch has its own order of the clips.
+
+        :param epoch: epoch number
+        :type epoch: int
+        """
+        self.epoch = epoch
+
+    def __len__(self):
+        return int(self.data.offsets[-1])
+
+    def __iter__(self):
+        clip_indexes = np.arange(len(self.data.clips))
+        if self.shuffle:
+            np.random.RandomState(self.seed + self.epoch).shuffle(clip_indexes)
+
+        worker_info = get_worker_info()
+        if worker_info is not None:
+            clip_indexes = clip_indexes[worker_info.id::worker_info.num_workers]
+
+        for clip_idx in clip_indexes:
+            cap = cv2.VideoCapture(self.data.clips[clip_idx].video_path)
+            for frame_num in range(self.data.frames_nums[clip_idx]):
+                ret, frame = cap.read()
+                if not ret:
+                    break
+
+                sample = to_sample(frame, self.data.image_points[clip_idx][frame_num], self.data.joints[clip_idx][frame_num])
+                yield self.transform(sample) if self.transform else sample
+            cap.release()
+
+
+class MoViShardIterableDataset(IterableDataset):
+    """
+    Iterable dataset of (frame, 2D joints, 3D joints) samples read from shards (see data/export_shards.py).
+
+    Whole shards are read sequentially and split between DataLoader workers (and nodes).
+
+    :param shards_path: path of the directory of shards
+    :type shards_path: str
+    :param shuffle: shuffle the order of the shards every epoch
+    :type shuffle: bool
+    :param seed: random seed of the shuffling
+    :type seed: int
+    :param rank: index of this node (process) in distributed training
+    :type rank: int
+    :param world_size: number of nodes (processes) in distributed training
+    :type world_size: int
+    :param transform: function applied to every sample, optional
+    :type transform: callable
+    """
+
+    def __init__(self, shards_path, shuffle=False, seed=0, rank=0, world_size=1, transform=None):
+        self.reader = ShardReader(shards_path)
+        self.shuffle = shuffle
+        self.seed = seed
+        self.rank = rank
+        self.world_size = world_size
+        self.epoch = 0
+        self.transform = transform
+
+    def set_epoch(self, epoch):
+        """Set the epoch, so every epoch has its own order of the shards.
+
+        :param epoch: epoch number
+        :type epoch: int
+        """
+        self.epoch = epoch
+
+    def __iter__(self):
+        shard_indexes = np.arange(len(self.reader.shards))
+        if self.shuffle:
+            np.random.RandomState(self.seed + self.epoch).shuffle(shard_indexes)
+        shard_indexes = shard_indexes[self.rank::self.world_size]
+
+        worker_info = get_worker_info()
+        if worker_info is not None:
+            shard_indexes = shard_indexes[worker_info.id::worker_info.num_workers]
+
+        for shard_idx in shard_indexes:
+            for val in self.reader.iter_shard(shard_idx):
+                sample = to_sample(val['frame'], val['image_points'], val['joints'])
+                yield self.transform(sample) if self.transform else sample
@@ -0,0 +1,121 @@
+import json
+import shutil
+import subprocess
+
+# Codecs where every frame is a keyframe, so a stream copy can start at any frame
+INTRA_ONLY_CODECS = {
+    'mjpeg',
+    'rawvideo',
+    'huffyuv',
+    'ffvhuff',
+    'png',
+    'utvideo',
+    'magicyuv',
+    'prores',
+    'dnxhd',
+    'jpeg2000',
+}
+
+
+def is_available():
+    """Check whether ffmpeg and ffprobe binaries are installed.
+
+    :return: True if both binaries are found
+    :rtype: bool
+    """
+    return shutil.which('ffmpeg') is not None and shutil.which('ffprobe') is not None
+
+
+def probe_video_codec(video_path):
+    """Get the codec name of the first video stream.
+
+    :param video_path: path to the video
+    :type video_path: str
+    :return: codec name (e.g. 'mpeg4', 'mjpeg') or None if it couldn't be found
+    :rtype: str
+    """
+    command = [
+        'ffprobe', '-v', 'error',
+        '-select_streams', 'v:0',
+        '-show_entries', 'stream=codec_name',
+        '-of', 'json',
+        video_path,
+    ]
+    try:
+        output = subprocess.run(command, check=True, stdout=subprocess.PIPE, stderr=subprocess.PIPE).stdout
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+    streams = json.loads(output.decode('utf-8')).get('streams', [])
+    return streams[0].get('codec_name') if len(streams) > 0 else None
+
+
+def is_intra_only(video_path):
+    """Check whether every frame of the video is a keyframe.
+
+    :param video_path: path to the video
+    :type video_path: str
+    :return: True if the video can be cut at any frame without re-encoding
+    :rtype: bool
+    """
+    return probe_video_codec(video_path) in INTRA_ONLY_CODECS
+
+
+def copy_frames(video_path, output_path, start_frame, frames_num, fps):
+    """Copy a range of frames into a new video without re-encoding (stream copy).
+
+    The cut is frame accurate only for intra-only codecs, otherwise it starts at the nearest keyframe.
+
+    :param video_path: path to the video
+    :type video_path: str
+    :param output_path: path to the output video
+    :type output_path: str
+    :param start_frame: first frame (counted from 0)
+    :type start_frame: int
+    :param frames_num: number of frames
+    :type frames_num: int
+    :param fps: frames per second of the video
+    :type fps: float
+    """
+    command = [
+        'ffmpeg', '-v', 'error', '-y',
+        '-ss', '{:.6f}'.format(start_frame / fps),
+        '-i', video_path,
+        '-map', '0:v:0',
+        '-frames:v', str(frames_num),
+        '-c', 'copy',
+        output_path,
+    ]
+    subprocess.run(command, check=True, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+
+
+def encode_frames(video_path, output_path, start_frame, frames_num, fps, keyframe_interval=None):
+    """Re-encode a range of frames into a new video (MPEG-4 part 2 with the XVID tag, as written by OpenCV).
+
+    The cut is frame accurate, frames before the range are decoded but not encoded.
+
+    :param video_path: path to the video
+    :type video_path: str
+    :param output_path: path to the output video
+    :type output_path: str
+    :param start_frame: first frame (counted from 0)
+    :type start_frame: int
+    :param frames_num: number of frames
+    :type frames_num: int
+    :param fps: frames per second of the video
+    :type fps: float
+    :param keyframe_interval: maximum number of frames between keyframes, the encoder's default if None
+    :type keyframe_interval: int
+    """
+    command = [
+        'ffmpeg', '-v', 'error', '-y',
+        '-ss', '{:.6f}'.format(start_frame / fps),
+        '-i', video_path,
+        '-map', '0:v:0',
+        '-frames:v', str(frames_num),
+        '-c:v', 'mpeg4', '-vtag', 'XVID', '-q:v', '2',
+    ]
+    if keyframe_interval is not None:
+        command = command + ['-g', str(keyframe_interval)]
+    command.append(output_path)
+    subprocess.run(command, check=True, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
@@ -0,0 +1,216 @@
+import queue
+import threading
+from collections import OrderedDict
+import cv2
+from common.pipeline import END, POLL_SECONDS
+
+
+class FrameSource:
+    """
+    Video frames decoded ahead by a background thread.
+
+    Frames are decoded sequentially into a bounded look-ahead queue, recently returned frames
+    are kept in an LRU, so stepping backwards doesn't seek. Other random access restarts
+    the decoding at the requested frame. An error of the decoding thread is raised by get_data.
+
+    :param video_path: path to the video
+    :type video_path: str
+    :param prefetch: maximum number of frames decoded ahead
+    :type prefetch: int
+    :param cache_size: number of recently returned frames which are kept
+    :type cache_size: int
+    :param rgb: return RGB frames instead of BGR
+    :type rgb: bool
+    """
+
+    def __init__(self, video_path, prefetch=32, cache_size=64, rgb=False):
+        self.video_path = video_path
+        self.cache_size = cache_size
+        self.rgb = rgb
+
+        cap = cv2.VideoCapture(video_path)
+        self.frames_num = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+        self.fps = cap.get(cv2.CAP_PROP_FPS)
+        self.size = (int(cap.get(cv2.CAP_PROP_FRAME_WIDTH)), int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT)))
+        cap.release()
+
+        self.frames = queue.Queue(maxsize=prefetch)
+        self.cache = OrderedDict()
+        self.lock = threading.Lock()
+        self.seek_requested = threading.Event()
+        self.stopped = threading.Event()
+        self.generation = 0
+        self.seek_frame = 0
+        self.next_frame = 0
+        self.error = None
+
+        self.thread = threading.Thread(target=self._decode, daemon=True)
+        self.thread.start()
+
+    def __len__(self):
+        return self.frames_num
+
+    def __iter__(self):
+        for frame_num in range(self.frames_num):
+            try:
+                yield self.get_data(frame_num)
+            except IndexError:
+                return
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def close(self):
+        """Stop the decoding thread.
+        """
+        self.stopped.set()
+        self.seek_requested.set()
+        self.thread.join()
+
+    def _decode(self):
+        """Decode frames into the queue (runs in the background thread).
+
+        An error is stored and END is put into the queue, so the reader doesn't wait for frames which never come.
+        """
+        cap = cv2.VideoCapture(self.video_path)
+        try:
+            self._decode_frames(cap)
+        except Exception as error:
+            self.error = error
+            while not self.stopped.is_set():
+                try:
+                    self.frames.put(END, timeout=POLL_SECONDS)
+                    break
+                except queue.Full:
+                    continue
+        finally:
+            cap.release()
+
+    def _decode_frames(self, cap):
+        """Decode frames until the source is closed.
+
+        :param cap: OpenCV capture of the video
+        :type cap: cv2.VideoCapture
+        """
+        generation = 0
+        position = 0
+        ended = False
+
+        while not self.stopped.is_set():
+            with self.lock:
+                requested_generation, seek_frame = self.generation, self.seek_frame
+                self.seek_requested.clear()
+
+            if requested_generation != generation:
+                generation = requested_generation
+                if seek_frame != position:
+                    cap.set(cv2.CAP_PROP_POS_FRAMES, seek_frame)
+                    position = seek_frame
+                ended = False
+
+            if ended:
+                self.seek_requested.wait(POLL_SECONDS)
+                continue
+
+            ret, frame = cap.read()
+            if ret:
+                if self.rgb:
+                    frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+            else:
+                frame = None
+                ended = True
+
+            # Wait for a free slot, unless the frame became useless because of a seek
+            while not self.stopped.is_set() and generation == self.generation:
+                try:
+                    self.frames.put((generation, position, frame), timeout=POLL_SECONDS)
+                    break
+                except queue.Full:
+                    continue
+            position = position + 1
+
+    def _seek(self, frame_num):
+        """Restart the decoding at the frame.
+
+        :param frame_num: frame number (counted from 0)
+        :type frame_num: int
+        """
+        with self.lock:
+            self.generation = self.generation + 1
+            self.seek_frame = frame_num
+            self.seek_requested.set()
+
+        while True:
+            try:
+                self.frames.get_nowait()
+            except queue.Empty:
+                break
+        self.next_frame = frame_num
+
+    def _remember(self, frame_num, frame):
+        """Put the frame into the LRU of recently returned frames.
+
+        :param frame_num: frame number
+        :type frame_num: int
+        :param frame: frame
+        :type frame: numpy.ndarray
+        """
+        self.cache[frame_num] = frame
+        self.cache.move_to_end(frame_num)
+        while len(self.cache) > self.cache_size:
+            self.cache.popitem(last=False)
+
+    def _get_item(self):
+        """Wait for the next decoded item, the error of the decoding thread is raised here.
+
+        :return: (generation, frame number, frame or None at the end)
+        :rtype: tuple
+        """
+        while True:
+            try:
+                item = self.frames.get(timeout=POLL_SECONDS)
+            except queue.Empty:
+                # The end marker could have been dropped by a seek
+                if self.thread.is_alive():
+                    continue
+                item = END
+            if item is not END:
+                return item
+            if self.error is not None:
+                raise self.error
+            raise RuntimeError('Decoding of {} was stopped.'.format(self.video_path))
+
+    def get_data(self, frame_num):
+        """Get a frame (the same name as imageio readers have).
+
+        The returned frame is shared with the LRU, copy it before drawing on it.
+
+        :param frame_num: frame number (counted from 0)
+        :type frame_num: int
+        :return: frame (height, width, 3)
+        :rtype: numpy.ndarray
+        """
+        if frame_num in self.cache:
+            self.cache.move_to_end(frame_num)
+            return self.cache[frame_num]
+
+        if frame_num != self.next_frame:
+            self._seek(frame_num)
+
+        while True:
+            generation, position, frame = self._get_item()
+            if generation != self.generation:
+                continue
+
+            if frame is None:
+                # The decoding stopped at the end, the next request has to restart it
+                self.next_frame = None
+                raise IndexError('Frame {} is out of range of {}.'.format(frame_num, self.video_path))
+
+            self.next_frame = position + 1
+            self._remember(position, frame)
+            if position == frame_num:
+                return frame
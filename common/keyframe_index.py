@@ -0,0 +1,174 @@
+import os
+import json
+import struct
+import cv2
+import numpy as np
+
+KEYFRAME_INDEX_EXTENSION = '.keyframes.json'
+
+# Flag of keyframes in entries of the AVI index (idx1)
+AVIIF_KEYFRAME = 0x10
+
+# Chunk ids of frames of the first video stream (compressed and uncompressed)
+VIDEO_CHUNK_IDS = (b'00dc', b'00db')
+
+AVI_INDEX_ENTRY = np.dtype([('id', 'S4'), ('flags', '<u4'), ('offset', '<u4'), ('size', '<u4')])
+
+
+def read_avi_index(video_path):
+    """Read keyframes and offsets of frames from the index (idx1 chunk) of an AVI file.
+
+    Only top-level chunks are visited, so the frames' data isn't read. OpenDML (AVI 2.0) indexes aren't supported.
+
+    :param video_path: path to the AVI video
+    :type video_path: str
+    :return: {'frames_num', 'keyframes', 'offsets', 'sizes'} (offsets of frames' data in the file)
+        or None if the video has no idx1 index
+    :rtype: dict
+    """
+    with open(video_path, 'rb') as file:
+        header = file.read(12)
+        if len(header) < 12:
+            return None
+        riff, _, form = struct.unpack('<4sI4s', header)
+        if riff != b'RIFF' or form != b'AVI ':
+            return None
+
+        movi_offset = None
+        entries = None
+        file_size = os.fstat(file.fileno()).st_size
+        position = 12
+        while position + 8 <= file_size:
+            file.seek(position)
+            chunk_id, chunk_size = struct.unpack('<4sI', file.read(8))
+            if chunk_id == b'LIST' and file.read(4) == b'movi':
+                movi_offset = position + 8
+            elif chunk_id == b'idx1':
+                entries = np.frombuffer(file.read(chunk_size), dtype=AVI_INDEX_ENTRY)
+                break
+            # Chunks are padded to even sizes
+            position = position + 8 + chunk_size + chunk_size % 2
+
+    if entries is None or movi_offset is None:
+        return None
+
+    entries = entries[np.isin(entries['id'], VIDEO_CHUNK_IDS)]
+    offsets = entries['offset'].astype(np.int64)
+    # Offsets are usually relative to the 'movi' list, but some writers store absolute offsets
+    if offsets.shape[0] > 0 and offsets[0] < movi_offset:
+        offsets = offsets + movi_offset
+    return {
+        'frames_num': int(entries.shape[0]),
+        'keyframes': np.flatnonzero(entries['flags'] & AVIIF_KEYFRAME).tolist(),
+        # Data of a chunk follows its 8 bytes header
+        'offsets': (offsets + 8).tolist(),
+        'sizes': entries['size'].astype(np.int64).tolist(),
+    }
+
+
+def get_keyframe_index_path(video_path):
+    """Get path of the keyframe index of a video (next to the video).
+
+    :param video_path: path to the video
+    :type video_path: str
+    :return: path of the index
+    :rtype: str
+    """
+    return video_path + KEYFRAME_INDEX_EXTENSION
+
+
+def write_keyframe_index(video_path):
+    """Write the keyframe index of an AVI video next to it.
+
+    :param video_path: path to the AVI video
+    :type video_path: str
+    :return: the index (see read_avi_index) or None if the video has no index
+    :rtype: dict
+    """
+    index = read_avi_index(video_path)
+    if index is None:
+        return None
+
+    stat = os.stat(video_path)
+    index_path = get_keyframe_index_path(video_path)
+    temp_path = index_path + '.{}.tmp'.format(os.getpid())
+    with open(temp_path, 'w') as file:
+        json.dump(dict(index, size=stat.st_size, mtime=stat.st_mtime), file)
+    os.replace(temp_path, index_path)
+    return index
+
+
+def read_keyframe_index(video_path):
+    """Read the keyframe index of a video, the video is indexed again if its index is missing or stale.
+
+    :param video_path: path to the video
+    :type video_path: str
+    :return: the index (see read_avi_index) or None if the video has no index
+    :rtype: dict
+    """
+    index_path = get_keyframe_index_path(video_path)
+    if os.path.isfile(index_path):
+        stat = os.stat(video_path)
+        try:
+            with open(index_path) as file:
+                index = json.load(file)
+            if index['size'] == stat.st_size and index['mtime'] == stat.st_mtime:
+                return index
+        except (ValueError, KeyError):
+            # A broken index is written again
+            pass
+
+    try:
+        return write_keyframe_index(video_path)
+    except OSError:
+        # e.g. a read-only copy of the dataset
+        return read_avi_index(video_path)
+
+
+def get_max_keyframe_interval(keyframes, frames_num):
+    """Get the longest distance between keyframes (the most frames decoded to reach any frame).
+
+    :param keyframes: keyframes (sorted frame numbers)
+    :type keyframes: list of int
+    :param frames_num: number of frames of the video
+    :type frames_num: int
+    :return: maximum interval
+    :rtype: int
+    """
+    if len(keyframes) == 0:
+        return frames_num
+    return int(np.max(np.diff(np.append(keyframes, frames_num))))
+
+
+def seek(cap, position, frame_num, keyframes=None):
+    """Move an OpenCV capture to the frame with bounded decoding.
+
+    Without a keyframe between the current position and the frame, the frames are grabbed without seeking.
+    Otherwise the capture seeks to the last keyframe before the frame and grabs the rest, so at most
+    the keyframe interval of frames are decoded. Without keyframes the capture seeks straight to the frame.
+
+    :param cap: OpenCV capture
+    :type cap: cv2.VideoCapture
+    :param position: number of the frame which will be read next (counted from 0)
+    :type position: int
+    :param frame_num: requested frame (counted from 0)
+    :type frame_num: int
+    :param keyframes: keyframes (sorted frame numbers), optional
+    :type keyframes: np.ndarray
+    :return: the new position, less than the frame if the video ended
+    :rtype: int
+    """
+    keyframe_idx = np.searchsorted(keyframes, frame_num, side='right') - 1 if keyframes is not None else -1
+    if keyframe_idx < 0:
+        if frame_num != position:
+            cap.set(cv2.CAP_PROP_POS_FRAMES, frame_num)
+        return frame_num
+
+    keyframe = int(keyframes[keyframe_idx])
+    if frame_num < position or keyframe > position:
+        cap.set(cv2.CAP_PROP_POS_FRAMES, keyframe)
+        position = keyframe
+
+    while position < frame_num and cap.grab():
+        position = position + 1
+    return position
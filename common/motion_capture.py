@@ -1,19 +1,18 @@
-from dataclasses import dataclass
+import hashlib
+from dataclasses import dataclass, field
 import numpy as np
+from common import rotations
+from common.skeleton import Skeleton, get_accelerations, get_velocities
+from common.validation import validate_array
 
+INTERPOLATION_METHODS = ('nearest', 'linear', 'slerp')
 
-@dataclass
-class MotionCapture:
-    """Camera's parameters"
 
-    :param joints: locations of joints
-    :type joints: np.ndarray
-    :param skeleton: skeleton (synonym jointsParent)
-    :type skeleton: np.ndarray
+class MotionCaptureMethods:
     """
-    joints: np.ndarray
-    skeleton: np.ndarray
-    fps: int
+    Methods shared by MotionCapture and CompactMotionCapture.
+    """
+    __slots__ = ()
 
     def get_joints_reduced_by_fps(self, fps) -> np.ndarray:
         """ Reduce motion capture frame rates.
@@ -28,3 +27,249 @@ class MotionCapture:
         diff = int(self.fps / fps)
         assert diff > 1, 'Difference should be at least 2 times bigger.'
         return self.joints[0::diff, :, :]
+
+    def get_timestamps(self, fps, frames_num=None):
+        """Get timestamps of frames of the target frame rate which are covered by the motion capture.
+
+        :param fps: target frames per second (e.g. 29.97 - the real fps of a video)
+        :type fps: float
+        :param frames_num: number of frames (e.g. of the video), covered frames by default
+        :type frames_num: int
+        :return: timestamps in seconds
+        :rtype: np.ndarray
+        """
+        if frames_num is None:
+            duration = (self.joints.shape[0] - 1) / self.fps
+            frames_num = int(np.floor(duration * fps + 1e-9)) + 1
+        return np.arange(frames_num) / fps
+
+    def resample(self, timestamps, method='linear', cache=False):
+        """Resample the motion capture to arbitrary timestamps.
+
+        Joints are interpolated linearly for 'linear' and 'slerp' methods, exponential maps
+        are interpolated linearly for 'linear' and spherically (as quaternions) for 'slerp'.
+        Timestamps outside of the motion capture take the first or the last frame.
+
+        :param timestamps: timestamps in seconds (the first motion capture frame is at 0)
+        :type timestamps: np.ndarray
+        :param method: 'nearest', 'linear' or 'slerp'
+        :type method: str
+        :param cache: remember the result, so the same request isn't computed again
+        :type cache: bool
+        :return: resampled motion capture data of the same class
+        :rtype: MotionCapture or CompactMotionCapture
+        """
+        assert method in INTERPOLATION_METHODS, 'Method should be one of {}.'.format(INTERPOLATION_METHODS)
+        timestamps = np.asarray(timestamps, dtype=np.float64)
+
+        key = None
+        if cache:
+            key = (method, hashlib.sha1(timestamps.tobytes()).hexdigest())
+            if key in self.resampling_cache:
+                return self.resampling_cache[key]
+
+        positions = np.clip(timestamps * self.fps, 0, self.joints.shape[0] - 1)
+        if method == 'nearest':
+            indexes = np.rint(positions).astype(int)
+            joints = self.joints[indexes]
+            exponential_maps = self.exponential_maps[indexes] if self.exponential_maps is not None else None
+        else:
+            lower = np.floor(positions).astype(int)
+            upper = np.minimum(lower + 1, self.joints.shape[0] - 1)
+            weights = (positions - lower)[:, np.newaxis, np.newaxis]
+
+            joints = self.joints[lower] * (1 - weights) + self.joints[upper] * weights
+
+            exponential_maps = None
+            if self.exponential_maps is not None and method == 'linear':
+                exponential_maps = self.exponential_maps[lower] * (1 - weights) + self.exponential_maps[upper] * weights
+            elif self.exponential_maps is not None:
+                quaternions = rotations.slerp(
+                    rotations.exponential_map_to_quaternion(self.exponential_maps[lower]),
+                    rotations.exponential_map_to_quaternion(self.exponential_maps[upper]),
+                    weights
+                )
+                exponential_maps = rotations.quaternion_to_exponential_map(quaternions)
+
+        if np.issubdtype(self.joints.dtype, np.floating):
+            # float32 joints stay float32
+            joints = joints.astype(self.joints.dtype, copy=False)
+            if exponential_maps is not None:
+                exponential_maps = exponential_maps.astype(self.joints.dtype, copy=False)
+
+        fps = 1 / np.median(np.diff(timestamps)) if timestamps.shape[0] > 1 else self.fps
+        resampled = type(self)(joints, self.skeleton, fps, exponential_maps)
+        # The resampled data has the same skeleton, so it shares the hierarchy
+        object.__setattr__(resampled, 'skeleton_hierarchy', self.skeleton_hierarchy)
+        if key is not None:
+            self.resampling_cache[key] = resampled
+        return resampled
+
+    def get_skeleton(self):
+        """Get the precomputed hierarchy of joints, it's built at the first call and reused afterwards.
+
+        :return: skeleton
+        :rtype: Skeleton
+        """
+        if self.skeleton_hierarchy is None:
+            # object.__setattr__ bypasses the immutability of CompactMotionCapture
+            object.__setattr__(self, 'skeleton_hierarchy', Skeleton(self.skeleton))
+        return self.skeleton_hierarchy
+
+    def get_bone_lengths(self):
+        """Get bone lengths of all frames.
+
+        :return: lengths (frames, bones) in the order of Skeleton.bone_pairs
+        :rtype: np.ndarray
+        """
+        return self.get_skeleton().get_bone_lengths(self.joints)
+
+    def get_root_relative_joints(self):
+        """Get joints relative to the root joint of their frame.
+
+        :return: joints (frames, joints, 3)
+        :rtype: np.ndarray
+        """
+        return self.get_skeleton().get_root_relative(self.joints)
+
+    def get_normalized_joints(self, per_frame=False):
+        """Get root relative joints scaled by the size of the skeleton (see Skeleton.normalize).
+
+        :param per_frame: scale every frame by its own size instead of the mean size of the sequence
+        :type per_frame: bool
+        :return: normalized joints (frames, joints, 3) and scales (frames,)
+        :rtype: tuple of np.ndarray
+        """
+        return self.get_skeleton().normalize(self.joints, per_frame)
+
+    def get_velocities(self):
+        """Get velocities of joints.
+
+        :return: velocities (frames, joints, 3) in units per second
+        :rtype: np.ndarray
+        """
+        return get_velocities(self.joints, self.fps)
+
+    def get_accelerations(self):
+        """Get accelerations of joints.
+
+        :return: accelerations (frames, joints, 3) in units per second^2
+        :rtype: np.ndarray
+        """
+        return get_accelerations(self.joints, self.fps)
+
+    def get_joints_for_fps(self, fps, frames_num=None, method='linear', cache=False):
+        """Get joints at every frame of an arbitrary frame rate (e.g. 29.97 or 60 fps).
+
+        Unlike get_joints_reduced_by_fps, the frame rate doesn't have to divide the motion capture frame rate,
+        so frames don't drift out of sync on long sequences.
+
+        :param fps: target frames per second
+        :type fps: float
+        :param frames_num: number of frames (e.g. of the video), covered frames by default
+        :type frames_num: int
+        :param method: 'nearest', 'linear' or 'slerp'
+        :type method: str
+        :param cache: remember the result, so the same request isn't computed again
+        :type cache: bool
+        :return: joints (frames, motion points, 3)
+        :rtype: np.ndarray
+        """
+        return self.resample(self.get_timestamps(fps, frames_num), method, cache).joints
+
+
+@dataclass
+class MotionCapture(MotionCaptureMethods):
+    """Camera's parameters"
+
+    :param joints: locations of joints
+    :type joints: np.ndarray
+    :param skeleton: skeleton (synonym jointsParent)
+    :type skeleton: np.ndarray
+    :param fps: motion capture frames per second
+    :type fps: float
+    :param exponential_maps: rotations of joints as exponential maps (frames, joints, 3), optional
+    :type exponential_maps: np.ndarray
+    """
+    joints: np.ndarray
+    skeleton: np.ndarray
+    fps: int
+    exponential_maps: np.ndarray = None
+    resampling_cache: dict = field(default_factory=dict, repr=False, compare=False)
+    skeleton_hierarchy: Skeleton = field(default=None, init=False, repr=False, compare=False)
+
+
+class CompactMotionCapture(MotionCaptureMethods):
+    """Immutable motion capture data with validated arrays.
+
+    Joints and exponential maps are converted into read-only arrays of the float dtype (float32 halves the memory
+    of float64), the skeleton into an int array. Wrong shapes or non-numeric data fail at loading.
+
+    :param joints: locations of joints (frames, joints, 3)
+    :type joints: np.ndarray
+    :param skeleton: skeleton (synonym jointsParent) (joints,)
+    :type skeleton: np.ndarray
+    :param fps: motion capture frames per second
+    :type fps: float
+    :param exponential_maps: rotations of joints as exponential maps (frames, joints, 3), optional
+    :type exponential_maps: np.ndarray
+    :param dtype: float dtype of joints and exponential maps, dtype of joints if they are float already by default
+    :type dtype: np.dtype
+    """
+    __slots__ = ('joints', 'skeleton', 'fps', 'exponential_maps', 'resampling_cache', 'skeleton_hierarchy')
+
+    def __init__(self, joints, skeleton, fps, exponential_maps=None, dtype=None):
+        if dtype is None:
+            joints_dtype = np.asarray(joints).dtype
+            dtype = joints_dtype if np.issubdtype(joints_dtype, np.floating) else np.float64
+        assert np.issubdtype(dtype, np.floating), 'dtype should be a float type.'
+        assert fps > 0, 'fps should be positive.'
+
+        joints = validate_array('joints', joints, (None, None, 3), dtype)
+        skeleton = validate_array('skeleton', np.reshape(skeleton, -1), (joints.shape[1],), np.int64)
+        if exponential_maps is not None:
+            exponential_maps = validate_array('exponential_maps', exponential_maps, joints.shape, dtype)
+
+        set_attribute = super().__setattr__
+        set_attribute('joints', joints)
+        set_attribute('skeleton', skeleton)
+        set_attribute('fps', fps)
+        set_attribute('exponential_maps', exponential_maps)
+        set_attribute('resampling_cache', {})
+        set_attribute('skeleton_hierarchy', None)
+
+    def __setattr__(self, name, value):
+        raise AttributeError('CompactMotionCapture is immutable.')
+
+    def __repr__(self):
+        return 'CompactMotionCapture(joints={}{}, fps={})'.format(self.joints.dtype, self.joints.shape, self.fps)
+
+    def __getstate__(self):
+        # Caches are rebuilt after unpickling
+        caches = ('resampling_cache', 'skeleton_hierarchy')
+        return {name: getattr(self, name) for name in self.__slots__ if name not in caches}
+
+    def __setstate__(self, state):
+        for name, value in state.items():
+            super().__setattr__(name, value)
+        super().__setattr__('resampling_cache', {})
+        super().__setattr__('skeleton_hierarchy', None)
+
+    @classmethod
+    def from_motion_capture(cls, motion_capture, dtype=None):
+        """Create the compact motion capture data from motion capture data.
+
+        :param motion_capture: motion capture data
+        :type motion_capture: MotionCapture
+        :param dtype: float dtype of joints and exponential maps
+        :type dtype: np.dtype
+        :return: compact motion capture data
+        :rtype: CompactMotionCapture
+        """
+        return cls(
+            motion_capture.joints,
+            motion_capture.skeleton,
+            motion_capture.fps,
+            motion_capture.exponential_maps,
+            dtype
+        )
@@ -0,0 +1,278 @@
+import os
+import json
+import numpy as np
+from common.motion_capture import MotionCapture
+
+INDEX_FILE_NAME = 'index.json'
+
+# Fields which have a value for every motion capture frame, they are stored as contiguous float32 arrays
+FRAME_FIELDS = ('joints_location', 'joints_exponential_mapping', 'root_translation')
+
+# Small per move fields, they are stored in the index
+MOVE_FIELDS = ('id', 'subject', 'joints_betas', 'joints_parent', 'description')
+
+
+def _to_json_value(value):
+    """Convert a value loaded from a .mat file into a JSON serializable value.
+
+    :param value: value
+    :return: JSON serializable value
+    """
+    if isinstance(value, np.ndarray):
+        return value.tolist()
+    if isinstance(value, np.generic):
+        return value.item()
+    return value
+
+
+def _get_field_path(store_path, field):
+    """Get path of the field's data file.
+
+    :param store_path: path of the store directory
+    :type store_path: str
+    :param field: name of the field
+    :type field: str
+    :return: path of the data file
+    :rtype: str
+    """
+    return os.path.join(store_path, field + '.f32')
+
+
+def _read_index(store_path):
+    """Read the index of the store.
+
+    :param store_path: path of the store directory
+    :type store_path: str
+    :return: index
+    :rtype: dict
+    """
+    with open(os.path.join(store_path, INDEX_FILE_NAME)) as file:
+        return json.load(file)
+
+
+class MotionStoreWriter:
+    """
+    Writer of the columnar motion capture store.
+
+    Every frame field of all moves is appended to a single float32 file and the index keeps
+    the offset and the length (in frames) of each (subject, move) and names of completely stored files.
+    The index is saved after every file, so an interrupted writing can be continued: data written after
+    the last saved index is truncated when the store is opened again (or by rollback).
+
+    :param store_path: path of the store directory
+    :type store_path: str
+    """
+
+    def __init__(self, store_path):
+        self.store_path = store_path
+        os.makedirs(store_path, exist_ok=True)
+
+        self.index = None
+        self.files = {field: open(_get_field_path(store_path, field), 'ab') for field in FRAME_FIELDS}
+        self.rollback()
+
+    def rollback(self):
+        """Drop everything added since the last flush (e.g. moves of a file which failed part-way).
+        """
+        if os.path.isfile(os.path.join(self.store_path, INDEX_FILE_NAME)):
+            self.index = _read_index(self.store_path)
+        else:
+            self.index = {'frames': 0, 'fields': {}, 'moves': [], 'files': []}
+        if 'files' not in self.index:
+            # Stores written before files were recorded, their moves were saved file by file
+            self.index['files'] = sorted({entry['name'].rsplit('_', 1)[0] for entry in self.index['moves']})
+
+        for field, file in self.files.items():
+            file.truncate(self.index['frames'] * self._get_frame_size(field))
+            file.seek(0, os.SEEK_END)
+
+    def _get_frame_size(self, field):
+        """Get size (in bytes) of a single frame of the field.
+
+        :param field: name of the field
+        :type field: str
+        :return: size in bytes
+        :rtype: int
+        """
+        if field not in self.index['fields']:
+            return 0
+        return int(np.prod(self.index['fields'][field]['shape'])) * np.dtype(np.float32).itemsize
+
+    def contains(self, subject, move):
+        """Check whether the move is already in the store.
+
+        :param subject: subject's number
+        :type subject: int
+        :param move: move's number (counted from 1)
+        :type move: int
+        :return: True if the move is stored
+        :rtype: bool
+        """
+        return any(entry['subject'] == subject and entry['move'] == move for entry in self.index['moves'])
+
+    def contains_file(self, file_name):
+        """Check whether all moves of the file are already in the store.
+
+        :param file_name: name of the file without the extension (e.g. F_amass_Subject_1)
+        :type file_name: str
+        :return: True if the file is stored
+        :rtype: bool
+        """
+        return file_name in self.index['files']
+
+    def add_file(self, file_name):
+        """Record that all moves of the file were added, the record is saved by the next flush.
+
+        :param file_name: name of the file without the extension (e.g. F_amass_Subject_1)
+        :type file_name: str
+        """
+        if file_name not in self.index['files']:
+            self.index['files'].append(file_name)
+
+    def add_move(self, subject, move, name, fields):
+        """Append a move to the store.
+
+        :param subject: subject's number
+        :type subject: int
+        :param move: move's number (counted from 1)
+        :type move: int
+        :param name: name of the move (e.g. F_amass_Subject_1_1)
+        :type name: str
+        :param fields: fields of the move (see FRAME_FIELDS and MOVE_FIELDS)
+        :type fields: dict
+        """
+        frames_num = np.shape(fields['joints_location'])[0]
+        for field in FRAME_FIELDS:
+            data = np.asarray(fields[field], dtype=np.float32)
+            if data.shape[0] != frames_num and data.shape[-1] == frames_num:
+                # E.g. root translation is stored as (3, frames) in AMASS files
+                data = data.T
+
+            frame_shape = list(data.shape[1:])
+            if field not in self.index['fields']:
+                self.index['fields'][field] = {'dtype': 'float32', 'shape': frame_shape}
+            assert self.index['fields'][field]['shape'] == frame_shape, \
+                'Shape of {} {} differs from the store {}.'.format(field, frame_shape, self.index['fields'][field]['shape'])
+
+            self.files[field].write(np.ascontiguousarray(data).tobytes())
+
+        entry = {
+            'subject': subject,
+            'move': move,
+            'name': name,
+            'offset': self.index['frames'],
+            'length': frames_num,
+            'fields': {field: _to_json_value(fields.get(field)) for field in MOVE_FIELDS},
+        }
+        self.index['moves'].append(entry)
+        self.index['frames'] = self.index['frames'] + frames_num
+
+    def flush(self):
+        """Flush the data files and save the index atomically.
+        """
+        for file in self.files.values():
+            file.flush()
+            os.fsync(file.fileno())
+
+        index_path = os.path.join(self.store_path, INDEX_FILE_NAME)
+        with open(index_path + '.tmp', 'w') as file:
+            json.dump(self.index, file)
+        os.replace(index_path + '.tmp', index_path)
+
+    def close(self, flush=True):
+        """Save everything and close the data files.
+
+        :param flush: save data added since the last flush, otherwise it's truncated by the next opening
+        :type flush: bool
+        """
+        if flush:
+            self.flush()
+        for file in self.files.values():
+            file.close()
+        self.files = {}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        # Moves of a file which failed part-way aren't saved, so the file is stored again by the next run
+        self.close(flush=exc_type is None)
+
+
+class MotionStore:
+    """
+    Reader of the columnar motion capture store.
+
+    Data files are memory mapped, so a move is a zero copy slice of them.
+
+    :param store_path: path of the store directory
+    :type store_path: str
+    """
+
+    def __init__(self, store_path):
+        self.store_path = store_path
+        self.index = _read_index(store_path)
+        self.moves = {(entry['subject'], entry['move']): entry for entry in self.index['moves']}
+        self.arrays = {}
+
+    def __len__(self):
+        return len(self.moves)
+
+    def __contains__(self, key):
+        return key in self.moves
+
+    def keys(self):
+        """Get keys of all stored moves.
+
+        :return: list of (subject, move)
+        :rtype: list of tuple
+        """
+        return list(self.moves.keys())
+
+    def get_array(self, field):
+        """Get memory mapped array of the whole field.
+
+        :param field: name of the field (see FRAME_FIELDS)
+        :type field: str
+        :return: array (all frames, ...)
+        :rtype: numpy.memmap
+        """
+        if self.index['frames'] == 0:
+            return np.empty([0] + self.index['fields'].get(field, {}).get('shape', []), dtype=np.float32)
+        if field not in self.arrays:
+            shape = tuple([self.index['frames']] + self.index['fields'][field]['shape'])
+            self.arrays[field] = np.memmap(_get_field_path(self.store_path, field), dtype=np.float32, mode='r', shape=shape)
+        return self.arrays[field]
+
+    def get_field(self, subject, move, field):
+        """Get a field of the move.
+
+        :param subject: subject's number
+        :type subject: int
+        :param move: move's number (counted from 1)
+        :type move: int
+        :param field: name of the field (see FRAME_FIELDS and MOVE_FIELDS)
+        :type field: str
+        :return: value of the field, frame fields are zero copy slices (frames, ...)
+        """
+        entry = self.moves[(subject, move)]
+        if field in FRAME_FIELDS:
+            return self.get_array(field)[entry['offset']:entry['offset'] + entry['length']]
+        return entry['fields'][field]
+
+    def get_motion_capture(self, subject, move, fps=120):
+        """Get motion capture data of the move.
+
+        :param subject: subject's number
+        :type subject: int
+        :param move: move's number (counted from 1)
+        :type move: int
+        :param fps: frames per second of the motion capture
+        :type fps: int
+        :return: motion capture data
+        :rtype: MotionCapture
+        """
+        joints = self.get_field(subject, move, 'joints_location')
+        skeleton = np.array(self.get_field(subject, move, 'joints_parent'))
+        exponential_maps = self.get_field(subject, move, 'joints_exponential_mapping')
+        return MotionCapture(joints, skeleton, fps, exponential_maps)
@@ -0,0 +1,194 @@
+import time
+import queue
+import threading
+from common import profiling
+
+DEFAULT_QUEUE_SIZE = 16
+
+# How often blocked stages check whether the pipeline was stopped
+POLL_SECONDS = 0.1
+
+# Marks the end of frames in queues
+END = object()
+
+
+class FramePipeline:
+    """
+    Decode, process and encode frames in parallel stages connected by bounded queues.
+
+    Frames are decoded by a background thread (iterating the frames), processed by the thread which runs
+    the pipeline (e.g. drawing and displaying, which has to stay in the main thread) and encoded by another
+    background thread. OpenCV releases the GIL while decoding and encoding, so the stages overlap.
+    A full queue blocks the stage before it (backpressure), so at most 2 * queue_size frames are in memory.
+
+    Busy time of every stage is added to the profiler as the stage (e.g. 'decode'), time of waiting for
+    the neighbouring stages as '<stage>_wait' (see get_busy_ratios).
+
+    :param frames: iterable of frames (e.g. a generator reading a video), it is iterated by the decoding thread
+    :type frames: iterable
+    :param process: function which gets a frame and returns the processed frame, optional
+    :type process: callable
+    :param write: function which encodes a frame, optional
+    :type write: callable
+    :param queue_size: maximum number of frames in each queue
+    :type queue_size: int
+    :param stage_names: names of decoding, processing and encoding stages
+    :type stage_names: tuple of str
+    """
+
+    def __init__(self, frames, process=None, write=None, queue_size=DEFAULT_QUEUE_SIZE,
+                 stage_names=('decode', 'process', 'encode')):
+        assert queue_size > 0, 'Queue size should be positive.'
+        self.frames = frames
+        self.process = process
+        self.write = write
+        self.queue_size = queue_size
+        self.stage_names = stage_names
+        self.stats = {name: {'seconds': 0., 'wait_seconds': 0., 'items': 0, 'bytes': 0} for name in stage_names}
+        self.stopped = threading.Event()
+        self.error = None
+
+    def stop(self):
+        """Stop all stages (e.g. when the user closes the player), frames in queues are dropped.
+        """
+        self.stopped.set()
+
+    def _fail(self, error):
+        if self.error is None:
+            self.error = error
+        self.stop()
+
+    def _put(self, frames_queue, item, stats):
+        start = time.perf_counter()
+        try:
+            while not self.stopped.is_set():
+                try:
+                    frames_queue.put(item, timeout=POLL_SECONDS)
+                    return True
+                except queue.Full:
+                    pass
+            return False
+        finally:
+            stats['wait_seconds'] = stats['wait_seconds'] + time.perf_counter() - start
+
+    def _get(self, frames_queue, stats):
+        start = time.perf_counter()
+        try:
+            while not self.stopped.is_set():
+                try:
+                    return frames_queue.get(timeout=POLL_SECONDS)
+                except queue.Empty:
+                    pass
+            return END
+        finally:
+            stats['wait_seconds'] = stats['wait_seconds'] + time.perf_counter() - start
+
+    def _decode(self, output_queue):
+        stats = self.stats[self.stage_names[0]]
+        try:
+            iterator = iter(self.frames)
+            while not self.stopped.is_set():
+                start = time.perf_counter()
+                frame = next(iterator, END)
+                stats['seconds'] = stats['seconds'] + time.perf_counter() - start
+                if frame is END:
+                    break
+                stats['items'] = stats['items'] + 1
+                stats['bytes'] = stats['bytes'] + frame.nbytes
+                if not self._put(output_queue, frame, stats):
+                    break
+        except Exception as error:
+            self._fail(error)
+        finally:
+            self._put(output_queue, END, stats)
+
+    def _encode(self, input_queue):
+        stats = self.stats[self.stage_names[2]]
+        try:
+            while True:
+                frame = self._get(input_queue, stats)
+                if frame is END:
+                    break
+                start = time.perf_counter()
+                self.write(frame)
+                stats['seconds'] = stats['seconds'] + time.perf_counter() - start
+                stats['items'] = stats['items'] + 1
+                stats['bytes'] = stats['bytes'] + frame.nbytes
+        except Exception as error:
+            self._fail(error)
+
+    def run(self):
+        """Run all stages until the frames end or the pipeline is stopped.
+
+        An exception of any stage stops the pipeline and is raised here.
+
+        :return: number of processed frames
+        :rtype: int
+        """
+        decoded_frames = queue.Queue(maxsize=self.queue_size)
+        processed_frames = queue.Queue(maxsize=self.queue_size) if self.write is not None else None
+        decoder = threading.Thread(target=self._decode, args=(decoded_frames,), daemon=True)
+        encoder = None
+        if processed_frames is not None:
+            encoder = threading.Thread(target=self._encode, args=(processed_frames,), daemon=True)
+            encoder.start()
+        decoder.start()
+
+        stats = self.stats[self.stage_names[1]]
+        try:
+            while True:
+                frame = self._get(decoded_frames, stats)
+                if frame is END:
+                    break
+                if self.process is not None:
+                    start = time.perf_counter()
+                    frame = self.process(frame)
+                    stats['seconds'] = stats['seconds'] + time.perf_counter() - start
+                stats['items'] = stats['items'] + 1
+                if processed_frames is not None and not self._put(processed_frames, frame, stats):
+                    break
+        except Exception as error:
+            self._fail(error)
+        except BaseException:
+            # e.g. KeyboardInterrupt, background stages mustn't stay blocked
+            self.stop()
+            raise
+        finally:
+            if processed_frames is not None:
+                self._put(processed_frames, END, stats)
+            decoder.join()
+            if encoder is not None:
+                encoder.join()
+            self._add_to_profiler()
+
+        if self.error is not None:
+            raise self.error
+        return stats['items']
+
+    def _get_used_stats(self):
+        # Processing and encoding stages without a function don't run
+        return {
+            name: stats for idx, (name, stats) in enumerate(self.stats.items())
+            if not ((idx == 1 and self.process is None) or (idx == 2 and self.write is None))
+        }
+
+    def _add_to_profiler(self):
+        # Only the thread which runs the pipeline adds measurements, the profiler isn't thread safe
+        for name, stats in self._get_used_stats().items():
+            profiling.PROFILER.add(name, stats['seconds'], stats['items'], stats['items'], stats['bytes'])
+            profiling.PROFILER.add(name + profiling.WAIT_SUFFIX, stats['wait_seconds'], 0)
+
+    def get_busy_ratios(self):
+        """Get how busy every stage was (busy time / (busy time + waiting time)).
+
+        The stage with the highest ratio is the bottleneck, e.g. a larger queue_size helps only stages which wait.
+        The profile report contains the same ratios summed over all pipelines (see Profiler.get_report).
+
+        :return: {stage: ratio}
+        :rtype: dict
+        """
+        ratios = {}
+        for name, stats in self._get_used_stats().items():
+            total_seconds = stats['seconds'] + stats['wait_seconds']
+            ratios[name] = stats['seconds'] / total_seconds if total_seconds > 0 else 0.
+        return ratios
@@ -0,0 +1,240 @@
+import os
+import json
+import time
+import logging
+import cProfile
+import resource
+from contextlib import contextmanager
+
+
+def get_peak_memory():
+    """Get peak resident set size of this process.
+
+    VmHWM is used on Linux, because ru_maxrss of a spawned process includes the peak of its parent.
+
+    :return: peak RSS in MiB
+    :rtype: float
+    """
+    if os.path.exists('/proc/self/status'):
+        with open('/proc/self/status') as file:
+            for line in file:
+                if line.startswith('VmHWM:'):
+                    return int(line.split()[1]) / 1024
+    # ru_maxrss is in KiB on Linux and in bytes on macOS
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+# Suffix of stages which measure waiting of a stage (e.g. 'decode_wait' of FramePipeline)
+WAIT_SUFFIX = '_wait'
+
+
+class Profiler:
+    """
+    Per stage timers and counters of a process.
+
+    Every stage (e.g. 'decode', 'encode') accumulates its time, number of calls, processed items
+    (e.g. frames) and bytes, so throughputs can be reported. Snapshots of worker processes
+    can be merged into the profiler of the main process.
+    """
+
+    def __init__(self):
+        self.stages = {}
+        self.counters = {}
+        self.peak_memory = 0.
+        self.pids = {os.getpid()}
+
+    def reset(self):
+        """Forget everything what was measured.
+        """
+        self.stages = {}
+        self.counters = {}
+        self.peak_memory = 0.
+        self.pids = {os.getpid()}
+
+    def add(self, name, seconds=0., calls=1, items=0, bytes_num=0):
+        """Add a measurement to a stage.
+
+        :param name: name of the stage
+        :type name: str
+        :param seconds: duration
+        :type seconds: float
+        :param calls: number of calls
+        :type calls: int
+        :param items: number of processed items (e.g. frames)
+        :type items: int
+        :param bytes_num: number of processed bytes
+        :type bytes_num: int
+        """
+        stage = self.stages.setdefault(name, {'seconds': 0., 'calls': 0, 'items': 0, 'bytes': 0})
+        stage['seconds'] = stage['seconds'] + seconds
+        stage['calls'] = stage['calls'] + calls
+        stage['items'] = stage['items'] + items
+        stage['bytes'] = stage['bytes'] + bytes_num
+
+    def count(self, name, value=1):
+        """Increase a counter.
+
+        :param name: name of the counter
+        :type name: str
+        :param value: increment
+        :type value: int
+        """
+        self.counters[name] = self.counters.get(name, 0) + value
+
+    @contextmanager
+    def stage(self, name, items=0, bytes_num=0):
+        """Measure a block of code as a stage.
+
+        :param name: name of the stage
+        :type name: str
+        :param items: number of processed items (e.g. frames)
+        :type items: int
+        :param bytes_num: number of processed bytes
+        :type bytes_num: int
+        """
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(name, time.perf_counter() - start, 1, items, bytes_num)
+
+    def iterate(self, name, iterable):
+        """Measure getting of every item of an iterable (e.g. decoding of frames) as a stage.
+
+        :param name: name of the stage
+        :type name: str
+        :param iterable: iterable
+        :type iterable: iterable
+        :return: generator of items
+        :rtype: generator
+        """
+        iterator = iter(iterable)
+        while True:
+            start = time.perf_counter()
+            try:
+                item = next(iterator)
+            except StopIteration:
+                self.add(name, time.perf_counter() - start, 0)
+                return
+            self.add(name, time.perf_counter() - start, 1, 1)
+            yield item
+
+    def snapshot(self):
+        """Get measurements of this process (e.g. to send them from a worker to the main process).
+
+        :return: measurements
+        :rtype: dict
+        """
+        return {
+            'stages': self.stages,
+            'counters': self.counters,
+            'peak_memory': max(self.peak_memory, get_peak_memory()),
+            'pids': sorted(self.pids),
+        }
+
+    def merge(self, snapshot):
+        """Merge measurements of another process.
+
+        :param snapshot: measurements (see snapshot)
+        :type snapshot: dict
+        """
+        for name, stage in snapshot['stages'].items():
+            self.add(name, stage['seconds'], stage['calls'], stage['items'], stage['bytes'])
+        for name, value in snapshot['counters'].items():
+            self.count(name, value)
+        self.peak_memory = max(self.peak_memory, snapshot['peak_memory'])
+        self.pids.update(snapshot['pids'])
+
+    def get_report(self, wall_seconds=None):
+        """Get the report of all measurements.
+
+        Times of stages are summed over processes, so with workers they can exceed the wall time.
+        Stages with a waiting stage ('<stage>_wait') also get their busy ratio (busy time / (busy time + waiting time)).
+
+        :param wall_seconds: wall time of the whole run
+        :type wall_seconds: float
+        :return: report
+        :rtype: dict
+        """
+        snapshot = self.snapshot()
+        stages = {}
+        for name, stage in sorted(snapshot['stages'].items(), key=lambda item: -item[1]['seconds']):
+            seconds = stage['seconds']
+            stages[name] = dict(
+                stage,
+                items_per_second=stage['items'] / seconds if seconds > 0 else None,
+                bytes_per_second=stage['bytes'] / seconds if seconds > 0 else None
+            )
+            wait_stage = snapshot['stages'].get(name + WAIT_SUFFIX)
+            if wait_stage is not None:
+                total_seconds = seconds + wait_stage['seconds']
+                stages[name]['busy_ratio'] = seconds / total_seconds if total_seconds > 0 else 0.
+        return {
+            'wall_seconds': wall_seconds,
+            'processes': len(snapshot['pids']),
+            # Peak of the process with the highest peak
+            'peak_memory_mib': snapshot['peak_memory'],
+            'stages': stages,
+            'counters': snapshot['counters'],
+        }
+
+
+# Profiler of this process
+PROFILER = Profiler()
+
+
+def stage(name, items=0, bytes_num=0):
+    """Measure a block of code as a stage of the profiler of this process (see Profiler.stage).
+
+    :param name: name of the stage
+    :type name: str
+    :param items: number of processed items (e.g. frames)
+    :type items: int
+    :param bytes_num: number of processed bytes
+    :type bytes_num: int
+    :return: context manager
+    """
+    return PROFILER.stage(name, items, bytes_num)
+
+
+def run_profiled(function, *args):
+    """Run a function in a worker process and return its measurements with the result.
+
+    :param function: function
+    :type function: callable
+    :param args: arguments of the function
+    :return: result of the function and measurements of the run (see Profiler.snapshot)
+    :rtype: tuple
+    """
+    # Workers of a pool run many jobs, every job reports only its own measurements
+    PROFILER.reset()
+    result = function(*args)
+    return result, PROFILER.snapshot()
+
+
+@contextmanager
+def profile_run(report_path=None, cprofile_path=None):
+    """Profile the run of a command.
+
+    :param report_path: path of the JSON report, it isn't saved if the path isn't set
+    :type report_path: str
+    :param cprofile_path: path of the cProfile dump (pstats) of this process, optional
+    :type cprofile_path: str
+    """
+    profile = cProfile.Profile() if cprofile_path else None
+    start = time.perf_counter()
+    if profile is not None:
+        profile.enable()
+    try:
+        yield PROFILER
+    finally:
+        if profile is not None:
+            profile.disable()
+            profile.dump_stats(cprofile_path)
+            logging.info('cProfile dump saved: ' + cprofile_path)
+
+        if report_path:
+            report = PROFILER.get_report(time.perf_counter() - start)
+            with open(report_path, 'w') as file:
+                json.dump(report, file, indent=2)
+            logging.info('Profile report saved: ' + report_path)
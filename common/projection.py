@@ -0,0 +1,125 @@
+import numpy as np
+from common.camera import Camera, CompactCamera
+
+
+def get_extrinsic_matrix(camera):
+    """Get camera's extrinsic matrix (rotation matrix stacked with translation vector).
+
+    :param camera: camera's params
+    :type camera: Camera
+    :return: extrinsic matrix (4, 3)
+    :rtype: numpy.ndarray
+    """
+    translation_vector = np.reshape(camera.translation_vector, (1, 3))
+    return np.concatenate((camera.rotation_matrix, translation_vector), axis=0)
+
+
+def get_camera_matrix(camera):
+    """Get camera's matrix which projects homogeneous world points to the image plane.
+
+    Points are row vectors (MATLAB convention): [x, y, z, 1] * matrix = [u * w, v * w, w].
+
+    The matrix cached by the camera (see CompactCamera) is used if there is one.
+
+    :param camera: camera's params
+    :type camera: Camera or CompactCamera
+    :return: camera matrix (4, 3)
+    :rtype: numpy.ndarray
+    """
+    projection_matrix = getattr(camera, 'projection_matrix', None)
+    if projection_matrix is not None:
+        return projection_matrix
+    return np.dot(get_extrinsic_matrix(camera), camera.intrinsic_matrix)
+
+
+def to_homogeneous(points):
+    """Append a column of ones to the points.
+
+    :param points: points (..., 3)
+    :type points: numpy.ndarray
+    :return: homogeneous points (..., 4)
+    :rtype: numpy.ndarray
+    """
+    ones = np.ones(points.shape[:-1] + (1,), dtype=points.dtype)
+    return np.concatenate((points, ones), axis=-1)
+
+
+def distort_points(normalized_points, radial_distortion=None, tangential_distortion=None):
+    """Apply lens distortion to normalized image points.
+
+    Uses the same model as MATLAB's cameraParameters (2 or 3 radial coefficients
+    and 2 tangential coefficients).
+
+    :param normalized_points: normalized image points (..., 2)
+    :type normalized_points: numpy.ndarray
+    :param radial_distortion: radial distortion coefficients [k1, k2(, k3)]
+    :type radial_distortion: numpy.ndarray
+    :param tangential_distortion: tangential distortion coefficients [p1, p2]
+    :type tangential_distortion: numpy.ndarray
+    :return: distorted normalized image points (..., 2)
+    :rtype: numpy.ndarray
+    """
+    x = normalized_points[..., 0]
+    y = normalized_points[..., 1]
+    r2 = x * x + y * y
+
+    radial = np.ones_like(r2)
+    if radial_distortion is not None:
+        r_power = np.ones_like(r2)
+        for k in np.ravel(radial_distortion):
+            r_power = r_power * r2
+            radial = radial + k * r_power
+
+    x_distorted = x * radial
+    y_distorted = y * radial
+    if tangential_distortion is not None:
+        p1, p2 = np.ravel(tangential_distortion)[:2]
+        x_distorted = x_distorted + 2 * p1 * x * y + p2 * (r2 + 2 * x * x)
+        y_distorted = y_distorted + p1 * (r2 + 2 * y * y) + 2 * p2 * x * y
+
+    return np.stack((x_distorted, y_distorted), axis=-1)
+
+
+def project_points(world_points, cameras, dtype=float, distort=False):
+    """Project world 3D points to the image plane of one or many cameras in one pass.
+
+    :param world_points: world points of any shape ending with 3, e.g. (frames, joints, 3)
+    :type world_points: numpy.ndarray
+    :param cameras: camera's params or a list of them
+    :type cameras: Camera or list of Camera
+    :param dtype: type of the output, int truncates the same way as the former per point loop
+    :type dtype: type
+    :param distort: apply camera's lens distortion (if the camera has its coefficients)
+    :type distort: bool
+    :return: image plane points (..., 2) for a single camera,
+        (cameras, ..., 2) for a list of cameras
+    :rtype: numpy.ndarray
+    """
+    single_camera = isinstance(cameras, (Camera, CompactCamera))
+    cameras = [cameras] if single_camera else list(cameras)
+
+    world_points = np.asarray(world_points, dtype=np.float64)
+    shape = world_points.shape[:-1]
+    homogeneous = to_homogeneous(world_points.reshape(-1, 3))
+
+    if distort:
+        extrinsic_matrices = np.stack([get_extrinsic_matrix(camera) for camera in cameras])
+        camera_points = np.matmul(homogeneous, extrinsic_matrices)
+        normalized_points = camera_points[..., :2] / camera_points[..., 2:]
+
+        image_points = np.empty(normalized_points.shape, dtype=np.float64)
+        for idx, camera in enumerate(cameras):
+            distorted_points = distort_points(
+                normalized_points[idx],
+                getattr(camera, 'radial_distortion', None),
+                getattr(camera, 'tangential_distortion', None)
+            )
+            intrinsic_matrix = np.asarray(camera.intrinsic_matrix, dtype=np.float64)
+            image_points[idx] = np.dot(distorted_points, intrinsic_matrix[:2, :2]) + intrinsic_matrix[2, :2]
+    else:
+        camera_matrices = np.stack([get_camera_matrix(camera) for camera in cameras])
+        projected_points = np.matmul(homogeneous, camera_matrices)
+        image_points = projected_points[..., :2] / projected_points[..., 2:]
+
+    image_points = image_points.reshape((len(cameras),) + shape + (2,)).astype(dtype)
+    return image_points[0] if single_camera else image_points
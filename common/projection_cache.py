@@ -0,0 +1,145 @@
+import os
+import hashlib
+from collections import OrderedDict
+import numpy as np
+from common import utils
+
+# Bump when the projection changes, so old cached points are not used
+CACHE_VERSION = 1
+
+DEFAULT_CACHE_DIR = os.path.join(os.path.expanduser('~'), '.cache', 'movi-dataset-toolkit', 'projections')
+
+
+def hash_file(path, chunk_size=1 << 20):
+    """Hash the content of the file.
+
+    :param path: path to the file
+    :type path: str
+    :param chunk_size: size of the chunks which are read
+    :type chunk_size: int
+    :return: SHA-1 hex digest
+    :rtype: str
+    """
+    sha1 = hashlib.sha1()
+    with open(path, 'rb') as file:
+        for chunk in iter(lambda: file.read(chunk_size), b''):
+            sha1.update(chunk)
+    return sha1.hexdigest()
+
+
+class ProjectionCache:
+    """
+    Cache of motion capture joints projected to the image plane.
+
+    Projected points are kept in an in-memory LRU and (optionally) on the disk. The key is a hash
+    of the motion capture file, both calibration files and the target fps, so changed files are
+    never served from the cache.
+
+    :param cache_dir: directory of the cached points, None - in-memory only
+    :type cache_dir: str
+    :param max_items: maximum number of projections kept in memory
+    :type max_items: int
+    """
+
+    def __init__(self, cache_dir=DEFAULT_CACHE_DIR, max_items=16):
+        self.cache_dir = cache_dir
+        self.max_items = max_items
+        self.items = OrderedDict()
+        self.file_hashes = {}
+
+    def _hash_file(self, path):
+        """Hash the file, hashes are remembered while the file is not modified.
+
+        :param path: path to the file
+        :type path: str
+        :return: SHA-1 hex digest
+        :rtype: str
+        """
+        stat = os.stat(path)
+        key = (os.path.abspath(path), stat.st_size, stat.st_mtime)
+        if key not in self.file_hashes:
+            self.file_hashes[key] = hash_file(path)
+        return self.file_hashes[key]
+
+    def get_key(self, motion_capture_path, extrinsic_data_path, camera_data_path, fps=30, method=None):
+        """Get key of the projection.
+
+        :param motion_capture_path: path to the motion capture file
+        :type motion_capture_path: str
+        :param extrinsic_data_path: path of the extrinsic data
+        :type extrinsic_data_path: str
+        :param camera_data_path: path of the camera's data
+        :type camera_data_path: str
+        :param fps: video frames per second
+        :type fps: float
+        :param method: resampling method (see utils.adapt_motion_data_for_video), optional
+        :type method: str
+        :return: key
+        :rtype: str
+        """
+        params = 'v{}-fps{}'.format(CACHE_VERSION, fps) + ('-' + method if method is not None else '')
+        sha1 = hashlib.sha1(params.encode('utf-8'))
+        for path in (motion_capture_path, extrinsic_data_path, camera_data_path):
+            sha1.update(self._hash_file(path).encode('utf-8'))
+        return sha1.hexdigest()
+
+    def _remember(self, key, image_points):
+        """Put points into the in-memory LRU.
+
+        :param key: key of the projection
+        :type key: str
+        :param image_points: projected points
+        :type image_points: numpy.ndarray
+        """
+        self.items[key] = image_points
+        self.items.move_to_end(key)
+        while len(self.items) > self.max_items:
+            self.items.popitem(last=False)
+
+    def get(self, motion_capture_path, extrinsic_data_path, camera_data_path, fps=30, method=None):
+        """Get projected points, they are computed only if they are not cached.
+
+        :param motion_capture_path: path to the motion capture file
+        :type motion_capture_path: str
+        :param extrinsic_data_path: path of the extrinsic data
+        :type extrinsic_data_path: str
+        :param camera_data_path: path of the camera's data
+        :type camera_data_path: str
+        :param fps: video frames per second
+        :type fps: float
+        :param method: resampling method (see utils.adapt_motion_data_for_video), optional
+        :type method: str
+        :return: image plane points (video frames, motion points, 2)
+        :rtype: np.ndarray
+        """
+        key = self.get_key(motion_capture_path, extrinsic_data_path, camera_data_path, fps, method)
+        if key in self.items:
+            self.items.move_to_end(key)
+            return self.items[key]
+
+        cache_path = os.path.join(self.cache_dir, key + '.npy') if self.cache_dir else None
+        if cache_path is not None and os.path.isfile(cache_path):
+            image_points = np.load(cache_path)
+        else:
+            camera = utils.read_camera_params(extrinsic_data_path, camera_data_path)
+            motion_capture = utils.read_motion_capture_data(motion_capture_path)
+            image_points = utils.adapt_motion_data_for_video(motion_capture, camera, fps, method=method)
+
+            if cache_path is not None:
+                os.makedirs(self.cache_dir, exist_ok=True)
+                temp_path = cache_path + '.tmp.npy'
+                np.save(temp_path, image_points)
+                os.replace(temp_path, cache_path)
+
+        image_points.setflags(write=False)
+        self._remember(key, image_points)
+        return image_points
+
+    def clear(self):
+        """Remove all cached points (in memory and on the disk).
+        """
+        self.items = OrderedDict()
+        if self.cache_dir and os.path.isdir(self.cache_dir):
+            for file_name in os.listdir(self.cache_dir):
+                if file_name.endswith('.npy'):
+                    os.remove(os.path.join(self.cache_dir, file_name))
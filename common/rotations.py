@@ -0,0 +1,60 @@
+import numpy as np
+
+
+def exponential_map_to_quaternion(exponential_maps):
+    """Convert exponential maps (axis * angle) to unit quaternions.
+
+    :param exponential_maps: exponential maps (..., 3)
+    :type exponential_maps: np.ndarray
+    :return: quaternions [w, x, y, z] (..., 4), w is never negative
+    :rtype: np.ndarray
+    """
+    angles = np.linalg.norm(exponential_maps, axis=-1, keepdims=True)
+    # sin(angle / 2) / angle, which is also defined for zero angles
+    scale = 0.5 * np.sinc(angles / (2 * np.pi))
+    return np.concatenate((np.cos(angles / 2), exponential_maps * scale), axis=-1)
+
+
+def quaternion_to_exponential_map(quaternions):
+    """Convert unit quaternions to exponential maps (axis * angle).
+
+    :param quaternions: quaternions [w, x, y, z] (..., 4)
+    :type quaternions: np.ndarray
+    :return: exponential maps (..., 3)
+    :rtype: np.ndarray
+    """
+    quaternions = np.where(quaternions[..., :1] < 0, -quaternions, quaternions)
+    vectors = quaternions[..., 1:]
+    sines = np.linalg.norm(vectors, axis=-1, keepdims=True)
+    angles = 2 * np.arctan2(sines, quaternions[..., :1])
+    # angle / sin(angle / 2) tends to 2 when the angle tends to zero
+    scale = np.where(sines > 1e-12, angles / np.maximum(sines, 1e-12), 2.)
+    return vectors * scale
+
+
+def slerp(quaternions_from, quaternions_to, weights):
+    """Spherical linear interpolation of unit quaternions.
+
+    :param quaternions_from: quaternions [w, x, y, z] (..., 4)
+    :type quaternions_from: np.ndarray
+    :param quaternions_to: quaternions [w, x, y, z] (..., 4)
+    :type quaternions_to: np.ndarray
+    :param weights: weights of quaternions_to, broadcastable to (..., 1)
+    :type weights: np.ndarray
+    :return: interpolated quaternions (..., 4)
+    :rtype: np.ndarray
+    """
+    dots = np.sum(quaternions_from * quaternions_to, axis=-1, keepdims=True)
+    # Take the shorter arc
+    quaternions_to = np.where(dots < 0, -quaternions_to, quaternions_to)
+    dots = np.clip(np.abs(dots), 0., 1.)
+
+    angles = np.arccos(dots)
+    sines = np.sin(angles)
+    close = sines < 1e-6
+    safe_sines = np.where(close, 1., sines)
+    weights_from = np.where(close, 1 - weights, np.sin((1 - weights) * angles) / safe_sines)
+    weights_to = np.where(close, weights, np.sin(weights * angles) / safe_sines)
+
+    quaternions = weights_from * quaternions_from + weights_to * quaternions_to
+    return quaternions / np.linalg.norm(quaternions, axis=-1, keepdims=True)
@@ -0,0 +1,347 @@
+import io
+import os
+import json
+import tarfile
+import cv2
+import numpy as np
+
+FRAME_ENCODINGS = ('jpeg', 'png', 'raw')
+
+# Extensions of frames in shards for each encoding
+FRAME_EXTENSIONS = {'jpeg': 'jpg', 'png': 'png', 'raw': 'npy'}
+
+SHARDS_INDEX_FILE_NAME = 'shards.json'
+SHARD_NAME_FORMAT = 'shard-{:06d}.tar'
+SHARD_INDEX_EXTENSION = '.index.json'
+
+# Shards are read sequentially in chunks of this size
+READ_BUFFER_SIZE = 1 << 22
+
+
+def encode_frame(frame, encoding='jpeg', jpeg_quality=95):
+    """Encode a frame for a shard.
+
+    :param frame: BGR frame (height, width, 3)
+    :type frame: np.ndarray
+    :param encoding: 'jpeg', 'png' or 'raw' (.npy)
+    :type encoding: str
+    :param jpeg_quality: quality of JPEG (0-100)
+    :type jpeg_quality: int
+    :return: encoded frame
+    :rtype: bytes
+    """
+    if encoding == 'raw':
+        return encode_array(frame)
+
+    params = [cv2.IMWRITE_JPEG_QUALITY, jpeg_quality] if encoding == 'jpeg' else []
+    ret, data = cv2.imencode('.' + FRAME_EXTENSIONS[encoding], frame, params)
+    assert ret, 'Frame couldn\'t be encoded as {}.'.format(encoding)
+    return data.tobytes()
+
+
+def decode_frame(data, encoding='jpeg'):
+    """Decode a frame of a shard.
+
+    :param data: encoded frame
+    :type data: bytes
+    :param encoding: 'jpeg', 'png' or 'raw' (.npy)
+    :type encoding: str
+    :return: BGR frame (height, width, 3)
+    :rtype: np.ndarray
+    """
+    if encoding == 'raw':
+        return decode_array(data)
+    return cv2.imdecode(np.frombuffer(data, dtype=np.uint8), cv2.IMREAD_COLOR)
+
+
+def encode_array(array):
+    """Encode an array as .npy.
+
+    :param array: array
+    :type array: np.ndarray
+    :return: .npy file's content
+    :rtype: bytes
+    """
+    buffer = io.BytesIO()
+    np.save(buffer, np.ascontiguousarray(array), allow_pickle=False)
+    return buffer.getvalue()
+
+
+def decode_array(data):
+    """Decode an .npy array.
+
+    :param data: .npy file's content
+    :type data: bytes
+    :return: array
+    :rtype: np.ndarray
+    """
+    return np.load(io.BytesIO(data), allow_pickle=False)
+
+
+def get_tar_size(offset):
+    """Get size of a tar file closed after the given offset of its last member.
+
+    Closing appends two zero blocks (end of the archive) and pads the file to a multiple of tarfile.RECORDSIZE.
+
+    :param offset: end of the last member in bytes
+    :type offset: int
+    :return: size of the file in bytes
+    :rtype: int
+    """
+    return -(-(offset + 2 * tarfile.BLOCKSIZE) // tarfile.RECORDSIZE) * tarfile.RECORDSIZE
+
+
+class ShardWriter:
+    """
+    Writer of samples into WebDataset-style tar shards.
+
+    Members of a sample share the key: <key>.jpg|png|npy (frame), <key>.joints.npy (3D joints),
+    <key>.points.npy (2D joints) and <key>.description.txt. A new shard is started when the current one
+    would exceed the size or reaches the number of samples, a sample is never split between shards.
+    Every shard gets an index with offsets of members (<shard>.index.json), shards.json lists all shards.
+
+    :param output_path: path of the output directory
+    :type output_path: str
+    :param encoding: encoding of frames: 'jpeg', 'png' or 'raw'
+    :type encoding: str
+    :param max_size: maximum size of a shard file in bytes, only a shard of a single larger sample exceeds it
+    :type max_size: int
+    :param max_samples: maximum number of samples of a shard, unlimited by default
+    :type max_samples: int
+    :param jpeg_quality: quality of JPEG (0-100)
+    :type jpeg_quality: int
+    """
+
+    def __init__(self, output_path, encoding='jpeg', max_size=1 << 30, max_samples=None, jpeg_quality=95):
+        assert encoding in FRAME_ENCODINGS, 'Encoding should be one of {}.'.format(FRAME_ENCODINGS)
+        self.output_path = output_path
+        self.encoding = encoding
+        self.max_size = max_size
+        self.max_samples = max_samples
+        self.jpeg_quality = jpeg_quality
+
+        self.shards = []
+        self.tar = None
+        self.shard_index = None
+        os.makedirs(output_path, exist_ok=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def _open_shard(self):
+        """Start a new shard.
+        """
+        name = SHARD_NAME_FORMAT.format(len(self.shards))
+        self.tar = tarfile.open(os.path.join(self.output_path, name), 'w', format=tarfile.USTAR_FORMAT)
+        self.shard_index = {'keys': [], 'members': {}}
+        self.shards.append({'name': name, 'samples': 0})
+
+    def _close_shard(self):
+        """Finish the current shard and write its index.
+        """
+        if self.tar is None:
+            return
+
+        self.tar.close()
+        index_path = os.path.join(self.output_path, self.shards[-1]['name'] + SHARD_INDEX_EXTENSION)
+        with open(index_path, 'w') as file:
+            json.dump(self.shard_index, file)
+        self.tar = None
+        self.shard_index = None
+
+    def _add_member(self, name, data):
+        """Add a file into the current shard.
+
+        :param name: name of the file
+        :type name: str
+        :param data: content of the file
+        :type data: bytes
+        :return: offset of the content in the shard and its size
+        :rtype: list of int
+        """
+        info = tarfile.TarInfo(name)
+        info.size = len(data)
+        offset = self.tar.offset + len(info.tobuf(self.tar.format, self.tar.encoding, self.tar.errors))
+        self.tar.addfile(info, io.BytesIO(data))
+        return [offset, len(data)]
+
+    def write(self, key, frame, joints, image_points, description=''):
+        """Write a sample.
+
+        :param key: unique key of the sample without dots (e.g. F_PG1_Subject_1_L_1_000042)
+        :type key: str
+        :param frame: BGR frame (height, width, 3)
+        :type frame: np.ndarray
+        :param joints: 3D joints (joints, 3)
+        :type joints: np.ndarray
+        :param image_points: 2D joints (joints, 2)
+        :type image_points: np.ndarray
+        :param description: description of the move
+        :type description: str
+        """
+        assert '.' not in key, 'Key {} shouldn\'t contain dots.'.format(key)
+        members = {
+            FRAME_EXTENSIONS[self.encoding]: encode_frame(frame, self.encoding, self.jpeg_quality),
+            'joints.npy': encode_array(joints),
+            'points.npy': encode_array(image_points),
+            'description.txt': str(description).encode('utf-8'),
+        }
+
+        # Every member has a 512 bytes header and its content is padded to 512 bytes
+        sample_size = sum(
+            tarfile.BLOCKSIZE + -(-len(data) // tarfile.BLOCKSIZE) * tarfile.BLOCKSIZE for data in members.values()
+        )
+        shard_full = self.tar is not None and self.shards[-1]['samples'] > 0 and (
+            get_tar_size(self.tar.offset + sample_size) > self.max_size or
+            (self.max_samples is not None and self.shards[-1]['samples'] >= self.max_samples)
+        )
+        if shard_full:
+            self._close_shard()
+        if self.tar is None:
+            self._open_shard()
+
+        self.shard_index['keys'].append(key)
+        for extension, data in members.items():
+            offset = self._add_member(key + '.' + extension, data)
+            self.shard_index['members'].setdefault(extension, []).append(offset)
+        self.shards[-1]['samples'] = self.shards[-1]['samples'] + 1
+
+    def close(self):
+        """Finish the last shard and write the list of shards.
+        """
+        self._close_shard()
+        with open(os.path.join(self.output_path, SHARDS_INDEX_FILE_NAME), 'w') as file:
+            json.dump({'encoding': self.encoding, 'shards': self.shards}, file, indent=2)
+
+
+class ShardReader:
+    """
+    Reader of shards written by ShardWriter.
+
+    Shards can be read sequentially (iter_shard, with large sequential reads) or samples can be
+    accessed randomly by the global index (a single read per member thanks to shard indexes).
+
+    :param shards_path: path of the directory of shards
+    :type shards_path: str
+    """
+
+    def __init__(self, shards_path):
+        self.shards_path = shards_path
+        with open(os.path.join(shards_path, SHARDS_INDEX_FILE_NAME)) as file:
+            data = json.load(file)
+        self.encoding = data['encoding']
+        self.shards = data['shards']
+        self.offsets = np.concatenate(([0], np.cumsum([shard['samples'] for shard in self.shards]))).astype(int)
+        self.shard_indexes = {}
+        self.files = {}
+
+    def __len__(self):
+        return int(self.offsets[-1])
+
+    def __getstate__(self):
+        # Open files can't be pickled (e.g. for spawned DataLoader workers)
+        state = self.__dict__.copy()
+        state['files'] = {}
+        return state
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def close(self):
+        """Close open shards.
+        """
+        for file in self.files.values():
+            file.close()
+        self.files = {}
+
+    def get_shard_path(self, shard_idx):
+        """Get path of a shard.
+
+        :param shard_idx: index of the shard
+        :type shard_idx: int
+        :return: path of the shard
+        :rtype: str
+        """
+        return os.path.join(self.shards_path, self.shards[shard_idx]['name'])
+
+    def get_shard_index(self, shard_idx):
+        """Get index of a shard (keys and offsets of members).
+
+        :param shard_idx: index of the shard
+        :type shard_idx: int
+        :return: {'keys': list of str, 'members': {extension: [[offset, size],...]}}
+        :rtype: dict
+        """
+        if shard_idx not in self.shard_indexes:
+            with open(self.get_shard_path(shard_idx) + SHARD_INDEX_EXTENSION) as file:
+                self.shard_indexes[shard_idx] = json.load(file)
+        return self.shard_indexes[shard_idx]
+
+    def to_sample(self, key, members):
+        """Decode members of a sample.
+
+        :param key: key of the sample
+        :type key: str
+        :param members: {extension: content}
+        :type members: dict
+        :return: {'key', 'frame' (BGR), 'joints', 'image_points', 'description'}
+        :rtype: dict
+        """
+        return {
+            'key': key,
+            'frame': decode_frame(members[FRAME_EXTENSIONS[self.encoding]], self.encoding),
+            'joints': decode_array(members['joints.npy']),
+            'image_points': decode_array(members['points.npy']),
+            'description': members['description.txt'].decode('utf-8'),
+        }
+
+    def __getitem__(self, idx):
+        if idx < 0:
+            idx = len(self) + idx
+        if not 0 <= idx < len(self):
+            raise IndexError('Index {} is out of range.'.format(idx))
+
+        shard_idx = int(np.searchsorted(self.offsets, idx, side='right')) - 1
+        sample_idx = idx - int(self.offsets[shard_idx])
+        shard_index = self.get_shard_index(shard_idx)
+
+        if shard_idx not in self.files:
+            self.files[shard_idx] = open(self.get_shard_path(shard_idx), 'rb')
+        file = self.files[shard_idx]
+
+        members = {}
+        for extension, offsets in shard_index['members'].items():
+            offset, size = offsets[sample_idx]
+            file.seek(offset)
+            members[extension] = file.read(size)
+        return self.to_sample(shard_index['keys'][sample_idx], members)
+
+    def iter_shard(self, shard_idx):
+        """Read samples of a shard sequentially.
+
+        :param shard_idx: index of the shard
+        :type shard_idx: int
+        :return: generator of samples (see to_sample)
+        :rtype: generator of dict
+        """
+        key, members = None, {}
+        with tarfile.open(self.get_shard_path(shard_idx), 'r|', bufsize=READ_BUFFER_SIZE) as tar:
+            for info in tar:
+                member_key, extension = info.name.split('.', 1)
+                if member_key != key and key is not None:
+                    yield self.to_sample(key, members)
+                    members = {}
+                key = member_key
+                members[extension] = tar.extractfile(info).read()
+        if key is not None:
+            yield self.to_sample(key, members)
+
+    def __iter__(self):
+        for shard_idx in range(len(self.shards)):
+            yield from self.iter_shard(shard_idx)
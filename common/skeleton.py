@@ -0,0 +1,145 @@
+from collections import deque
+import numpy as np
+
+
+def get_bone_pairs(skeleton):
+    """Get bones of the skeleton as pairs of joint indexes.
+
+    :param skeleton: skeleton (synonym jointsParent), parents are counted from 1, the first joint is the root
+    :type skeleton: np.ndarray
+    :return: bones (bones, 2) - [parent index, child index]
+    :rtype: np.ndarray
+    """
+    skeleton = np.asarray(skeleton, dtype=int).ravel()
+    children = np.arange(1, skeleton.shape[0])
+    return np.stack((skeleton[1:] - 1, children), axis=1)
+
+
+class Skeleton:
+    """
+    Precomputed hierarchy of joints and vectorized kinematics of whole sequences.
+
+    All functions work on joints of any number of frames at once (frames, joints, 3).
+
+    :param skeleton: skeleton (synonym jointsParent), parents are counted from 1, the first joint is the root
+    :type skeleton: np.ndarray
+    """
+
+    def __init__(self, skeleton):
+        skeleton = np.asarray(skeleton, dtype=int).ravel()
+        joints_num = skeleton.shape[0]
+        assert joints_num > 0, 'Skeleton should have at least one joint.'
+
+        self.root = 0
+        self.parents = skeleton - 1
+        self.parents[self.root] = -1
+        assert np.all((self.parents[1:] >= 0) & (self.parents[1:] < joints_num)), \
+            'Parents of joints should be joints of the skeleton.'
+        self.bone_pairs = get_bone_pairs(skeleton)
+
+        # Children of all joints in one array, children of the joint j are children[offsets[j]:offsets[j + 1]]
+        children = np.argsort(self.parents[1:], kind='stable') + 1
+        self.children = children
+        self.children_offsets = np.searchsorted(self.parents[children], np.arange(joints_num + 1))
+
+        self.order = self._get_topological_order()
+        assert self.order.shape[0] == joints_num, 'Skeleton should be a tree (every joint reachable from the root).'
+        self.levels = np.zeros(joints_num, dtype=int)
+        for joint in self.order[1:]:
+            self.levels[joint] = self.levels[self.parents[joint]] + 1
+
+    def __len__(self):
+        return self.parents.shape[0]
+
+    def _get_topological_order(self):
+        # Every joint has a single parent, so joints which aren't reachable from the root form cycles
+        order = []
+        queue = deque([self.root])
+        while queue:
+            joint = queue.popleft()
+            order.append(joint)
+            queue.extend(self.get_children(joint))
+        return np.array(order, dtype=int)
+
+    def get_children(self, joint):
+        """Get children of a joint.
+
+        :param joint: index of the joint
+        :type joint: int
+        :return: indexes of children
+        :rtype: np.ndarray
+        """
+        return self.children[self.children_offsets[joint]:self.children_offsets[joint + 1]]
+
+    def get_bones(self, joints):
+        """Get bone vectors (from the parent to the child) of all frames.
+
+        :param joints: joints (..., joints, 3)
+        :type joints: np.ndarray
+        :return: bones (..., bones, 3) in the order of bone_pairs
+        :rtype: np.ndarray
+        """
+        return joints[..., self.bone_pairs[:, 1], :] - joints[..., self.bone_pairs[:, 0], :]
+
+    def get_bone_lengths(self, joints):
+        """Get bone lengths of all frames.
+
+        :param joints: joints (..., joints, 3)
+        :type joints: np.ndarray
+        :return: lengths (..., bones) in the order of bone_pairs
+        :rtype: np.ndarray
+        """
+        return np.linalg.norm(self.get_bones(joints), axis=-1)
+
+    def get_root_relative(self, joints):
+        """Get joints relative to the root joint of their frame.
+
+        :param joints: joints (..., joints, 3)
+        :type joints: np.ndarray
+        :return: joints (..., joints, 3), the root is at the origin
+        :rtype: np.ndarray
+        """
+        return joints - joints[..., self.root:self.root + 1, :]
+
+    def normalize(self, joints, per_frame=False):
+        """Get root relative joints scaled by the size of the skeleton (sum of bone lengths).
+
+        :param joints: joints (frames, joints, 3)
+        :type joints: np.ndarray
+        :param per_frame: scale every frame by its own size instead of the mean size of the sequence
+        :type per_frame: bool
+        :return: normalized joints (frames, joints, 3) and scales (frames,)
+        :rtype: tuple of np.ndarray
+        """
+        sizes = self.get_bone_lengths(joints).sum(axis=-1)
+        scales = sizes if per_frame else np.full(sizes.shape, sizes.mean() if sizes.size > 0 else 1.)
+        scales = np.where(scales > 0, scales, 1.)
+        return self.get_root_relative(joints) / scales[:, np.newaxis, np.newaxis], scales
+
+
+def get_velocities(joints, fps):
+    """Get velocities of joints (central differences, one-sided at the ends).
+
+    :param joints: joints (frames, joints, 3)
+    :type joints: np.ndarray
+    :param fps: frames per second
+    :type fps: float
+    :return: velocities (frames, joints, 3) in units per second
+    :rtype: np.ndarray
+    """
+    if joints.shape[0] < 2:
+        return np.zeros(joints.shape)
+    return np.gradient(joints, 1 / fps, axis=0)
+
+
+def get_accelerations(joints, fps):
+    """Get accelerations of joints.
+
+    :param joints: joints (frames, joints, 3)
+    :type joints: np.ndarray
+    :param fps: frames per second
+    :type fps: float
+    :return: accelerations (frames, joints, 3) in units per second^2
+    :rtype: np.ndarray
+    """
+    return get_velocities(get_velocities(joints, fps), fps)
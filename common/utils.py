@@ -1,66 +1,85 @@
-import re
-import glob
 import numpy as np
-import skvideo.io
-from pathlib import Path
-from common.camera import Camera
-from common.motion_capture import MotionCapture
+from common import projection
+from common.catalog import DatasetCatalog, parse_file_name
+from common.camera import Camera, CompactCamera
+from common.motion_capture import CompactMotionCapture, MotionCapture
+from common.motion_store import MotionStore
+from common.video_reader import VideoReader
 
 
-def convert_world_points_to_image_points(camera, world_points):
+def convert_world_points_to_image_points(camera, world_points, dtype=int, distort=False):
     """Convert world 3D points to image plane points.
 
     :param camera: camera's params
     :type camera: Camera
     :param world_points: World points (size, 3)
     :type world_points: numpy.ndarray
+    :param dtype: type of the output
+    :type dtype: type
+    :param distort: apply camera's lens distortion
+    :type distort: bool
     :return: image plane points (size, 2)
     :rtype: numpy.ndarray of ints
     """
-    translation_vector_expand = np.expand_dims(camera.translation_vector, axis=0)
-    rot_tran_matrix = np.concatenate((camera.rotation_matrix, translation_vector_expand), axis=0)
-    camera_matrix = np.dot(rot_tran_matrix, camera.intrinsic_matrix)
-    image_points = np.zeros((world_points.shape[0], 2), dtype=int)
+    return projection.project_points(world_points, camera, dtype=dtype, distort=distort)
 
-    for idx, val in enumerate(world_points):
-        temp_matrix = np.append(val, 1)
-        result = np.dot(temp_matrix, camera_matrix)
-        u = result[0] / result[2]
-        v = result[1] / result[2]
-        image_points[idx, :] = [u, v]
 
-    return image_points
+def get_joints_for_video(motion_capture_data, fps=30, method=None, frames_num=None):
+    """Get joints at frames of the video.
+
+    :param motion_capture_data: motion capture data
+    :type motion_capture_data: MotionCapture
+    :param fps: video frames per second (e.g. get_video_fps of the video)
+    :type fps: float
+    :param method: resample joints to any fps ('nearest', 'linear' or 'slerp'),
+        every n-th frame is taken if None (fps has to divide the motion capture fps)
+    :type method: str
+    :param frames_num: number of video frames (used with the method), covered frames by default
+    :type frames_num: int
+    :return: joints (video frames, motion points, 3)
+    :rtype: np.ndarray
+    """
+    if method is None:
+        return motion_capture_data.get_joints_reduced_by_fps(fps)
+    return motion_capture_data.get_joints_for_fps(fps, frames_num, method)
 
 
-def adapt_motion_data_for_video(motion_capture_data, camera, fps=30):
+def adapt_motion_data_for_video(motion_capture_data, camera, fps=30, dtype=int, distort=False, method=None,
+                                frames_num=None):
     """Adapt motion capture (MoCap) data for the video.
 
     :param motion_capture_data: motion capture data
     :param motion_capture_data: MotionCapture
-    :param camera: camera's params
+    :param camera: camera's params (or a list of them)
     :type camera: Camera
     :param fps: video frames per second
-    :type fps: int
-    :return: image plane points (video frames, motion points, 2)
+    :type fps: float
+    :param dtype: type of the output
+    :type dtype: type
+    :param distort: apply camera's lens distortion
+    :type distort: bool
+    :param method: resample joints to any fps ('nearest', 'linear' or 'slerp') instead of
+        taking every n-th frame, optional
+    :type method: str
+    :param frames_num: number of video frames (used with the method), optional
+    :type frames_num: int
+    :return: image plane points (video frames, motion points, 2),
+        (cameras, video frames, motion points, 2) for a list of cameras
     :rtype: np.ndarray
     """
-    markers = motion_capture_data.get_joints_reduced_by_fps(fps)
-    image_points = np.full((markers.shape[0], markers.shape[1], 2), 0, dtype=int)
-
-    for i in range(0, markers.shape[1]):
-        world_points = np.squeeze(markers[:, i, :])
-        image_points[:, i] = convert_world_points_to_image_points(camera, world_points)
-
-    return image_points
+    markers = get_joints_for_video(motion_capture_data, fps, method, frames_num)
+    return projection.project_points(markers, camera, dtype=dtype, distort=distort)
 
 
-def read_camera_params(extrinsic_data_path, camera_data_path):
+def read_camera_params(extrinsic_data_path, camera_data_path, compact=False):
     """Read camera's parameters.
 
     :param extrinsic_data_path: path of the extrinsic data
     :param camera_data_path: path of the camera's data
+    :param compact: return the validated immutable camera with the cached projection matrix
+    :type compact: bool
     :return: camera's params
-    :rtype: Camera
+    :rtype: Camera or CompactCamera
     """
     extrinsic_data = np.load(extrinsic_data_path)
     rotation_matrix = extrinsic_data['rotationMatrix']
@@ -68,34 +87,87 @@ def read_camera_params(extrinsic_data_path, camera_data_path):
 
     camera_data = np.load(camera_data_path)
     intrinsic_matrix = camera_data['IntrinsicMatrix']
-    return Camera(rotation_matrix, translation_vector, intrinsic_matrix)
+    radial_distortion = camera_data['RadialDistortion'] if 'RadialDistortion' in camera_data.files else None
+    tangential_distortion = camera_data['TangentialDistortion'] if 'TangentialDistortion' in camera_data.files else None
+    camera_class = CompactCamera if compact else Camera
+    return camera_class(rotation_matrix, translation_vector, intrinsic_matrix, radial_distortion, tangential_distortion)
 
 
-def read_motion_capture_data(motion_capture_data_path):
+def read_motion_capture_data(motion_capture_data_path, compact=False, dtype=None):
     """Read motion capture data.
 
     :param motion_capture_data_path: path to the motion capture data
     :type motion_capture_data_path: str
+    :param compact: return the validated immutable motion capture data
+    :type compact: bool
+    :param dtype: float dtype of joints of the compact motion capture data (e.g. np.float32), optional
+    :type dtype: np.dtype
     :return: motion capture data
-    :rtype: MotionCapture
+    :rtype: MotionCapture or CompactMotionCapture
     """
     motion_capture_data = np.load(motion_capture_data_path, allow_pickle=True)
     joints = motion_capture_data['joints_location']
     skeleton = motion_capture_data['joints_parent']
+    exponential_maps = None
+    if 'joints_exponential_mapping' in motion_capture_data.files:
+        exponential_maps = motion_capture_data['joints_exponential_mapping']
     fps = 120  # Based on MoVi dataset description
-    return MotionCapture(joints, skeleton, fps)
+    if compact:
+        return CompactMotionCapture(joints, skeleton, fps, exponential_maps, dtype)
+    return MotionCapture(joints, skeleton, fps, exponential_maps)
+
+
+def read_motion_capture_store_data(store_path, subject, move):
+    """Read motion capture data from the memory mapped motion capture store.
 
+    Joints are not copied into memory, they are a slice of the memory mapped store.
 
-def read_video(video_path):
+    :param store_path: path to the motion capture store directory
+    :type store_path: str
+    :param subject: subject's number
+    :type subject: int
+    :param move: move's number (counted from 1)
+    :type move: int
+    :return: motion capture data
+    :rtype: MotionCapture
+    """
+    return MotionStore(store_path).get_motion_capture(subject, move)
+
+
+def get_video_fps(video_path):
+    """Get the real frame rate of the video.
+
+    :param video_path: path to the video
+    :type video_path: str
+    :return: frames per second (e.g. 29.97)
+    :rtype: float
+    """
+    with VideoReader(video_path) as reader:
+        return reader.fps
+
+
+def read_video(video_path, start=0, stop=None, step=1, size=None, grayscale=False):
     """Read video data.
 
+    Only the requested frames are kept in memory, use VideoReader.iter_chunks for long videos.
+
     :param video_path: path to the video
     :type video_path: str
-    :return: video as array
+    :param start: first frame (counted from 0)
+    :type start: int
+    :param stop: frame where reading stops (excluded), the end of the video by default
+    :type stop: int
+    :param step: read every step-th frame
+    :type step: int
+    :param size: output size (width, height), the original size by default
+    :type size: tuple of int
+    :param grayscale: convert frames to grayscale
+    :type grayscale: bool
+    :return: video as array (frames, height, width, 3) RGB or (frames, height, width) grayscale
     :rtype: numpy.ndarray
     """
-    video = skvideo.io.vread(video_path)
-    return video
+    with VideoReader(video_path, size, grayscale) as reader:
+        return reader.read(start, stop, step)
 
 
 def get_details_from_path(path):
@@ -108,42 +180,37 @@ def get_details_from_path(path):
         - number - which subject is it
         - sub_number - which subject's movement is it
     """
-    file_name = Path(path).stem
-    numbers = [int(s) for s in file_name.split('_') if s.isdigit()]
+    entry = parse_file_name(path)
+    assert entry is not None, 'Unknown name of the file: {}'.format(path)
+    return 'Subject', entry.subject, entry.move
 
-    name = file_name[8:15]
-    number = numbers[0]
-    sub_number = numbers[1]
-    return name, number, sub_number
 
-
-def read_dataset(videos_dir, amass_dir):
+def read_dataset(videos_dir, amass_dir, catalog_path=None):
     """Read dataset.
 
     :param videos_dir: videos directory
     :type videos_dir: str
     :param amass_dir: amass files directory
     :type amass_dir: str
+    :param catalog_path: path to the persisted catalog of the directories, optional
+    :type catalog_path: str
     :return:
         - paths of the video
         - paths of the motion capture files
         - sub_number - which subject's movement is it
     """
-    video_paths = glob.glob(videos_dir + '/*.avi')
-    amass_paths = glob.glob(amass_dir + '/*.npz')
+    catalog = DatasetCatalog([videos_dir, amass_dir], catalog_path)
+
+    videos = {}
+    for entry in catalog.query(kind='video'):
+        videos.setdefault((entry.subject, entry.move), []).append(entry.path)
 
     videos_list = []
     motion_captures_list = []
-    for path in amass_paths:
-        name, number, sub_number = get_details_from_path(path)
-
-        pattern = '.*{}_{}_.*_{}\.'.format(name, number, sub_number)
-        r = re.compile(pattern)
-        found_video_paths = list(filter(r.match, video_paths))
+    for entry in catalog.query(kind='motion_capture'):
+        found_video_paths = videos.get((entry.subject, entry.move), [])
         if len(found_video_paths) == 1:
-            # video = read_video(found_video_paths[0])
-            # amass = read_motion_capture_data(path)
             videos_list.append(found_video_paths[0])
-            motion_captures_list.append(path)
+            motion_captures_list.append(entry.path)
 
     return np.array(videos_list), np.array(motion_captures_list)
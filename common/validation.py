@@ -0,0 +1,30 @@
+import numpy as np
+
+
+def validate_array(name, value, shape, dtype=np.float64, finite=False):
+    """Convert a loaded value into a numeric array of the given shape.
+
+    :param name: name of the value (for the error message)
+    :type name: str
+    :param value: loaded value (e.g. an object array of a pickled npz file)
+    :type value: np.ndarray
+    :param shape: expected shape, None matches any size of the dimension
+    :type shape: tuple
+    :param dtype: dtype of the array
+    :type dtype: np.dtype
+    :param finite: check that all values are finite
+    :type finite: bool
+    :return: read-only array
+    :rtype: np.ndarray
+    """
+    try:
+        # A view, so making it read-only doesn't affect the loaded array
+        array = np.asarray(value, dtype=dtype).view()
+    except (TypeError, ValueError):
+        raise ValueError('{} should be numeric, got {}.'.format(name, np.asarray(value).dtype))
+    assert array.ndim == len(shape) and all(
+        expected is None or size == expected for size, expected in zip(array.shape, shape)
+    ), '{} should have shape {}, got {}.'.format(name, shape, array.shape)
+    assert not finite or np.all(np.isfinite(array)), '{} should be finite.'.format(name)
+    array.setflags(write=False)
+    return array
@@ -0,0 +1,273 @@
+import logging
+import itertools
+import cv2
+import numpy as np
+from common import keyframe_index
+
+# Frames further ahead than this are reached by seeking instead of grabbing them one by one
+SEEK_THRESHOLD = 30
+
+
+class VideoReader:
+    """
+    Streaming video reader, frames are decoded only when they are requested.
+
+    Frames are RGB (frames, height, width, 3) or grayscale (frames, height, width) uint8 arrays.
+    The frame count of the container is only an estimate (e.g. 0 for some codecs), so reading to the end
+    of the video (stop=None) goes on until a frame can't be read.
+
+    :param video_path: path to the video
+    :type video_path: str
+    :param size: output size (width, height), the original size by default
+    :type size: tuple of int
+    :param grayscale: convert frames to grayscale
+    :type grayscale: bool
+    """
+
+    def __init__(self, video_path, size=None, grayscale=False):
+        self.video_path = video_path
+        self.cap = cv2.VideoCapture(video_path)
+        assert self.cap.isOpened(), 'Video {} couldn\'t be opened.'.format(video_path)
+
+        self.frames_num = int(self.cap.get(cv2.CAP_PROP_FRAME_COUNT))
+        self.fps = self.cap.get(cv2.CAP_PROP_FPS)
+        self.source_size = (int(self.cap.get(cv2.CAP_PROP_FRAME_WIDTH)), int(self.cap.get(cv2.CAP_PROP_FRAME_HEIGHT)))
+        self.size = tuple(size) if size is not None else self.source_size
+        self.grayscale = grayscale
+        self.position = 0
+
+    @property
+    def frame_shape(self):
+        """Shape of a single output frame.
+
+        :return: (height, width, 3) or (height, width) for grayscale
+        :rtype: tuple of int
+        """
+        width, height = self.size
+        return (height, width) if self.grayscale else (height, width, 3)
+
+    def __len__(self):
+        return self.frames_num
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def close(self):
+        """Release the video.
+        """
+        self.cap.release()
+
+    def create_buffer(self, frames_num):
+        """Create a buffer which can be reused for reading.
+
+        :param frames_num: number of frames the buffer holds
+        :type frames_num: int
+        :return: buffer (frames, ...frame shape)
+        :rtype: numpy.ndarray
+        """
+        return np.empty((frames_num,) + self.frame_shape, dtype=np.uint8)
+
+    def _get_frame_numbers(self, start, stop, step):
+        """Get numbers of the requested frames.
+
+        :return: frame numbers
+        :rtype: range
+        """
+        stop = self.frames_num if stop is None else min(stop, self.frames_num)
+        return range(start, stop, step)
+
+    def _seek(self, frame_num):
+        """Move to the frame. Frames close ahead are grabbed without decoding them into images.
+
+        :param frame_num: frame number (counted from 0)
+        :type frame_num: int
+        """
+        if frame_num < self.position or frame_num - self.position > SEEK_THRESHOLD:
+            self.cap.set(cv2.CAP_PROP_POS_FRAMES, frame_num)
+            self.position = frame_num
+
+        while self.position < frame_num and self.cap.grab():
+            self.position = self.position + 1
+
+    def _read_frame(self, out):
+        """Decode the current frame into the output array.
+
+        :param out: output array of the frame shape
+        :type out: numpy.ndarray
+        :return: True if the frame was read
+        :rtype: bool
+        """
+        ret, frame = self.cap.read()
+        if not ret:
+            return False
+        self.position = self.position + 1
+
+        if self.size != self.source_size:
+            frame = cv2.resize(frame, self.size, interpolation=cv2.INTER_AREA)
+        code = cv2.COLOR_BGR2GRAY if self.grayscale else cv2.COLOR_BGR2RGB
+        cv2.cvtColor(frame, code, dst=out)
+        return True
+
+    def _read_frames(self, frame_numbers, out):
+        """Read frames until the buffer is full, the frame numbers run out or a frame can't be read.
+
+        :param frame_numbers: iterator of frame numbers, only numbers of read frames and of the failed one are taken
+        :type frame_numbers: iterator
+        :param out: buffer to read into
+        :type out: numpy.ndarray
+        :return: number of read frames
+        :rtype: int
+        """
+        read_num = 0
+        if out.shape[0] == 0:
+            return read_num
+        for frame_num in frame_numbers:
+            self._seek(frame_num)
+            if not self._read_frame(out[read_num]):
+                break
+            read_num = read_num + 1
+            if read_num == out.shape[0]:
+                break
+        return read_num
+
+    def _check_end(self, last_frame_num, end_frame_num):
+        """Check the frame count against the end of the video found by reading.
+
+        :param last_frame_num: last frame which was read, -1 if none
+        :type last_frame_num: int
+        :param end_frame_num: first requested frame which couldn't be read
+        :type end_frame_num: int
+        """
+        if last_frame_num >= self.frames_num or end_frame_num < self.frames_num:
+            logging.warning('Frame count of {} is {}, but reading ended before frame {}.'.format(
+                self.video_path, self.frames_num, end_frame_num
+            ))
+            self.frames_num = max(self.frames_num, last_frame_num + 1)
+
+    def read(self, start=0, stop=None, step=1, out=None):
+        """Read a range of frames.
+
+        :param start: first frame (counted from 0)
+        :type start: int
+        :param stop: frame where reading stops (excluded), the end of the video by default
+        :type stop: int
+        :param step: read every step-th frame
+        :type step: int
+        :param out: buffer to read into, a new array (grown up to the end of the video) is created by default
+        :type out: numpy.ndarray
+        :return: frames (frames, ...frame shape)
+        :rtype: numpy.ndarray
+        """
+        frame_numbers = self._get_frame_numbers(start, stop, step)
+        grow = out is None and stop is None
+        if out is None:
+            out = self.create_buffer(max(len(frame_numbers), 1) if stop is None else len(frame_numbers))
+        assert out.shape[0] >= len(frame_numbers), 'Buffer is too small.'
+        if stop is not None:
+            return out[:self._read_frames(iter(frame_numbers), out)]
+
+        frame_numbers = itertools.count(start, step)
+        read_num = self._read_frames(frame_numbers, out)
+        while grow and read_num == out.shape[0]:
+            # The frame count was underestimated
+            grown_out = self.create_buffer(2 * out.shape[0])
+            grown_out[:read_num] = out
+            out = grown_out
+            read_num = read_num + self._read_frames(frame_numbers, out[read_num:])
+
+        if read_num < out.shape[0]:
+            self._check_end(start + (read_num - 1) * step, start + read_num * step)
+        elif self._read_frames(itertools.count(start + read_num * step, step), self.create_buffer(1)) > 0:
+            logging.warning('Frames of {} after frame {} don\'t fit the buffer.'.format(
+                self.video_path, start + (read_num - 1) * step
+            ))
+        return out[:read_num]
+
+    def iter_chunks(self, chunk_size, start=0, stop=None, step=1, out=None):
+        """Read frames in fixed size chunks.
+
+        All chunks are views of the same buffer, copy a chunk if it has to outlive the next iteration.
+
+        :param chunk_size: number of frames in a chunk
+        :type chunk_size: int
+        :param start: first frame (counted from 0)
+        :type start: int
+        :param stop: frame where reading stops (excluded), the end of the video by default
+        :type stop: int
+        :param step: read every step-th frame
+        :type step: int
+        :param out: buffer to read into, a new one is created once by default
+        :type out: numpy.ndarray
+        :return: generator of frames (up to chunk size, ...frame shape)
+        :rtype: generator of numpy.ndarray
+        """
+        if out is None:
+            out = self.create_buffer(chunk_size)
+        out = out[:chunk_size]
+
+        if stop is None:
+            frame_numbers = itertools.count(start, step)
+        else:
+            frame_numbers = iter(self._get_frame_numbers(start, stop, step))
+        read_num = 0
+        while True:
+            chunk_read_num = self._read_frames(frame_numbers, out)
+            read_num = read_num + chunk_read_num
+            if chunk_read_num > 0:
+                yield out[:chunk_read_num]
+            if chunk_read_num < chunk_size:
+                break
+        if stop is None:
+            self._check_end(start + (read_num - 1) * step, start + read_num * step)
+
+
+class IndexedVideoReader(VideoReader):
+    """
+    Video reader with random access of bounded latency.
+
+    The keyframe index of the video (see common/keyframe_index.py) is read or written next to the video, so any
+    frame is reached by decoding at most max_latency frames (the longest keyframe interval). Videos without
+    the index (e.g. not AVI) are read as by VideoReader.
+
+    :param video_path: path to the video
+    :type video_path: str
+    :param size: output size (width, height), the original size by default
+    :type size: tuple of int
+    :param grayscale: convert frames to grayscale
+    :type grayscale: bool
+    """
+
+    def __init__(self, video_path, size=None, grayscale=False):
+        super().__init__(video_path, size, grayscale)
+        self.keyframes = None
+        self.max_latency = None
+        index = keyframe_index.read_keyframe_index(video_path)
+        if index is not None:
+            self.keyframes = np.array(index['keyframes'], dtype=int)
+            self.max_latency = keyframe_index.get_max_keyframe_interval(index['keyframes'], index['frames_num'])
+
+    def _seek(self, frame_num):
+        """Move to the frame through the last keyframe before it.
+
+        :param frame_num: frame number (counted from 0)
+        :type frame_num: int
+        """
+        self.position = keyframe_index.seek(self.cap, self.position, frame_num, self.keyframes)
+
+    def get_data(self, frame_num):
+        """Get a frame (the same name as imageio readers have).
+
+        :param frame_num: frame number (counted from 0)
+        :type frame_num: int
+        :return: frame (...frame shape)
+        :rtype: numpy.ndarray
+        """
+        if not 0 <= frame_num < self.frames_num:
+            raise IndexError('Frame {} is out of range.'.format(frame_num))
+        frames = self.read(frame_num, frame_num + 1)
+        if frames.shape[0] == 0:
+            raise IndexError('Frame {} couldn\'t be read.'.format(frame_num))
+        return frames[0]
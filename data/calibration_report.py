@@ -0,0 +1,358 @@
+import sys
+import csv
+import json
+import argparse
+import logging
+from pathlib import Path
+import cv2
+import numpy as np
+from common import profiling
+from common import projection
+from common import utils
+from common.catalog import DatasetCatalog
+from common.motion_capture import INTERPOLATION_METHODS
+
+logging.basicConfig(format='%(asctime)s - %(levelname)s - %(message)s', level=logging.INFO)
+
+# Columns of the report table
+REPORT_COLUMNS = (
+    'subject',
+    'move',
+    'camera',
+    'video',
+    'frames',
+    'frames_difference',
+    'out_of_frame_ratio',
+    'behind_camera_ratio',
+    'empty_frames_ratio',
+    'jitter_mean',
+    'jitter_p95',
+    'keypoints_frames',
+    'error_mean',
+    'error_median',
+    'error_p95',
+)
+
+
+def get_flags():
+    """Get command flags.
+
+    :return: flags
+    :rtype: argparse.ArgumentParser
+    """
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--videos',
+                        help='Path to the folder of sub videos.',
+                        default='./output/',
+                        type=str)
+    parser.add_argument('--motion_captures',
+                        help='Path to the folder of motion capture files (.npz).',
+                        default='./output/',
+                        type=str)
+    parser.add_argument('--calib',
+                        help='Path to the camera parameters folder.',
+                        default='./Calib/',
+                        type=str)
+    parser.add_argument('--output',
+                        help='Path to the CSV report (a row per sequence).',
+                        default='./calibration_report.csv',
+                        type=str)
+    parser.add_argument('--cameras',
+                        help='Cameras (e.g., PG1 PG2), all calibrated cameras by default.',
+                        nargs='+',
+                        type=str)
+    parser.add_argument('--keypoints',
+                        help='COCO keypoints files (e.g. of a 2D detector) which projected joints are compared with.',
+                        nargs='+',
+                        type=str)
+    parser.add_argument('--fps',
+                        help='Frames per second of the sub videos, the real frame rate of every video by default.',
+                        type=float)
+    parser.add_argument('--resampling',
+                        help='Interpolation of motion capture frames at the frame rate of the videos.',
+                        default='linear',
+                        choices=INTERPOLATION_METHODS,
+                        type=str)
+    parser.add_argument('--distort',
+                        help='Apply lens distortion of cameras.',
+                        action='store_true')
+    parser.add_argument('--max_out_of_frame',
+                        help='Fail if the out of frame ratio of any sequence is higher.',
+                        type=float)
+    parser.add_argument('--max_jitter',
+                        help='Fail if the 95th percentile of jitter (pixels) of any sequence is higher.',
+                        type=float)
+    parser.add_argument('--max_error',
+                        help='Fail if the mean error (pixels) against keypoints of any sequence is higher.',
+                        type=float)
+    parser.add_argument('--profile_report',
+                        help='Path to the JSON report of stage timings, throughputs and peak memory.',
+                        type=str)
+    return parser
+
+
+def get_depths(world_points, cameras):
+    """Get depths of world points in coordinates of cameras.
+
+    :param world_points: world points (..., 3)
+    :type world_points: np.ndarray
+    :param cameras: camera's params
+    :type cameras: list of Camera
+    :return: depths (cameras, ...), points behind a camera have a negative depth
+    :rtype: np.ndarray
+    """
+    world_points = np.asarray(world_points, dtype=np.float64)
+    homogeneous = projection.to_homogeneous(world_points.reshape(-1, 3))
+    depth_vectors = np.stack([projection.get_extrinsic_matrix(camera)[:, 2] for camera in cameras], axis=1)
+    return np.dot(homogeneous, depth_vectors).T.reshape((len(cameras),) + world_points.shape[:-1])
+
+
+def get_projection_stats(image_points, depths, width, height):
+    """Get statistics of projected joints of a sequence in one camera view.
+
+    Jitter is the magnitude of the second difference of projected points (pixels per frame^2), it is computed
+    only for joints inside the frame in all three frames.
+
+    :param image_points: projected joints (frames, joints, 2)
+    :type image_points: np.ndarray
+    :param depths: depths of joints (frames, joints)
+    :type depths: np.ndarray
+    :param width: width of the frames
+    :type width: int
+    :param height: height of the frames
+    :type height: int
+    :return: out_of_frame_ratio, behind_camera_ratio, empty_frames_ratio, jitter_mean and jitter_p95
+    :rtype: dict
+    """
+    x, y = image_points[..., 0], image_points[..., 1]
+    in_front = depths > 0
+    inside = in_front & (x >= 0) & (x < width) & (y >= 0) & (y < height)
+
+    jitter = np.linalg.norm(np.diff(image_points, n=2, axis=0), axis=-1)
+    jitter = jitter[inside[2:] & inside[1:-1] & inside[:-2]]
+    return {
+        'out_of_frame_ratio': 1 - inside.mean() if inside.size > 0 else np.nan,
+        'behind_camera_ratio': 1 - in_front.mean() if in_front.size > 0 else np.nan,
+        'empty_frames_ratio': 1 - inside.any(axis=1).mean() if inside.shape[0] > 0 else np.nan,
+        'jitter_mean': jitter.mean() if jitter.size > 0 else np.nan,
+        'jitter_p95': np.percentile(jitter, 95) if jitter.size > 0 else np.nan,
+    }
+
+
+def get_keypoints_errors(image_points, frames, keypoints):
+    """Get distances between projected joints and labeled keypoints.
+
+    :param image_points: projected joints (frames, joints, 2)
+    :type image_points: np.ndarray
+    :param frames: frames of keypoints (counted from 0)
+    :type frames: np.ndarray
+    :param keypoints: keypoints (frames of keypoints, joints, 3), joints with visibility 0 aren't labeled
+    :type keypoints: np.ndarray
+    :return: number of compared frames, error_mean, error_median and error_p95
+    :rtype: tuple
+    """
+    valid = frames < image_points.shape[0]
+    frames, keypoints = frames[valid], keypoints[valid]
+    joints_num = min(image_points.shape[1], keypoints.shape[1])
+    labeled = keypoints[:, :joints_num, 2] > 0
+    errors = np.linalg.norm(image_points[frames, :joints_num] - keypoints[:, :joints_num, :2], axis=-1)[labeled]
+    if errors.size == 0:
+        return frames.shape[0], {'error_mean': np.nan, 'error_median': np.nan, 'error_p95': np.nan}
+    return frames.shape[0], {
+        'error_mean': errors.mean(),
+        'error_median': np.median(errors),
+        'error_p95': np.percentile(errors, 95),
+    }
+
+
+def read_keypoints(paths):
+    """Read COCO keypoints files and group keypoints by sub videos.
+
+    Images are matched with sub videos by 'video' and 'frame' fields (as written by export_coco.py)
+    or by the file name '<sub video>/<frame>.jpg'.
+
+    :param paths: paths of COCO keypoints files
+    :type paths: list of str
+    :return: {sub video name (stem): (frames (n,), keypoints (n, joints, 3))}
+    :rtype: dict
+    """
+    grouped = {}
+    for path in paths:
+        with open(path) as file:
+            coco = json.load(file)
+        images = {}
+        for image in coco['images']:
+            if 'video' in image and 'frame' in image:
+                images[image['id']] = (Path(image['video']).stem, int(image['frame']))
+            else:
+                file_name = Path(image['file_name'])
+                images[image['id']] = (file_name.parent.name, int(file_name.stem))
+
+        for annotation in coco['annotations']:
+            video, frame = images[annotation['image_id']]
+            frames, keypoints = grouped.setdefault(video, ([], []))
+            frames.append(frame)
+            keypoints.append(annotation['keypoints'])
+
+    return {
+        video: (np.array(frames, dtype=int), np.array(keypoints, dtype=np.float64).reshape(len(frames), -1, 3))
+        for video, (frames, keypoints) in grouped.items()
+    }
+
+
+def get_video_size(video_path):
+    """Get size and number of frames of a video without decoding it.
+
+    :param video_path: path of the video
+    :type video_path: str
+    :return: width, height and number of frames
+    :rtype: tuple of int
+    """
+    cap = cv2.VideoCapture(video_path)
+    size = (
+        int(cap.get(cv2.CAP_PROP_FRAME_WIDTH)),
+        int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT)),
+        int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+    )
+    cap.release()
+    return size
+
+
+def get_report(catalog, cameras=None, keypoints=None, fps=None, distort=False, method='linear'):
+    """Get the calibration report of all moves in all camera views.
+
+    Joints of a move are projected into all its camera views at once.
+
+    :param catalog: catalog of sub videos, motion capture files and camera's params
+    :type catalog: DatasetCatalog
+    :param cameras: cameras, all calibrated cameras by default
+    :type cameras: list of str
+    :param keypoints: keypoints grouped by sub videos (see read_keypoints), optional
+    :type keypoints: dict
+    :param fps: frames per second of the sub videos, the real frame rate of the videos of every move by default
+    :type fps: float
+    :param distort: apply lens distortion of cameras
+    :type distort: bool
+    :param method: resampling of motion capture frames (see utils.get_joints_for_video)
+    :type method: str
+    :return: rows of the report (see REPORT_COLUMNS)
+    :rtype: list of dict
+    """
+    cameras = catalog.get_cameras() if cameras is None else cameras
+    keypoints = {} if keypoints is None else keypoints
+    camera_params = {
+        camera: utils.read_camera_params(
+            catalog.get('extrinsics', camera=camera)[0],
+            catalog.get('camera_params', camera=camera)[0],
+            compact=True
+        )
+        for camera in cameras
+    }
+
+    rows = []
+    for entry in sorted(catalog.query(kind='motion_capture'), key=lambda e: (e.subject, e.move)):
+        views = []
+        for camera in cameras:
+            video_paths = catalog.get('video', entry.subject, camera, entry.move)
+            if len(video_paths) > 0:
+                views.append((camera, video_paths[0]))
+        if len(views) == 0:
+            continue
+
+        with profiling.stage('loading', 1):
+            motion_capture = utils.read_motion_capture_data(entry.path)
+            # Camera views of a move are recorded synchronously, they share the frame rate
+            video_fps = fps if fps is not None else utils.get_video_fps(views[0][1])
+            markers = utils.get_joints_for_video(motion_capture, video_fps, method)
+        with profiling.stage('projection', markers.shape[0] * len(views)):
+            views_cameras = [camera_params[camera] for camera, _ in views]
+            image_points = projection.project_points(markers, views_cameras, distort=distort)
+            depths = get_depths(markers, views_cameras)
+
+        with profiling.stage('statistics', markers.shape[0] * len(views)):
+            for idx, (camera, video_path) in enumerate(views):
+                width, height, video_frames_num = get_video_size(video_path)
+                frames_num = min(video_frames_num, markers.shape[0])
+                name = Path(video_path).stem
+                row = {
+                    'subject': entry.subject,
+                    'move': entry.move,
+                    'camera': camera,
+                    'video': name,
+                    'frames': frames_num,
+                    'frames_difference': video_frames_num - markers.shape[0],
+                    'keypoints_frames': 0,
+                    'error_mean': np.nan,
+                    'error_median': np.nan,
+                    'error_p95': np.nan,
+                }
+                row.update(get_projection_stats(image_points[idx, :frames_num], depths[idx, :frames_num], width, height))
+                if name in keypoints:
+                    row['keypoints_frames'], errors = get_keypoints_errors(
+                        image_points[idx, :frames_num],
+                        *keypoints[name]
+                    )
+                    row.update(errors)
+                rows.append(row)
+    return rows
+
+
+def save_report(rows, path):
+    """Save the report as a CSV table.
+
+    :param rows: rows of the report
+    :type rows: list of dict
+    :param path: path of the CSV file
+    :type path: str
+    """
+    with open(path, 'w', newline='') as file:
+        writer = csv.DictWriter(file, REPORT_COLUMNS)
+        writer.writeheader()
+        for row in rows:
+            writer.writerow({
+                name: round(float(value), 4) if isinstance(value, (float, np.floating)) else value
+                for name, value in row.items()
+            })
+
+
+def get_failures(rows, max_out_of_frame=None, max_jitter=None, max_error=None):
+    """Get sequences which exceed the limits.
+
+    :param rows: rows of the report
+    :type rows: list of dict
+    :param max_out_of_frame: limit of out_of_frame_ratio, optional
+    :type max_out_of_frame: float
+    :param max_jitter: limit of jitter_p95, optional
+    :type max_jitter: float
+    :param max_error: limit of error_mean, optional
+    :type max_error: float
+    :return: list of (video, column, value)
+    :rtype: list of tuple
+    """
+    limits = {'out_of_frame_ratio': max_out_of_frame, 'jitter_p95': max_jitter, 'error_mean': max_error}
+    failures = []
+    for row in rows:
+        for column, limit in limits.items():
+            # NaN (e.g. no keypoints) never fails
+            if limit is not None and row[column] > limit:
+                failures.append((row['video'], column, row[column]))
+    return failures
+
+
+if __name__ == '__main__':
+    args = get_flags().parse_args()
+
+    with profiling.profile_run(args.profile_report):
+        dataset_catalog = DatasetCatalog([args.videos, args.motion_captures, args.calib])
+        keypoints_groups = read_keypoints(args.keypoints) if args.keypoints else None
+        report_rows = get_report(
+            dataset_catalog, args.cameras, keypoints_groups, args.fps, args.distort, args.resampling
+        )
+        save_report(report_rows, args.output)
+    logging.info('Report of {} sequence(s) saved: {}'.format(len(report_rows), args.output))
+
+    report_failures = get_failures(report_rows, args.max_out_of_frame, args.max_jitter, args.max_error)
+    for video_name, column_name, column_value in report_failures:
+        logging.error('{}: {} is {:.4f}'.format(video_name, column_name, column_value))
+    if len(report_failures) > 0:
+        sys.exit(1)
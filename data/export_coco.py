@@ -0,0 +1,315 @@
+import os
+import json
+import shutil
+import argparse
+import logging
+import tempfile
+from pathlib import Path
+import cv2
+import numpy as np
+from common import projection
+from common import utils
+from common.catalog import DatasetCatalog
+from common.motion_capture import INTERPOLATION_METHODS
+from common.skeleton import get_bone_pairs
+
+logging.basicConfig(format='%(asctime)s - %(levelname)s - %(message)s', level=logging.INFO)
+
+# COCO visibility flags
+NOT_LABELED = 0
+VISIBLE = 2
+
+
+def get_flags():
+    """Get command flags.
+
+    :return: flags
+    :rtype: argparse.ArgumentParser
+    """
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--videos',
+                        help='Path to the folder of sub videos.',
+                        default='./output/',
+                        type=str)
+    parser.add_argument('--motion_captures',
+                        help='Path to the folder of motion capture files (.npz).',
+                        default='./output/',
+                        type=str)
+    parser.add_argument('--calib',
+                        help='Path to the camera parameters folder.',
+                        default='./Calib/',
+                        type=str)
+    parser.add_argument('--output',
+                        help='Path to the folder of COCO annotations.',
+                        default='./coco/',
+                        type=str)
+    parser.add_argument('--cameras',
+                        help='Cameras (e.g., PG1 PG2), all calibrated cameras by default.',
+                        nargs='+',
+                        type=str)
+    parser.add_argument('--val_subjects',
+                        help='Subjects of the val split.',
+                        default=[],
+                        nargs='+',
+                        type=int)
+    parser.add_argument('--test_subjects',
+                        help='Subjects of the test split.',
+                        default=[],
+                        nargs='+',
+                        type=int)
+    parser.add_argument('--fps',
+                        help='Frames per second of the sub videos, the real frame rate of every video by default.',
+                        type=float)
+    parser.add_argument('--resampling',
+                        help='Interpolation of motion capture frames at the frame rate of the videos.',
+                        default='linear',
+                        choices=INTERPOLATION_METHODS,
+                        type=str)
+    parser.add_argument('--keep_empty',
+                        help='Keep frames without any joint inside the frame.',
+                        action='store_true')
+    return parser
+
+
+def get_split(subject, val_subjects=(), test_subjects=()):
+    """Get the split of a subject.
+
+    :param subject: subject's number
+    :type subject: int
+    :param val_subjects: subjects of the val split
+    :type val_subjects: collection of int
+    :param test_subjects: subjects of the test split
+    :type test_subjects: collection of int
+    :return: 'train', 'val' or 'test'
+    :rtype: str
+    """
+    if subject in test_subjects:
+        return 'test'
+    if subject in val_subjects:
+        return 'val'
+    return 'train'
+
+
+def get_keypoints_annotations(image_points, width, height):
+    """Get COCO keypoints, visibility and bounding boxes of all frames at once.
+
+    Joints outside of the frame are not labeled (x = y = v = 0), boxes enclose the joints inside the frame.
+
+    :param image_points: joints on the image plane (frames, joints, 2)
+    :type image_points: np.ndarray
+    :param width: width of the frames
+    :type width: int
+    :param height: height of the frames
+    :type height: int
+    :return: keypoints (frames, joints * 3), number of visible keypoints (frames,), boxes [x, y, w, h] (frames, 4)
+    :rtype: tuple of np.ndarray
+    """
+    x, y = image_points[..., 0], image_points[..., 1]
+    inside = (x >= 0) & (x < width) & (y >= 0) & (y < height)
+    visibility = np.where(inside, VISIBLE, NOT_LABELED)
+
+    points = np.where(inside[..., np.newaxis], image_points, 0)
+    keypoints = np.concatenate((points, visibility[..., np.newaxis]), axis=-1).reshape(image_points.shape[0], -1)
+
+    min_x = np.where(inside, x, np.inf).min(axis=1)
+    min_y = np.where(inside, y, np.inf).min(axis=1)
+    max_x = np.where(inside, x, -np.inf).max(axis=1)
+    max_y = np.where(inside, y, -np.inf).max(axis=1)
+    boxes = np.stack((min_x, min_y, max_x - min_x, max_y - min_y), axis=1)
+    boxes[~np.isfinite(boxes)] = 0
+    return keypoints, inside.sum(axis=1), boxes
+
+
+class CocoWriter:
+    """
+    Streaming writer of a COCO keypoints file.
+
+    Images and annotations are appended to temporary files as soon as they are produced,
+    the final JSON is assembled from them by concatenation, so the annotation dict is never built in memory.
+
+    :param path: path of the JSON file
+    :type path: str
+    :param categories: COCO categories
+    :type categories: list of dict
+    """
+
+    def __init__(self, path, categories):
+        self.path = path
+        self.categories = categories
+        self.images_file = tempfile.TemporaryFile('w+')
+        self.annotations_file = tempfile.TemporaryFile('w+')
+        self.images_num = 0
+
+    def add(self, image, annotation):
+        """Append an image and its annotation, their ids are assigned by the writer.
+
+        :param image: COCO image without 'id'
+        :type image: dict
+        :param annotation: COCO annotation without 'id' and 'image_id'
+        :type annotation: dict
+        """
+        self.images_num = self.images_num + 1
+        separator = ',\n' if self.images_num > 1 else '\n'
+        image['id'] = self.images_num
+        annotation['id'] = self.images_num
+        annotation['image_id'] = self.images_num
+        self.images_file.write(separator + json.dumps(image))
+        self.annotations_file.write(separator + json.dumps(annotation))
+
+    def close(self):
+        """Assemble the JSON file.
+        """
+        temp_path = self.path + '.tmp'
+        with open(temp_path, 'w') as file:
+            file.write('{"info": {"description": "MoVi keypoints"}, "licenses": [], "categories": ')
+            file.write(json.dumps(self.categories))
+            file.write(', "images": [')
+            self.images_file.seek(0)
+            shutil.copyfileobj(self.images_file, file)
+            file.write('\n], "annotations": [')
+            self.annotations_file.seek(0)
+            shutil.copyfileobj(self.annotations_file, file)
+            file.write('\n]}\n')
+        os.replace(temp_path, self.path)
+        self.images_file.close()
+        self.annotations_file.close()
+
+
+def get_categories(skeleton):
+    """Get the COCO person category of the skeleton.
+
+    :param skeleton: skeleton (synonym jointsParent)
+    :type skeleton: np.ndarray
+    :return: categories
+    :rtype: list of dict
+    """
+    return [{
+        'id': 1,
+        'name': 'person',
+        'supercategory': 'person',
+        'keypoints': ['joint_{}'.format(idx) for idx in range(len(skeleton))],
+        # COCO skeleton is counted from 1
+        'skeleton': (get_bone_pairs(skeleton) + 1).tolist(),
+    }]
+
+
+def export_coco(catalog, output_path, cameras=None, val_subjects=(), test_subjects=(), fps=None, keep_empty=False,
+                method='linear'):
+    """Export projected joints of all moves in all camera views as COCO keypoints files (one per split).
+
+    Joints of a move are projected into all its camera views at once. Images are frames of sub videos:
+    '<sub video>/<frame>.jpg' (counted from 0).
+
+    :param catalog: catalog of sub videos, motion capture files and camera's params
+    :type catalog: DatasetCatalog
+    :param output_path: path of the output directory
+    :type output_path: str
+    :param cameras: cameras, all calibrated cameras by default
+    :type cameras: list of str
+    :param val_subjects: subjects of the val split
+    :type val_subjects: collection of int
+    :param test_subjects: subjects of the test split
+    :type test_subjects: collection of int
+    :param fps: frames per second of the sub videos, the real frame rate of the videos of every move by default
+    :type fps: float
+    :param keep_empty: keep frames without any joint inside the frame
+    :type keep_empty: bool
+    :param method: resampling of motion capture frames (see utils.get_joints_for_video)
+    :type method: str
+    :return: number of annotations of each split
+    :rtype: dict
+    """
+    cameras = catalog.get_cameras() if cameras is None else cameras
+    camera_params = {
+        camera: utils.read_camera_params(
+            catalog.get('extrinsics', camera=camera)[0],
+            catalog.get('camera_params', camera=camera)[0],
+            compact=True
+        )
+        for camera in cameras
+    }
+
+    os.makedirs(output_path, exist_ok=True)
+    writers = {}
+    for entry in sorted(catalog.query(kind='motion_capture'), key=lambda e: (e.subject, e.move)):
+        views = []
+        for camera in cameras:
+            video_paths = catalog.get('video', entry.subject, camera, entry.move)
+            if len(video_paths) > 0:
+                views.append((camera, video_paths[0]))
+        if len(views) == 0:
+            continue
+
+        logging.info('Exporting: ' + entry.path)
+        motion_capture = utils.read_motion_capture_data(entry.path)
+        # Camera views of a move are recorded synchronously, they share the frame rate
+        video_fps = fps if fps is not None else utils.get_video_fps(views[0][1])
+        markers = utils.get_joints_for_video(motion_capture, video_fps, method)
+        image_points = projection.project_points(markers, [camera_params[camera] for camera, _ in views])
+
+        split = get_split(entry.subject, val_subjects, test_subjects)
+        if split not in writers:
+            path = os.path.join(output_path, 'person_keypoints_{}.json'.format(split))
+            writers[split] = CocoWriter(path, get_categories(motion_capture.skeleton))
+
+        for idx, (camera, video_path) in enumerate(views):
+            cap = cv2.VideoCapture(video_path)
+            width = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH))
+            height = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
+            frames_num = min(int(cap.get(cv2.CAP_PROP_FRAME_COUNT)), image_points.shape[1])
+            cap.release()
+
+            keypoints, keypoints_nums, boxes = get_keypoints_annotations(image_points[idx, :frames_num], width, height)
+            keypoints = np.round(keypoints, 2).tolist()
+            boxes = np.round(boxes, 2).tolist()
+            keypoints_nums = keypoints_nums.tolist()
+
+            name = Path(video_path).stem
+            for frame_num in range(frames_num):
+                if keypoints_nums[frame_num] == 0 and not keep_empty:
+                    continue
+
+                box = boxes[frame_num]
+                image = {
+                    'file_name': '{}/{:06d}.jpg'.format(name, frame_num),
+                    'width': width,
+                    'height': height,
+                    'video': Path(video_path).name,
+                    'frame': frame_num,
+                    'camera': camera,
+                    'subject': entry.subject,
+                    'move': entry.move,
+                }
+                annotation = {
+                    'category_id': 1,
+                    'iscrowd': 0,
+                    'keypoints': keypoints[frame_num],
+                    'num_keypoints': keypoints_nums[frame_num],
+                    'bbox': box,
+                    'area': box[2] * box[3],
+                }
+                writers[split].add(image, annotation)
+
+    annotations_nums = {}
+    for split, writer in writers.items():
+        writer.close()
+        annotations_nums[split] = writer.images_num
+    return annotations_nums
+
+
+if __name__ == '__main__':
+    args = get_flags().parse_args()
+
+    dataset_catalog = DatasetCatalog([args.videos, args.motion_captures, args.calib])
+    exported = export_coco(
+        dataset_catalog,
+        args.output,
+        args.cameras,
+        set(args.val_subjects),
+        set(args.test_subjects),
+        args.fps,
+        args.keep_empty,
+        args.resampling
+    )
+    for split_name, annotations_num in exported.items():
+        logging.info('Exported {} annotations into the {} split.'.format(annotations_num, split_name))
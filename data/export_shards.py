@@ -0,0 +1,134 @@
+import argparse
+import logging
+from pathlib import Path
+import cv2
+import numpy as np
+from common.dataset import ClipsData, get_clips
+from common.motion_capture import INTERPOLATION_METHODS
+from common.shards import FRAME_ENCODINGS, ShardWriter
+
+logging.basicConfig(format='%(asctime)s - %(levelname)s - %(message)s', level=logging.INFO)
+
+
+def get_flags():
+    """Get command flags.
+
+    :return: flags
+    :rtype: argparse.ArgumentParser
+    """
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--videos',
+                        help='Path to the folder of sub videos.',
+                        default='./output/',
+                        type=str)
+    parser.add_argument('--motion_captures',
+                        help='Path to the folder of motion capture files (.npz).',
+                        default='./output/',
+                        type=str)
+    parser.add_argument('--calib',
+                        help='Path to the camera parameters folder.',
+                        default='./Calib/',
+                        type=str)
+    parser.add_argument('--output',
+                        help='Path to the folder of shards.',
+                        default='./shards/',
+                        type=str)
+    parser.add_argument('--cameras',
+                        help='Cameras (e.g., PG1 PG2), all calibrated cameras by default.',
+                        nargs='+',
+                        type=str)
+    parser.add_argument('--fps',
+                        help='Frames per second of the sub videos, the real frame rate of every video by default.',
+                        type=float)
+    parser.add_argument('--resampling',
+                        help='Interpolation of motion capture frames at the frame rate of the videos.',
+                        default='linear',
+                        choices=INTERPOLATION_METHODS,
+                        type=str)
+    parser.add_argument('--encoding',
+                        help='Encoding of frames.',
+                        default='jpeg',
+                        choices=FRAME_ENCODINGS,
+                        type=str)
+    parser.add_argument('--jpeg_quality',
+                        help='Quality of JPEG frames (0-100).',
+                        default=95,
+                        type=int)
+    parser.add_argument('--shard_size',
+                        help='Maximum size of a shard in MiB.',
+                        default=1024,
+                        type=int)
+    parser.add_argument('--shard_samples',
+                        help='Maximum number of samples (frames) of a shard, unlimited by default.',
+                        type=int)
+    return parser
+
+
+def export_shards(clips, output_path, fps=None, encoding='jpeg', jpeg_quality=95, shard_size=1 << 30, shard_samples=None,
+                  method='linear'):
+    """Pack frames of the clips with their joints into shards.
+
+    Every clip is decoded sequentially in a single pass, samples are keyed by the sub video and the frame number
+    (e.g. F_PG1_Subject_1_L_1_000042).
+
+    :param clips: clips
+    :type clips: list of common.dataset.Clip
+    :param output_path: path of the output directory
+    :type output_path: str
+    :param fps: frames per second of the sub videos, the real frame rate of every video by default
+    :type fps: float
+    :param encoding: encoding of frames: 'jpeg', 'png' or 'raw'
+    :type encoding: str
+    :param jpeg_quality: quality of JPEG (0-100)
+    :type jpeg_quality: int
+    :param shard_size: maximum size of a shard in bytes
+    :type shard_size: int
+    :param shard_samples: maximum number of samples of a shard, unlimited by default
+    :type shard_samples: int
+    :param method: resampling of motion capture frames (see common.dataset.ClipsData)
+    :type method: str
+    :return: number of written samples
+    :rtype: int
+    """
+    data = ClipsData(clips, fps, method)
+    samples_num = 0
+    with ShardWriter(output_path, encoding, shard_size, shard_samples, jpeg_quality) as writer:
+        for clip_idx, clip in enumerate(clips):
+            logging.info('Exporting: ' + clip.video_path)
+            description = str(np.load(clip.motion_capture_path)['description'])
+            name = Path(clip.video_path).stem
+
+            cap = cv2.VideoCapture(clip.video_path)
+            for frame_num in range(data.frames_nums[clip_idx]):
+                ret, frame = cap.read()
+                if not ret:
+                    break
+
+                writer.write(
+                    name + '_{:06d}'.format(frame_num),
+                    frame,
+                    data.joints[clip_idx][frame_num],
+                    data.image_points[clip_idx][frame_num],
+                    description
+                )
+                samples_num = samples_num + 1
+            cap.release()
+    return samples_num
+
+
+if __name__ == '__main__':
+    args = get_flags().parse_args()
+
+    clips = get_clips(args.videos, args.motion_captures, args.calib, args.cameras)
+    logging.info('Starting exporting {} clips.'.format(len(clips)))
+    samples_num = export_shards(
+        clips,
+        args.output,
+        args.fps,
+        args.encoding,
+        args.jpeg_quality,
+        args.shard_size << 20,
+        args.shard_samples,
+        args.resampling
+    )
+    logging.info('Finished exporting {} samples.'.format(samples_num))
@@ -0,0 +1,217 @@
+import os
+import json
+from pathlib import Path
+from common.projection_cache import hash_file
+
+MANIFESTS_DIR = '.manifests'
+
+
+def get_fingerprint(path, hash_content=False):
+    """Get the fingerprint of an input file.
+
+    :param path: path of the file
+    :type path: str
+    :param hash_content: add SHA-1 of the content, so touched but unchanged files aren't considered changed
+    :type hash_content: bool
+    :return: {'size', 'mtime'} and 'sha1' if the content is hashed
+    :rtype: dict
+    """
+    stat = os.stat(path)
+    fingerprint = {'size': stat.st_size, 'mtime': stat.st_mtime}
+    if hash_content:
+        fingerprint['sha1'] = hash_file(path)
+    return fingerprint
+
+
+def get_manifest_names(output_path):
+    """Get names of all manifests of the output directory.
+
+    :param output_path: path of the output directory
+    :type output_path: str
+    :return: names of manifests
+    :rtype: list of str
+    """
+    manifests_path = os.path.join(output_path, MANIFESTS_DIR)
+    if not os.path.isdir(manifests_path):
+        return []
+    return sorted(Path(name).stem for name in os.listdir(manifests_path) if name.endswith('.json'))
+
+
+class Manifest:
+    """
+    Completion manifest of a single preparation job (e.g. a video or an AMASS file).
+
+    Every output file is recorded together with its size as soon as it is written,
+    so an interrupted run can be resumed and already written files are skipped.
+    Fingerprints of input files and parameters of the job are recorded too, so outputs of changed
+    inputs or parameters can be found (see is_up_to_date).
+
+    :param output_path: path of the output directory
+    :type output_path: str
+    :param name: name of the job (usually the stem of the input file)
+    :type name: str
+    """
+
+    def __init__(self, output_path, name):
+        self.output_path = output_path
+        self.name = name
+        self.path = os.path.join(output_path, MANIFESTS_DIR, name + '.json')
+        self.outputs = {}
+        self.completed = False
+        self.kind = ''
+        self.inputs = {}
+        self.params = {}
+        self.load()
+
+    def load(self):
+        """
+        Load the manifest from the disk (if it exists).
+        """
+        if not os.path.isfile(self.path):
+            return
+
+        try:
+            with open(self.path) as file:
+                data = json.load(file)
+        except ValueError:
+            # A broken manifest means the job has to be redone
+            return
+
+        self.outputs = data.get('outputs', {})
+        self.completed = data.get('completed', False)
+        self.kind = data.get('kind', '')
+        self.inputs = data.get('inputs', {})
+        self.params = data.get('params', {})
+
+    def save(self):
+        """
+        Save the manifest atomically, so a crash never leaves a half written manifest.
+        """
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        temp_path = self.path + '.tmp'
+        with open(temp_path, 'w') as file:
+            json.dump({
+                'name': self.name,
+                'kind': self.kind,
+                'completed': self.completed,
+                'inputs': self.inputs,
+                'params': self.params,
+                'outputs': self.outputs,
+            }, file, indent=2)
+        os.replace(temp_path, self.path)
+
+    def reset(self):
+        """
+        Forget everything what was done.
+        """
+        self.outputs = {}
+        self.completed = False
+        self.inputs = {}
+        self.params = {}
+        if os.path.isfile(self.path):
+            os.remove(self.path)
+
+    def remove_outputs(self):
+        """
+        Remove all recorded output files and forget everything what was done.
+        """
+        for file_name in self.outputs:
+            file_path = os.path.join(self.output_path, file_name)
+            if os.path.isfile(file_path):
+                os.remove(file_path)
+        self.reset()
+
+    def set_inputs(self, kind, input_paths, params, hash_content=False):
+        """
+        Record the kind of the job, fingerprints of its input files and its parameters.
+
+        :param kind: kind of the job (e.g. 'video' or 'amass')
+        :type kind: str
+        :param input_paths: paths of input files
+        :type input_paths: list of str
+        :param params: parameters which affect outputs (JSON serializable)
+        :type params: dict
+        :param hash_content: hash contents of input files
+        :type hash_content: bool
+        """
+        self.kind = kind
+        self.inputs = {os.path.abspath(path): get_fingerprint(path, hash_content) for path in input_paths}
+        self.params = params
+        self.save()
+
+    def is_up_to_date(self, input_paths, params):
+        """
+        Check whether recorded inputs and parameters are the same as these ones.
+
+        Inputs are compared by size and modification time; if the time differs but the content hash was recorded,
+        the content decides (its fingerprint is updated then).
+
+        :param input_paths: paths of input files
+        :type input_paths: list of str
+        :param params: parameters which affect outputs
+        :type params: dict
+        :return: True if outputs were made from the same inputs with the same parameters
+        :rtype: bool
+        """
+        input_paths = [os.path.abspath(path) for path in input_paths]
+        if params != self.params or sorted(input_paths) != sorted(self.inputs):
+            return False
+
+        for path in input_paths:
+            recorded = self.inputs[path]
+            if not os.path.isfile(path):
+                return False
+            fingerprint = get_fingerprint(path)
+            if fingerprint['size'] != recorded['size']:
+                return False
+            if fingerprint['mtime'] != recorded['mtime']:
+                if 'sha1' not in recorded or hash_file(path) != recorded['sha1']:
+                    return False
+                recorded['mtime'] = fingerprint['mtime']
+                self.save()
+        return True
+
+    def is_output_done(self, file_path):
+        """
+        Check whether the output file was fully written.
+
+        :param file_path: path of the output file
+        :type file_path: str
+        :return: True if the file is recorded and not changed since
+        :rtype: bool
+        """
+        file_name = Path(file_path).name
+        if file_name not in self.outputs or not os.path.isfile(file_path):
+            return False
+        return os.path.getsize(file_path) == self.outputs[file_name]
+
+    def add_output(self, file_path):
+        """
+        Record a fully written output file.
+
+        :param file_path: path of the output file
+        :type file_path: str
+        """
+        self.outputs[Path(file_path).name] = os.path.getsize(file_path)
+        self.save()
+
+    def mark_completed(self):
+        """
+        Mark the whole job as done.
+        """
+        self.completed = True
+        self.save()
+
+    def is_completed(self):
+        """
+        Check whether the whole job is done and all its outputs are still in place.
+
+        :return: True if the job can be skipped
+        :rtype: bool
+        """
+        if not self.completed:
+            return False
+        return all(
+            self.is_output_done(os.path.join(self.output_path, file_name))
+            for file_name in self.outputs
+        )
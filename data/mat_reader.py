@@ -0,0 +1,152 @@
+import numpy as np
+import scipy.io as sio
+
+HDF5_SIGNATURE = b'\x89HDF\r\n\x1a\n'
+
+# MATLAB v7.3 files are HDF5 files with a 512 bytes header
+HDF5_SIGNATURE_OFFSET = 512
+
+
+def is_hdf5(path):
+    """Check whether the .mat file is a MATLAB v7.3 (HDF5) file.
+
+    :param path: path to the .mat file
+    :type path: str
+    :return: True for v7.3 files
+    :rtype: bool
+    """
+    with open(path, 'rb') as file:
+        file.seek(HDF5_SIGNATURE_OFFSET)
+        return file.read(len(HDF5_SIGNATURE)) == HDF5_SIGNATURE
+
+
+def _to_python_value(value):
+    """Convert a value read with struct_as_record=False into plain Python/NumPy values.
+
+    :param value: value
+    :return: converted value
+    """
+    if isinstance(value, sio.matlab.mat_struct):
+        return {name: _to_python_value(getattr(value, name)) for name in value._fieldnames}
+    if isinstance(value, np.ndarray) and value.dtype == object:
+        return [_to_python_value(item) for item in value.ravel()]
+    return value
+
+
+class MatStruct:
+    """
+    Reader of a single struct variable of a .mat file (e.g. Subject_1_F_amass).
+
+    Only the struct variable is read, only the requested fields are converted and elements
+    of struct arrays are read one by one. MATLAB v5 files are read with scipy (without
+    converting the whole struct into dicts), v7.3 files are streamed with h5py.
+
+    :param path: path to the .mat file
+    :type path: str
+    :param prefix: prefix of the variable's name
+    :type prefix: str
+    """
+
+    def __init__(self, path, prefix='Subject'):
+        self.path = path
+        self.hdf5 = is_hdf5(path)
+
+        if self.hdf5:
+            import h5py
+            self.file = h5py.File(path, 'r')
+            self.name = [key for key in self.file.keys() if key.startswith(prefix)][0]
+            self.struct = self.file[self.name]
+        else:
+            self.file = None
+            self.name = [name for name, _, _ in sio.whosmat(path) if name.startswith(prefix)][0]
+            variables = sio.loadmat(
+                path,
+                variable_names=[self.name],
+                squeeze_me=True,
+                struct_as_record=False,
+                chars_as_strings=True
+            )
+            self.struct = variables[self.name]
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def close(self):
+        """Release the file (and the struct).
+        """
+        if self.file is not None:
+            self.file.close()
+            self.file = None
+        self.struct = None
+
+    def _read_hdf5(self, item):
+        """Read an HDF5 item of a MATLAB v7.3 file.
+
+        :param item: dataset or group
+        :return: value
+        """
+        import h5py
+        if isinstance(item, h5py.Group):
+            return {name: self._read_hdf5(item[name]) for name in item.keys()}
+
+        matlab_class = item.attrs.get('MATLAB_class', b'')
+        matlab_class = matlab_class.decode('utf-8') if isinstance(matlab_class, bytes) else matlab_class
+        if item.attrs.get('MATLAB_empty', 0):
+            return np.array([])
+
+        data = item[()]
+        if item.dtype == h5py.ref_dtype:
+            values = [self._read_hdf5(self.file[reference]) for reference in np.ravel(data.T)]
+            return values[0] if len(values) == 1 else values
+        if matlab_class == 'char':
+            return ''.join(chr(code) for code in np.ravel(data.T))
+        # MATLAB arrays are column-major
+        data = np.squeeze(data.T)
+        return data.item() if data.ndim == 0 else data
+
+    def get(self, field, sub_fields=None):
+        """Read a field of the struct.
+
+        :param field: name of the field
+        :type field: str
+        :param sub_fields: if the field is a (scalar) struct, only these fields of it are read
+        :type sub_fields: list of str
+        :return: value ({sub field: value} if sub fields are set)
+        """
+        if sub_fields is None:
+            if self.hdf5:
+                return self._read_hdf5(self.struct[field])
+            return _to_python_value(getattr(self.struct, field))
+
+        if self.hdf5:
+            return {name: self._read_hdf5(self.struct[field][name]) for name in sub_fields}
+        value = getattr(self.struct, field)
+        return {name: _to_python_value(getattr(value, name)) for name in sub_fields}
+
+    def iter_array(self, field, sub_fields):
+        """Read elements of a struct array field one by one.
+
+        :param field: name of the struct array field (e.g. 'move')
+        :type field: str
+        :param sub_fields: fields which are read from each element
+        :type sub_fields: list of str
+        :return: generator of {sub field: value}
+        :rtype: generator of dict
+        """
+        if self.hdf5:
+            group = self.struct[field]
+            references = {name: np.ravel(group[name][()].T) for name in sub_fields}
+            elements_num = len(references[sub_fields[0]])
+            for idx in range(elements_num):
+                yield {name: self._read_hdf5(self.file[references[name][idx]]) for name in sub_fields}
+            return
+
+        elements = np.atleast_1d(getattr(self.struct, field))
+        for idx in range(elements.shape[0]):
+            element = elements[idx]
+            yield {name: _to_python_value(getattr(element, name)) for name in sub_fields}
+            # Already returned elements are not needed anymore
+            elements[idx] = None
@@ -1,15 +1,42 @@
+import os
 import argparse
 import logging
 import glob
+import shutil
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, as_completed, wait
 from pathlib import Path
 import cv2
-import scipy.io as sio
 import numpy as np
+from common import ffmpeg
+from common import keyframe_index
+from common import profiling
+from common.catalog import parse_file_name
+from common.motion_store import MotionStoreWriter
+from common.pipeline import DEFAULT_QUEUE_SIZE, FramePipeline
+from data.manifest import Manifest, get_manifest_names
+from data.mat_reader import MatStruct
+from data.v3d_metadata import V3D_METADATA_DIR, read_v3d_metadata
 
 logging.basicConfig(format='%(asctime)s - %(levelname)s - %(message)s', level=logging.INFO)
 console_handler = logging.StreamHandler()
 console_handler.setLevel(logging.DEBUG)
 
+# Gaps between sub videos longer than this (in frames) are skipped by seeking instead of grabbing frames
+SEEK_THRESHOLD = 30
+
+# Directory (inside the output directory) of the memory mapped motion capture store
+MOTION_STORE_DIR = 'motion_store'
+
+# Extracted fields of moves and their names in AMASS .mat files
+AMASS_MOVE_FIELDS = {
+    'root_translation': 'RootTranslation_amass',
+    'joints_betas': 'jointsBetas_amass',
+    'joints_location': 'jointsLocation_amass',
+    'joints_exponential_mapping': 'jointsExpMaps_amass',
+    'joints_parent': 'jointsParent',
+    'description': 'description',
+}
+
 
 def get_flags():
     """Get command flags.
@@ -34,33 +61,49 @@ def get_flags():
                         help='Path to the the output of the prepared dataset..',
                         default='./output/',
                         type=str)
+    parser.add_argument('--workers',
+                        help='Number of processes used for preparing the dataset.',
+                        default=1,
+                        type=int)
+    parser.add_argument('--split_backend',
+                        help='How videos are cut: copy (ffmpeg stream copy), opencv (re-encode), ffmpeg (re-encode) '
+                             'or auto.',
+                        default='auto',
+                        choices=['auto', 'copy', 'opencv', 'ffmpeg'],
+                        type=str)
+    parser.add_argument('--keyframe_interval',
+                        help='Maximum number of frames between keyframes of sub videos (ffmpeg re-encoding).',
+                        type=int)
+    parser.add_argument('--queue_size',
+                        help='Maximum number of decoded frames waiting for encoding (opencv re-encoding).',
+                        default=DEFAULT_QUEUE_SIZE,
+                        type=int)
+    parser.add_argument('--keyframe_index',
+                        help='Write the keyframe index next to every sub video (fast random access).',
+                        action='store_true')
+    parser.add_argument('--amass_format',
+                        help='Output of AMASS files: npz (file per move) or store (memory mapped store).',
+                        default='npz',
+                        choices=['npz', 'store'],
+                        type=str)
+    parser.add_argument('--overwrite',
+                        help='Ignore completion manifests and prepare everything again.',
+                        action='store_true')
+    parser.add_argument('--incremental',
+                        help='Rebuild only outputs of changed inputs or parameters and remove outputs of removed inputs.',
+                        action='store_true')
+    parser.add_argument('--hash_inputs',
+                        help='Record SHA-1 of inputs, so touched but unchanged inputs aren\'t rebuilt by --incremental.',
+                        action='store_true')
+    parser.add_argument('--profile_report',
+                        help='Path to the JSON report of stage timings, throughputs and peak memory.',
+                        type=str)
+    parser.add_argument('--cprofile',
+                        help='Path to the cProfile dump (pstats) of the main process.',
+                        type=str)
     return parser
 
 
-def get_motions_list_from_v3d(v3d_file):
-    """Get motions list from V3D files.
-
-    :param v3d_file: V3D loaded file
-    :type: dict
-    :return: list of motions
-    :rtype: numpy.ndarray
-    """
-    key = [key for key in v3d_file.keys() if key.startswith('Subject')][0]
-    return v3d_file[key]['move']['motions_list']
-
-
-def get_sub_video_ranges_from_v3d(v3d_file):
-    """Get sub video ranges from V3D file.
-
-    :param v3d_file: V3D loaded file
-    :type: dict
-    :return: sub video ranges [[start, end],...]
-    :rtype: numpy.ndarray
-    """
-    key = [key for key in v3d_file.keys() if key.startswith('Subject')][0]
-    return v3d_file[key]['move']['flags30']
-
-
 def create_video_writer(width, height, fps, output_path):
     """Creates an object of the OpenCV video writer.
 
@@ -79,8 +122,27 @@ def create_video_writer(width, height, fps, output_path):
     return cv2.VideoWriter(output_path, fourcc, fps, (width, height))
 
 
-def split_video(video_path, v3d_path, output_path):
-    """Split a video into sub videos.
+def index_sub_video(output_video_path, manifest=None):
+    """Write the keyframe index of a sub video next to it (see common/keyframe_index.py).
+
+    :param output_video_path: path of the sub video
+    :type output_video_path: str
+    :param manifest: completion manifest, the index is recorded in it
+    :type manifest: Manifest
+    """
+    with profiling.stage('indexing'):
+        index = keyframe_index.write_keyframe_index(output_video_path)
+    if index is None:
+        logging.warning(output_video_path + ' couldn\'t be indexed: it has no AVI index.')
+        return
+    if manifest is not None:
+        manifest.add_output(keyframe_index.get_keyframe_index_path(output_video_path))
+
+
+def get_sub_videos(video_path, v3d_path, output_path):
+    """Get sub videos which have to be cut from the video.
+
+    Metadata of the V3D file is read from its sidecar in the output directory (see data.v3d_metadata).
 
     :param video_path: path of the video
     :type video_path: str
@@ -88,48 +150,378 @@ def split_video(video_path, v3d_path, output_path):
     :type v3d_path: str
     :param output_path: path of output directory
     :type output_path: str
+    :return: list of (output video path, first frame, last frame), frames are counted from 1
+    :rtype: list of tuple
+    """
+    v3d_metadata = read_v3d_metadata(v3d_path, os.path.join(output_path, V3D_METADATA_DIR))
+    motions_num = len(v3d_metadata['motions_list'])
+    video_ranges = v3d_metadata['flags30']
+
+    sub_videos = []
+    for idx in range(motions_num):
+        output_video_name = Path(video_path).stem + '_' + str(idx + 1) + '.avi'
+        output_video_path = output_path + '/' + output_video_name
+        sub_videos.append((output_video_path, int(video_ranges[idx][0]), int(video_ranges[idx][1])))
+    return sub_videos
+
+
+def split_video_by_stream_copy(video_path, sub_videos, manifest=None, write_index=False):
+    """Cut sub videos without decoding and re-encoding (ffmpeg stream copy).
+
+    Sub videos keep keyframes of the video.
+
+    :param video_path: path of the video
+    :type video_path: str
+    :param sub_videos: list of (output video path, first frame, last frame)
+    :type sub_videos: list of tuple
+    :param manifest: completion manifest, sub videos recorded in it are skipped
+    :type manifest: Manifest
+    :param write_index: write the keyframe index next to every sub video
+    :type write_index: bool
+    """
+    cap = cv2.VideoCapture(video_path)
+    fps = cap.get(cv2.CAP_PROP_FPS)
+    cap.release()
+
+    for output_video_path, video_start, video_end in sub_videos:
+        if manifest is not None and manifest.is_output_done(output_video_path):
+            continue
+
+        frames_num = video_end - video_start + 1
+        with profiling.stage('stream_copy', frames_num):
+            ffmpeg.copy_frames(video_path, output_video_path, video_start - 1, frames_num, fps)
+        profiling.PROFILER.count('written_bytes', os.path.getsize(output_video_path))
+        if write_index:
+            index_sub_video(output_video_path, manifest)
+        if manifest is not None:
+            manifest.add_output(output_video_path)
+
+
+def split_video_by_ffmpeg_reencoding(video_path, sub_videos, manifest=None, keyframe_interval=None,
+                                     write_index=False):
+    """Cut sub videos by re-encoding their frames with ffmpeg, which can set the keyframe interval.
+
+    :param video_path: path of the video
+    :type video_path: str
+    :param sub_videos: list of (output video path, first frame, last frame)
+    :type sub_videos: list of tuple
+    :param manifest: completion manifest, sub videos recorded in it are skipped
+    :type manifest: Manifest
+    :param keyframe_interval: maximum number of frames between keyframes of sub videos, optional
+    :type keyframe_interval: int
+    :param write_index: write the keyframe index next to every sub video
+    :type write_index: bool
     """
-    v3d_file = sio.loadmat(v3d_path, simplify_cells=True)
-    motion_list = get_motions_list_from_v3d(v3d_file)
-    motions_num = len(motion_list)
-    video_ranges = get_sub_video_ranges_from_v3d(v3d_file)
+    cap = cv2.VideoCapture(video_path)
+    fps = cap.get(cv2.CAP_PROP_FPS)
+    cap.release()
+
+    for output_video_path, video_start, video_end in sub_videos:
+        if manifest is not None and manifest.is_output_done(output_video_path):
+            continue
+
+        frames_num = video_end - video_start + 1
+        with profiling.stage('ffmpeg_encode', frames_num):
+            ffmpeg.encode_frames(video_path, output_video_path, video_start - 1, frames_num, fps, keyframe_interval)
+        profiling.PROFILER.count('written_bytes', os.path.getsize(output_video_path))
+        if write_index:
+            index_sub_video(output_video_path, manifest)
+        if manifest is not None:
+            manifest.add_output(output_video_path)
+
+
+def split_video_by_reencoding(video_path, sub_videos, manifest=None, queue_size=DEFAULT_QUEUE_SIZE,
+                              write_index=False):
+    """Cut sub videos by seeking to each of them and re-encoding their frames (OpenCV).
+
+    Frames are decoded and encoded by separate threads (see FramePipeline). If the video has an AVI index,
+    the sub videos are reached through its keyframes.
 
+    :param video_path: path of the video
+    :type video_path: str
+    :param sub_videos: list of (output video path, first frame, last frame)
+    :type sub_videos: list of tuple
+    :param manifest: completion manifest, sub videos recorded in it are skipped
+    :type manifest: Manifest
+    :param queue_size: maximum number of decoded frames waiting for encoding
+    :type queue_size: int
+    :param write_index: write the keyframe index next to every sub video
+    :type write_index: bool
+    """
     cap = cv2.VideoCapture(video_path)
+    index = keyframe_index.read_avi_index(video_path)
+    keyframes = np.array(index['keyframes'], dtype=int) if index is not None else None
 
     width = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH))
     height = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
     fps = cap.get(cv2.CAP_PROP_FPS)
 
+    # Number of the frame which will be read next (counted from 1)
     current_frame_num = 1
-    current_video_num = 0
 
-    video = None
-    while cap.isOpened():
-        if current_video_num >= motions_num:
-            break
+    def read_frames(last_frame_num):
+        nonlocal current_frame_num
+        while current_frame_num <= last_frame_num:
+            ret, frame = cap.read()
+            if not ret:
+                logging.warning('{} ended before frame {}.'.format(video_path, last_frame_num))
+                return
+            current_frame_num = current_frame_num + 1
+            yield frame
+
+    for output_video_path, video_start, video_end in sub_videos:
+        if manifest is not None and manifest.is_output_done(output_video_path):
+            continue
+
+        with profiling.stage('seek'):
+            if keyframes is not None:
+                # Frames of the keyframe index are counted from 0
+                current_frame_num = keyframe_index.seek(cap, current_frame_num - 1, video_start - 1, keyframes) + 1
+            elif video_start < current_frame_num or video_start - current_frame_num > SEEK_THRESHOLD:
+                cap.set(cv2.CAP_PROP_POS_FRAMES, video_start - 1)
+                current_frame_num = video_start
+
+            # Short gaps are skipped without decoding the frames
+            while current_frame_num < video_start and cap.grab():
+                current_frame_num = current_frame_num + 1
+
+        video = create_video_writer(width, height, fps, output_video_path)
+        FramePipeline(read_frames(video_end), write=video.write, queue_size=queue_size).run()
+        video.release()
+        profiling.PROFILER.count('written_bytes', os.path.getsize(output_video_path))
+        if write_index:
+            index_sub_video(output_video_path, manifest)
+
+        if manifest is not None:
+            manifest.add_output(output_video_path)
+    cap.release()
+
+
+def split_video(video_path, v3d_path, output_path, manifest=None, backend='auto', keyframe_interval=None,
+                write_index=False, queue_size=DEFAULT_QUEUE_SIZE):
+    """Split a video into sub videos.
+
+    :param video_path: path of the video
+    :type video_path: str
+    :param v3d_path: path of the V3D file
+    :type v3d_path: str
+    :param output_path: path of output directory
+    :type output_path: str
+    :param manifest: completion manifest, sub videos recorded in it are skipped
+    :type manifest: Manifest
+    :param backend: 'copy' - ffmpeg stream copy, 'opencv' - seek and re-encode, 'ffmpeg' - re-encode by ffmpeg,
+        'auto' - ffmpeg if the keyframe interval is set, stream copy if ffmpeg is installed and every frame
+        is a keyframe, otherwise opencv
+    :type backend: str
+    :param keyframe_interval: maximum number of frames between keyframes of sub videos (see check_split_backend)
+    :type keyframe_interval: int
+    :param write_index: write the keyframe index next to every sub video
+    :type write_index: bool
+    :param queue_size: maximum number of decoded frames waiting for encoding (opencv re-encoding)
+    :type queue_size: int
+    """
+    sub_videos = get_sub_videos(video_path, v3d_path, output_path)
+
+    if backend == 'auto':
+        if keyframe_interval is not None:
+            backend = 'ffmpeg'
+        else:
+            backend = 'copy' if ffmpeg.is_available() and ffmpeg.is_intra_only(video_path) else 'opencv'
 
-        ret, frame = cap.read()
+    if backend == 'copy':
+        split_video_by_stream_copy(video_path, sub_videos, manifest, write_index)
+    elif backend == 'ffmpeg':
+        split_video_by_ffmpeg_reencoding(video_path, sub_videos, manifest, keyframe_interval, write_index)
+    else:
+        split_video_by_reencoding(video_path, sub_videos, manifest, queue_size, write_index)
 
-        video_start = video_ranges[current_video_num][0]
-        video_end = video_ranges[current_video_num][1]
 
-        if video_start <= current_frame_num <= video_end:
-            if current_frame_num == video_start:
-                output_video_name = Path(video_path).stem + '_' + str(current_video_num + 1) + '.avi'
-                output_video_path = output_path + '/' + output_video_name
-                video = create_video_writer(width, height, fps, output_video_path)
+def check_split_backend(backend, keyframe_interval=None):
+    """Check that the backend can be used and can apply the keyframe interval.
 
-            video.write(frame)
+    Only ffmpeg re-encoding sets the keyframe interval: the stream copy keeps keyframes of the source and
+    the OpenCV writer ignores the interval in some builds.
 
-            if current_frame_num == video_end:
-                video.release()
-                current_video_num = current_video_num + 1
+    :param backend: backend of the splitting (see split_video)
+    :type backend: str
+    :param keyframe_interval: maximum number of frames between keyframes of sub videos, optional
+    :type keyframe_interval: int
+    """
+    if keyframe_interval is not None:
+        assert keyframe_interval > 0, 'Keyframe interval should be positive.'
+        assert backend in ('auto', 'ffmpeg'), \
+            'Keyframe interval is set only by ffmpeg re-encoding, it can\'t be used with the {} backend.'.format(backend)
+    if backend in ('copy', 'ffmpeg') or keyframe_interval is not None:
+        assert ffmpeg.is_available(), 'ffmpeg and ffprobe have to be installed to split videos by ffmpeg.'
+
+
+def run_jobs(function, jobs, workers=1):
+    """Run jobs sequentially or in a pool of processes.
+
+    A failed job is logged and does not stop the others.
+
+    :param function: function which does a single job
+    :type function: callable
+    :param jobs: arguments of the jobs
+    :type jobs: list of tuple
+    :param workers: number of processes
+    :type workers: int
+    :return: number of failed jobs
+    :rtype: int
+    """
+    failed_num = 0
+    if workers > 1:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            futures = {executor.submit(profiling.run_profiled, function, *job): job for job in jobs}
+            for future in as_completed(futures):
+                try:
+                    _, snapshot = future.result()
+                    profiling.PROFILER.merge(snapshot)
+                except Exception:
+                    logging.exception('Job {} failed.'.format(futures[future]))
+                    failed_num = failed_num + 1
+    else:
+        for job in jobs:
+            try:
+                function(*job)
+            except Exception:
+                logging.exception('Job {} failed.'.format(job))
+                failed_num = failed_num + 1
+    return failed_num
+
+
+def get_video_jobs(video_paths, v3d_paths):
+    """Pair videos with their V3D files.
+
+    :param video_paths: paths of videos
+    :type video_paths: list of str
+    :param v3d_paths: paths of V3D files
+    :type v3d_paths: list of str
+    :return: pairs of (video path, V3D path)
+    :rtype: list of tuple
+    """
+    v3d_entries = {}
+    for v3d_path in v3d_paths:
+        entry = parse_file_name(v3d_path)
+        if entry is not None and entry.kind == 'v3d':
+            v3d_entries[(entry.round, entry.subject)] = v3d_path
+
+    jobs = []
+    for video_path in video_paths:
+        entry = parse_file_name(video_path)
+        v3d_path = v3d_entries.get((entry.round, entry.subject)) if entry is not None else None
+        if v3d_path is not None:
+            jobs.append((video_path, v3d_path))
+        else:
+            logging.warning(video_path + ' couldn\'t be split: V3D file for the video is not found.')
+    return jobs
+
+
+def open_job_manifest(output_path, name, kind, input_paths, params, overwrite=False, incremental=False,
+                      hash_inputs=False):
+    """Open the manifest of a job and decide whether the job has to be run.
+
+    In the incremental mode, outputs of a job whose inputs or parameters changed are removed, so the job is redone.
+
+    :param output_path: path of the output directory
+    :type output_path: str
+    :param name: name of the job
+    :type name: str
+    :param kind: kind of the job ('video' or 'amass')
+    :type kind: str
+    :param input_paths: paths of input files of the job
+    :type input_paths: list of str
+    :param params: parameters which affect outputs of the job
+    :type params: dict
+    :param overwrite: ignore the completion manifest
+    :type overwrite: bool
+    :param incremental: rebuild outputs of changed inputs or parameters
+    :type incremental: bool
+    :param hash_inputs: record SHA-1 of input files
+    :type hash_inputs: bool
+    :return: the manifest or None if the job is already done
+    :rtype: Manifest
+    """
+    manifest = Manifest(output_path, name)
+    if overwrite:
+        manifest.reset()
+    elif incremental and not manifest.is_up_to_date(input_paths, params):
+        if len(manifest.outputs) > 0:
+            logging.info('Rebuilding (inputs or parameters changed): ' + name)
+        manifest.remove_outputs()
+    elif manifest.is_completed():
+        return None
+
+    if not manifest.inputs:
+        manifest.set_inputs(kind, input_paths, params, hash_inputs)
+    return manifest
 
-        current_frame_num = current_frame_num + 1
-    cap.release()
 
+def remove_orphans(output_path, kind, input_paths):
+    """Remove outputs and manifests of jobs whose input files are gone.
 
-def split_videos(video_paths, v3d_paths, output_path):
+    :param output_path: path of the output directory
+    :type output_path: str
+    :param kind: kind of jobs ('video' or 'amass')
+    :type kind: str
+    :param input_paths: paths of all input files of this kind
+    :type input_paths: list of str
+    """
+    names = {Path(path).stem for path in input_paths}
+    for name in get_manifest_names(output_path):
+        if name in names:
+            continue
+        manifest = Manifest(output_path, name)
+        if manifest.kind == kind:
+            logging.info('Removing outputs of the removed input: ' + name)
+            manifest.remove_outputs()
+
+
+def split_video_job(video_path, v3d_path, output_path, overwrite=False, backend='auto', incremental=False,
+                    hash_inputs=False, keyframe_interval=None, write_index=False, queue_size=DEFAULT_QUEUE_SIZE):
+    """Split a video into sub videos unless it was already done.
+
+    :param video_path: path of the video
+    :type video_path: str
+    :param v3d_path: path of the V3D file
+    :type v3d_path: str
+    :param output_path: path of output directory
+    :type output_path: str
+    :param overwrite: ignore the completion manifest
+    :type overwrite: bool
+    :param backend: backend of the splitting (see split_video)
+    :type backend: str
+    :param incremental: redo the job if the video, V3D file or the backend changed
+    :type incremental: bool
+    :param hash_inputs: record SHA-1 of the video and V3D file
+    :type hash_inputs: bool
+    :param keyframe_interval: maximum number of frames between keyframes of sub videos, optional
+    :type keyframe_interval: int
+    :param write_index: write the keyframe index next to every sub video
+    :type write_index: bool
+    :param queue_size: maximum number of decoded frames waiting for encoding, it doesn't change sub videos
+    :type queue_size: int
+    """
+    params = {'backend': backend}
+    if keyframe_interval is not None:
+        params['keyframe_interval'] = keyframe_interval
+    if write_index:
+        params['write_index'] = write_index
+    manifest = open_job_manifest(
+        output_path, Path(video_path).stem, 'video', [video_path, v3d_path], params, overwrite, incremental,
+        hash_inputs
+    )
+    if manifest is None:
+        logging.info('Skipping (already split): ' + video_path)
+        return
+
+    logging.info('Splitting: ' + video_path)
+    split_video(video_path, v3d_path, output_path, manifest, backend, keyframe_interval, write_index, queue_size)
+    manifest.mark_completed()
+
+
+def split_videos(video_paths, v3d_paths, output_path, workers=1, overwrite=False, backend='auto', incremental=False,
+                 hash_inputs=False, keyframe_interval=None, write_index=False, queue_size=DEFAULT_QUEUE_SIZE):
     """Split videos into sub videos.
 
     :param video_paths: paths of videos
@@ -138,77 +530,263 @@ def split_videos(video_paths, v3d_paths, output_path):
     :type v3d_paths: list of str
     :param output_path: path of the output directory
     :type output_path: str
+    :param workers: number of processes
+    :type workers: int
+    :param overwrite: ignore completion manifests
+    :type overwrite: bool
+    :param backend: backend of the splitting (see split_video)
+    :type backend: str
+    :param incremental: redo only jobs of changed inputs and remove outputs of removed videos
+    :type incremental: bool
+    :param hash_inputs: record SHA-1 of inputs
+    :type hash_inputs: bool
+    :param keyframe_interval: maximum number of frames between keyframes of sub videos (see check_split_backend)
+    :type keyframe_interval: int
+    :param write_index: write the keyframe index next to every sub video
+    :type write_index: bool
+    :param queue_size: maximum number of decoded frames waiting for encoding (opencv re-encoding)
+    :type queue_size: int
     """
+    check_split_backend(backend, keyframe_interval)
     logging.info('Starting splitting videos.')
-    for video_path in video_paths:
-        partial_name = video_path[15:-6]
-
-        v3d_filtered_paths = list(filter(lambda element: partial_name in element, v3d_paths))
-        if len(v3d_filtered_paths) > 0:
-            logging.info('Splitting: ' + video_path)
-            v3d_path = v3d_filtered_paths[0]
-            split_video(video_path, v3d_path, output_path)
-        else:
-            logging.warning(video_path + ' couldn\'t be split: V3D file for the video is not found.')
+    if incremental:
+        remove_orphans(output_path, 'video', video_paths)
+    video_jobs = get_video_jobs(video_paths, v3d_paths)
+
+    # Every V3D file is parsed once, camera views of the subject share its metadata sidecar
+    metadata_dir = os.path.join(output_path, V3D_METADATA_DIR)
+    metadata_jobs = [(v3d_path, metadata_dir) for v3d_path in sorted({v3d_path for _, v3d_path in video_jobs})]
+    run_jobs(read_v3d_metadata, metadata_jobs, workers)
+
+    jobs = [
+        (
+            video_path, v3d_path, output_path, overwrite, backend, incremental, hash_inputs, keyframe_interval,
+            write_index, queue_size
+        )
+        for video_path, v3d_path in video_jobs
+    ]
+    failed_num = run_jobs(split_video_job, jobs, workers)
+    if failed_num > 0:
+        logging.warning('{} video(s) couldn\'t be split.'.format(failed_num))
     logging.info('Finished splitting videos.')
 
 
-def split_amass_file(path, output_path):
+def extract_amass_moves(path):
+    """Extract moves from an AMASS .mat file one by one.
+
+    Only the subject's struct and the needed fields of moves are read (see data.mat_reader.MatStruct),
+    MATLAB v7.3 files are streamed move by move.
+
+    :param path: path of the Amass file
+    :type path: str
+    :return: generator of moves' fields (see common.motion_store.FRAME_FIELDS and MOVE_FIELDS)
+    :rtype: generator of dict
+    """
+    with profiling.stage('mat_loading', 0, os.path.getsize(path)):
+        amass_struct = MatStruct(path, 'Subject')
+
+    with amass_struct:
+        subject_id = amass_struct.get('id')
+        subject = amass_struct.get('subject')
+        moves = amass_struct.iter_array('move', list(AMASS_MOVE_FIELDS.values()))
+        for val in profiling.PROFILER.iterate('mat_parsing', moves):
+            move = {'id': subject_id, 'subject': subject}
+            move.update({name: val[mat_name] for name, mat_name in AMASS_MOVE_FIELDS.items()})
+            yield move
+
+
+def read_amass_moves(path):
+    """Read all moves of an AMASS .mat file (results of worker processes have to be lists).
+
+    :param path: path of the Amass file
+    :type path: str
+    :return: list of moves' fields
+    :rtype: list of dict
+    """
+    return list(extract_amass_moves(path))
+
+
+def split_amass_file(path, output_path, manifest=None):
     """Split an AMASS .mat file and save them into npz files.
 
     :param path: path of the Amass file
     :type path: str
     :param output_path: path of output directory
     :type output_path: str
+    :param manifest: completion manifest, npz files recorded in it are skipped
+    :type manifest: Manifest
     """
-    amass_file = sio.loadmat(path, simplify_cells=True)
-    key = [key for key in amass_file.keys() if key.startswith('Subject')][0]
-    subject_id = amass_file[key]['id']
-    subject = amass_file[key]['subject']
-    moves = amass_file[key]['move']
-
-    for idx, val in enumerate(moves):
+    for idx, val in enumerate(extract_amass_moves(path)):
         output_file_name = output_path + '/' + Path(path).stem + '_' + str(idx + 1) + '.npz'
-        root_translation = val['RootTranslation_amass']
-        joints_betas = val['jointsBetas_amass']
-        joints_location = val['jointsLocation_amass']
-        joints_exponential_mapping = val['jointsExpMaps_amass']
-        joints_parent = val['jointsParent']
-        description = val['description']
-        np.savez(
-            output_file_name,
-            id=subject_id,
-            subject=subject,
-            root_translation=root_translation,
-            joints_betas=joints_betas,
-            joints_location=joints_location,
-            joints_exponential_mapping=joints_exponential_mapping,
-            joints_parent=joints_parent,
-            description=description,
-        )
+        if manifest is not None and manifest.is_output_done(output_file_name):
+            continue
+
+        with profiling.stage('npz_writing', 1, sum(np.asarray(array).nbytes for array in val.values())):
+            np.savez(output_file_name, **val)
+        profiling.PROFILER.count('written_bytes', os.path.getsize(output_file_name))
+        if manifest is not None:
+            manifest.add_output(output_file_name)
 
 
-def split_amass_files(amass_paths, output_path):
+def split_amass_file_job(path, output_path, overwrite=False, incremental=False, hash_inputs=False):
+    """Split an AMASS .mat file unless it was already done.
+
+    :param path: path of the Amass file
+    :type path: str
+    :param output_path: path of output directory
+    :type output_path: str
+    :param overwrite: ignore the completion manifest
+    :type overwrite: bool
+    :param incremental: redo the job if the AMASS file changed
+    :type incremental: bool
+    :param hash_inputs: record SHA-1 of the AMASS file
+    :type hash_inputs: bool
+    """
+    manifest = open_job_manifest(
+        output_path, Path(path).stem, 'amass', [path], {'amass_format': 'npz'}, overwrite, incremental, hash_inputs
+    )
+    if manifest is None:
+        logging.info('Skipping (already split): ' + path)
+        return
+
+    logging.info('Splitting: ' + path)
+    split_amass_file(path, output_path, manifest)
+    manifest.mark_completed()
+
+
+def split_amass_files(amass_paths, output_path, workers=1, overwrite=False, incremental=False, hash_inputs=False):
     """Split AMASS .mat files and save them into npz files.
 
     :param amass_paths: paths of Amass files
     :type amass_paths: list of str
     :param output_path: path of the output directory
     :type output_path: str
+    :param workers: number of processes
+    :type workers: int
+    :param overwrite: ignore completion manifests
+    :type overwrite: bool
+    :param incremental: redo only jobs of changed AMASS files and remove outputs of removed files
+    :type incremental: bool
+    :param hash_inputs: record SHA-1 of AMASS files
+    :type hash_inputs: bool
     """
     logging.info('Starting splitting Amass files.')
-    for path in amass_paths:
-        split_amass_file(path, output_path)
-
+    if incremental:
+        remove_orphans(output_path, 'amass', amass_paths)
+    jobs = [(path, output_path, overwrite, incremental, hash_inputs) for path in amass_paths]
+    failed_num = run_jobs(split_amass_file_job, jobs, workers)
+    if failed_num > 0:
+        logging.warning('{} Amass file(s) couldn\'t be split.'.format(failed_num))
     logging.info('Finished splitting Amass files.')
 
 
+def store_amass_file(writer, path, moves):
+    """Add moves of an AMASS file to the store and save the store.
+
+    :param writer: writer of the store
+    :type writer: MotionStoreWriter
+    :param path: path of the Amass file
+    :type path: str
+    :param moves: moves' fields (see extract_amass_moves)
+    :type moves: iterable of dict
+    """
+    logging.info('Storing: ' + path)
+    subject_number = parse_file_name(path).subject
+    for idx, val in enumerate(moves):
+        name = Path(path).stem + '_' + str(idx + 1)
+        with profiling.stage('store_writing', 1):
+            writer.add_move(subject_number, idx + 1, name, val)
+    writer.add_file(Path(path).stem)
+    with profiling.stage('store_flushing'):
+        writer.flush()
+
+
+def write_motion_store(amass_paths, output_path, workers=1, overwrite=False):
+    """Write moves of AMASS .mat files into the memory mapped motion capture store.
+
+    .mat files are parsed by the pool of processes, the store is written by this process in the order in which
+    the files are parsed. A failed file is logged and does not stop the others, its moves aren't stored.
+
+    :param amass_paths: paths of Amass files
+    :type amass_paths: list of str
+    :param output_path: path of the output directory
+    :type output_path: str
+    :param workers: number of processes
+    :type workers: int
+    :param overwrite: write the store from scratch
+    :type overwrite: bool
+    """
+    logging.info('Starting writing the motion capture store.')
+    store_path = os.path.join(output_path, MOTION_STORE_DIR)
+    if overwrite and os.path.isdir(store_path):
+        shutil.rmtree(store_path)
+
+    failed_num = 0
+
+    def store(path, moves):
+        nonlocal failed_num
+        try:
+            store_amass_file(writer, path, moves)
+        except Exception:
+            logging.exception('Storing of {} failed.'.format(path))
+            failed_num = failed_num + 1
+            # Moves stored before the failure are dropped, so the file is stored again by the next run
+            writer.rollback()
+
+    def collect(done_futures):
+        nonlocal failed_num
+        for future in done_futures:
+            path = futures.pop(future)
+            try:
+                moves, snapshot = future.result()
+                profiling.PROFILER.merge(snapshot)
+            except Exception:
+                logging.exception('Reading of {} failed.'.format(path))
+                failed_num = failed_num + 1
+                continue
+            store(path, moves)
+
+    with MotionStoreWriter(store_path) as writer:
+        amass_paths = [path for path in amass_paths if not writer.contains_file(Path(path).stem)]
+        if workers > 1:
+            with ProcessPoolExecutor(max_workers=workers) as executor:
+                futures = {}
+                for path in amass_paths:
+                    futures[executor.submit(profiling.run_profiled, read_amass_moves, path)] = path
+
+                    # Only a few files are parsed ahead, so their moves don't pile up in memory
+                    if len(futures) >= 2 * workers:
+                        collect(wait(futures, return_when=FIRST_COMPLETED).done)
+                collect(wait(futures).done)
+        else:
+            # A single process streams moves straight from the file into the store
+            for path in amass_paths:
+                store(path, extract_amass_moves(path))
+    if failed_num > 0:
+        logging.warning('{} Amass file(s) couldn\'t be stored.'.format(failed_num))
+    logging.info('Finished writing the motion capture store.')
+
+
 if __name__ == '__main__':
     args = get_flags().parse_args()
+    if args.incremental and args.amass_format == 'store':
+        logging.warning(
+            '--incremental doesn\'t apply to the motion capture store, it\'s only appended to '
+            '(changed AMASS files are stored again only with --overwrite).'
+        )
 
     video_paths = glob.glob(args.videos + '/*.avi')
     v3d_paths = glob.glob(args.v3d + '/*.mat')
     amass_paths = glob.glob(args.amass + '/*.mat')
     output_path = args.output
-    split_videos(video_paths, v3d_paths, output_path)
-    split_amass_files(amass_paths, output_path)
+    with profiling.profile_run(args.profile_report, args.cprofile):
+        split_videos(
+            video_paths, v3d_paths, output_path, args.workers, args.overwrite, args.split_backend, args.incremental,
+            args.hash_inputs, args.keyframe_interval, args.keyframe_index, args.queue_size
+        )
+        if args.amass_format == 'store':
+            write_motion_store(amass_paths, output_path, args.workers, args.overwrite)
+        else:
+            split_amass_files(
+                amass_paths, output_path, args.workers, args.overwrite, args.incremental, args.hash_inputs
+            )
@@ -0,0 +1,80 @@
+import os
+import json
+from pathlib import Path
+import numpy as np
+from common import profiling
+from data.mat_reader import MatStruct
+
+V3D_METADATA_DIR = '.v3d_metadata'
+
+# Fields of the move struct of V3D files which are needed for splitting videos
+V3D_METADATA_FIELDS = ('motions_list', 'flags30', 'flags120')
+
+
+def parse_v3d_metadata(v3d_path):
+    """Read metadata of moves from a V3D .mat file.
+
+    :param v3d_path: path of the V3D file
+    :type v3d_path: str
+    :return: {'motions_list': list of str, 'flags30': [[start, end],...], 'flags120': [[start, end],...]}
+    :rtype: dict
+    """
+    with profiling.stage('v3d_parsing', 1, os.path.getsize(v3d_path)):
+        with MatStruct(v3d_path, 'Subject') as v3d_struct:
+            move = v3d_struct.get('move', list(V3D_METADATA_FIELDS))
+
+    motions_list = move['motions_list']
+    return {
+        'motions_list': [motions_list] if isinstance(motions_list, str) else [str(val) for val in motions_list],
+        'flags30': np.reshape(move['flags30'], (-1, 2)).tolist(),
+        'flags120': np.reshape(move['flags120'], (-1, 2)).tolist(),
+    }
+
+
+def get_sidecar_path(v3d_path, metadata_dir):
+    """Get path of the metadata sidecar of a V3D file.
+
+    :param v3d_path: path of the V3D file
+    :type v3d_path: str
+    :param metadata_dir: directory of sidecars
+    :type metadata_dir: str
+    :return: path of the sidecar
+    :rtype: str
+    """
+    return os.path.join(metadata_dir, Path(v3d_path).stem + '.json')
+
+
+def read_v3d_metadata(v3d_path, metadata_dir=None):
+    """Read metadata of moves of a V3D file, the .mat file is parsed only if its sidecar is missing or stale.
+
+    A sidecar is stale when size or modification time of the V3D file differs from the recorded ones.
+
+    :param v3d_path: path of the V3D file
+    :type v3d_path: str
+    :param metadata_dir: directory of sidecars, the file is always parsed if it isn't set
+    :type metadata_dir: str
+    :return: metadata (see parse_v3d_metadata)
+    :rtype: dict
+    """
+    if metadata_dir is None:
+        return parse_v3d_metadata(v3d_path)
+
+    stat = os.stat(v3d_path)
+    sidecar_path = get_sidecar_path(v3d_path, metadata_dir)
+    if os.path.isfile(sidecar_path):
+        try:
+            with open(sidecar_path) as file:
+                sidecar = json.load(file)
+            if sidecar['size'] == stat.st_size and sidecar['mtime'] == stat.st_mtime:
+                return sidecar['metadata']
+        except (ValueError, KeyError):
+            # A broken sidecar is parsed again
+            pass
+
+    metadata = parse_v3d_metadata(v3d_path)
+    os.makedirs(metadata_dir, exist_ok=True)
+    temp_path = sidecar_path + '.{}.tmp'.format(os.getpid())
+    with open(temp_path, 'w') as file:
+        json.dump({'size': stat.st_size, 'mtime': stat.st_mtime, 'metadata': metadata}, file)
+    os.replace(temp_path, sidecar_path)
+    return metadata
@@ -0,0 +1,204 @@
+import os
+import argparse
+import logging
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from pathlib import Path
+from common import profiling
+from common import projection
+from common import utils
+from common.catalog import DatasetCatalog
+from common.motion_capture import INTERPOLATION_METHODS
+from data_player.overlay import QUALITY_MODES, OverlayRenderer
+from data_player.player import render_video
+
+logging.basicConfig(format='%(asctime)s - %(levelname)s - %(message)s', level=logging.INFO)
+
+
+def get_flags():
+    """Get command flags.
+
+    :return: flags
+    :rtype: argparse.ArgumentParser
+    """
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--calib',
+                        help='Path to the camera parameters folder.',
+                        default='../data/Calib/',
+                        type=str)
+    parser.add_argument('--videos',
+                        help='Path to the folder of sub videos.',
+                        default='../data/output/',
+                        type=str)
+    parser.add_argument('--motion_captures',
+                        help='Path to the folder of motion capture files (.npz).',
+                        default='../data/output/',
+                        type=str)
+    parser.add_argument('--output',
+                        help='Path to the folder of overlay videos.',
+                        default='../data/output/overlays/',
+                        type=str)
+    parser.add_argument('--subject',
+                        help='Subject\'s number, all subjects by default.',
+                        type=int)
+    parser.add_argument('--move',
+                        help='Move\'s number, all moves by default.',
+                        type=int)
+    parser.add_argument('--cameras',
+                        help='Cameras (e.g., PG1 PG2), all calibrated cameras by default.',
+                        nargs='+',
+                        type=str)
+    parser.add_argument('--overlay_quality',
+                        help='Overlay drawing: fast (NumPy sprites) or quality (anti-aliased).',
+                        default='fast',
+                        choices=QUALITY_MODES,
+                        type=str)
+    parser.add_argument('--resampling',
+                        help='Interpolation of motion capture frames at the real frame rate of the videos.',
+                        default='linear',
+                        choices=INTERPOLATION_METHODS,
+                        type=str)
+    parser.add_argument('--workers',
+                        help='Number of processes which render videos.',
+                        default=os.cpu_count(),
+                        type=int)
+    parser.add_argument('--profile_report',
+                        help='Path to the JSON report of stage timings, throughputs and peak memory.',
+                        type=str)
+    parser.add_argument('--cprofile',
+                        help='Path to the cProfile dump (pstats) of the main process.',
+                        type=str)
+    return parser
+
+
+def get_render_jobs(catalog, output_path, subject=None, move=None, cameras=None, overlay_quality='fast',
+                    method='linear'):
+    """Project joints of the moves into all their camera views and create render jobs.
+
+    Joints of a move are projected into every camera in one pass. Jobs are generated lazily,
+    so projected points of the whole dataset are never held in memory at once.
+
+    :param catalog: catalog of sub videos, motion capture files and camera's params
+    :type catalog: DatasetCatalog
+    :param output_path: path of the output directory
+    :type output_path: str
+    :param subject: subject's number, all subjects by default
+    :type subject: int
+    :param move: move's number, all moves by default
+    :type move: int
+    :param cameras: cameras, all calibrated cameras by default
+    :type cameras: list of str
+    :param overlay_quality: 'fast' or 'quality'
+    :type overlay_quality: str
+    :param method: resampling of motion capture frames (see utils.get_joints_for_video)
+    :type method: str
+    :return: generator of (video path, image points, output video path, overlay renderer)
+    :rtype: generator of tuple
+    """
+    cameras = catalog.get_cameras() if cameras is None else cameras
+    camera_params = {
+        camera: utils.read_camera_params(
+            catalog.get('extrinsics', camera=camera)[0],
+            catalog.get('camera_params', camera=camera)[0],
+            compact=True
+        )
+        for camera in cameras
+    }
+
+    conditions = {'kind': 'motion_capture'}
+    if subject is not None:
+        conditions['subject'] = subject
+    if move is not None:
+        conditions['move'] = move
+
+    for entry in sorted(catalog.query(**conditions), key=lambda e: (e.subject, e.move)):
+        views = []
+        for camera in cameras:
+            video_paths = catalog.get('video', entry.subject, camera, entry.move)
+            if len(video_paths) > 0:
+                views.append((camera, video_paths[0]))
+
+        if len(views) == 0:
+            logging.warning('No videos found for ' + entry.path)
+            continue
+
+        with profiling.stage('loading'):
+            motion_capture = utils.read_motion_capture_data(entry.path)
+        with profiling.stage('projection'):
+            # Camera views of a move are recorded synchronously, they share the frame rate
+            fps = utils.get_video_fps(views[0][1])
+            markers = utils.get_joints_for_video(motion_capture, fps, method)
+            image_points = projection.project_points(markers, [camera_params[camera] for camera, _ in views], dtype=int)
+        renderer = OverlayRenderer(motion_capture.skeleton, overlay_quality)
+
+        for idx, (camera, video_path) in enumerate(views):
+            output_video_path = os.path.join(output_path, Path(video_path).stem + '_overlay.avi')
+            yield video_path, image_points[idx], output_video_path, renderer
+
+
+def render_videos(jobs, workers=1):
+    """Render overlay videos in parallel. Every input video is decoded once.
+
+    :param jobs: iterable of (video path, image points, output video path, overlay renderer)
+    :type jobs: iterable of tuple
+    :param workers: number of processes
+    :type workers: int
+    :return: number of rendered and failed videos
+    :rtype: tuple of int
+    """
+    workers = max(workers, 1)
+    rendered_num = 0
+    failed_num = 0
+
+    def collect(done_futures):
+        nonlocal rendered_num, failed_num
+        for future in done_futures:
+            video_path = futures.pop(future)
+            try:
+                _, snapshot = future.result()
+                profiling.PROFILER.merge(snapshot)
+                logging.info('Rendered: ' + video_path)
+                rendered_num = rendered_num + 1
+            except Exception:
+                logging.exception('Rendering of {} failed.'.format(video_path))
+                failed_num = failed_num + 1
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = {}
+        for video_path, image_points, output_video_path, renderer in jobs:
+            future = executor.submit(
+                profiling.run_profiled,
+                render_video,
+                video_path,
+                image_points,
+                output_video_path,
+                False,
+                renderer
+            )
+            futures[future] = video_path
+
+            # Only a few jobs are queued, so their points don't pile up in memory
+            if len(futures) >= 2 * workers:
+                collect(wait(futures, return_when=FIRST_COMPLETED).done)
+        collect(wait(futures).done)
+    return rendered_num, failed_num
+
+
+if __name__ == '__main__':
+    args = get_flags().parse_args()
+
+    os.makedirs(args.output, exist_ok=True)
+    dataset_catalog = DatasetCatalog([args.videos, args.motion_captures, args.calib])
+    render_jobs = get_render_jobs(
+        dataset_catalog,
+        args.output,
+        args.subject,
+        args.move,
+        args.cameras,
+        args.overlay_quality,
+        args.resampling
+    )
+    with profiling.profile_run(args.profile_report, args.cprofile):
+        rendered_videos_num, failed_videos_num = render_videos(render_jobs, args.workers)
+    if failed_videos_num > 0:
+        logging.warning('{} video(s) couldn\'t be rendered.'.format(failed_videos_num))
+    logging.info('Finished rendering {} video(s).'.format(rendered_videos_num))
@@ -0,0 +1,106 @@
+import cv2
+import numpy as np
+from common.skeleton import get_bone_pairs
+
+QUALITY_MODES = ('fast', 'quality')
+
+
+def get_disk_offsets(radius):
+    """Get pixel offsets of a filled disk.
+
+    :param radius: radius of the disk
+    :type radius: int
+    :return: offsets (pixels, 2) - [x, y]
+    :rtype: np.ndarray
+    """
+    y, x = np.mgrid[-radius:radius + 1, -radius:radius + 1]
+    mask = x * x + y * y <= radius * radius + radius
+    return np.stack((x[mask], y[mask]), axis=1)
+
+
+class OverlayRenderer:
+    """
+    Draws joints and bones of a frame.
+
+    Bones are drawn with a single polylines call. 'fast' mode rasterizes all joints at once
+    with a precomputed disk sprite (NumPy) and draws bones without anti-aliasing, 'quality' mode
+    draws everything anti-aliased with OpenCV.
+
+    :param skeleton: skeleton (synonym jointsParent), bones aren't drawn if it isn't set
+    :type skeleton: np.ndarray
+    :param quality: 'fast' or 'quality'
+    :type quality: str
+    :param joint_radius: radius of joints
+    :type joint_radius: int
+    :param joint_color: BGR color of joints
+    :type joint_color: tuple of int
+    :param bone_thickness: thickness of bones
+    :type bone_thickness: int
+    :param bone_color: BGR color of bones
+    :type bone_color: tuple of int
+    """
+
+    def __init__(self, skeleton=None, quality='fast', joint_radius=2, joint_color=(124, 252, 0),
+                 bone_thickness=1, bone_color=(0, 215, 255)):
+        assert quality in QUALITY_MODES, 'Quality should be one of {}.'.format(QUALITY_MODES)
+        self.bone_pairs = get_bone_pairs(skeleton) if skeleton is not None else np.zeros((0, 2), dtype=int)
+        self.quality = quality
+        self.joint_radius = joint_radius
+        self.joint_color = np.array(joint_color, dtype=np.uint8)
+        self.bone_thickness = bone_thickness
+        self.bone_color = tuple(int(c) for c in bone_color)
+        self.disk_offsets = get_disk_offsets(joint_radius)
+
+    def draw_bones(self, frame, frame_points):
+        """Draw all bones with a single call.
+
+        :param frame: BGR frame
+        :type frame: np.ndarray
+        :param frame_points: joints on the image plane (joints, 2)
+        :type frame_points: np.ndarray
+        :return: frame with bones
+        :rtype: np.ndarray
+        """
+        if self.bone_pairs.shape[0] == 0:
+            return frame
+
+        segments = np.ascontiguousarray(frame_points[self.bone_pairs], dtype=np.int32)
+        line_type = cv2.LINE_AA if self.quality == 'quality' else cv2.LINE_8
+        return cv2.polylines(frame, list(segments), False, self.bone_color, self.bone_thickness, line_type)
+
+    def draw_joints(self, frame, frame_points):
+        """Draw all joints.
+
+        :param frame: BGR frame
+        :type frame: np.ndarray
+        :param frame_points: joints on the image plane (joints, 2)
+        :type frame_points: np.ndarray
+        :return: frame with joints
+        :rtype: np.ndarray
+        """
+        if self.quality == 'quality':
+            # Anti-aliased circles are cheaper than a single polylines call with thick zero length segments
+            color = tuple(int(c) for c in self.joint_color)
+            for x, y in np.asarray(frame_points, dtype=int):
+                cv2.circle(frame, (int(x), int(y)), self.joint_radius, color, -1, cv2.LINE_AA)
+            return frame
+
+        pixels = (np.asarray(frame_points, dtype=int)[:, np.newaxis, :] + self.disk_offsets).reshape(-1, 2)
+        height, width = frame.shape[:2]
+        inside = (pixels[:, 0] >= 0) & (pixels[:, 0] < width) & (pixels[:, 1] >= 0) & (pixels[:, 1] < height)
+        pixels = pixels[inside]
+        frame[pixels[:, 1], pixels[:, 0]] = self.joint_color
+        return frame
+
+    def draw(self, frame, frame_points):
+        """Draw bones and joints of a frame.
+
+        :param frame: BGR frame
+        :type frame: np.ndarray
+        :param frame_points: joints on the image plane (joints, 2)
+        :type frame_points: np.ndarray
+        :return: frame with the overlay
+        :rtype: np.ndarray
+        """
+        frame = self.draw_bones(frame, frame_points)
+        return self.draw_joints(frame, frame_points)
@@ -1,17 +1,24 @@
 # import sys
 # sys.path.append("..")
+import logging
 import argparse
 import cv2
-import imageio
 import numpy as np
 import matplotlib.pyplot as plt
+from common import profiling
 from common import utils
+from common.frame_source import FrameSource
+from common.pipeline import DEFAULT_QUEUE_SIZE, FramePipeline
+from common.projection_cache import DEFAULT_CACHE_DIR, ProjectionCache
 from common.camera import Camera
-from common.motion_capture import MotionCapture
+from common.motion_capture import INTERPOLATION_METHODS, MotionCapture
 from matplotlib.animation import FuncAnimation
+from data_player.overlay import QUALITY_MODES, OverlayRenderer
 from data_player.visualizer.motion_capture_visualizer import MotionCaptureVisualizer
 from data_player.visualizer.pose_3d_visualizer import Pose3DVisualizer
 
+logging.basicConfig(format='%(asctime)s - %(levelname)s - %(message)s', level=logging.INFO)
+
 
 def get_flags():
     """Get command flags.
@@ -39,50 +46,124 @@ def get_flags():
     parser.add_argument('--output_video_file',
                         help='Path to the output video file (e.g., ../output/output.avi).',
                         type=str)
+    parser.add_argument('--overlay_quality',
+                        help='Overlay drawing: fast (NumPy sprites) or quality (anti-aliased).',
+                        default='quality',
+                        choices=QUALITY_MODES,
+                        type=str)
+    parser.add_argument('--resampling',
+                        help='Interpolation of motion capture frames at the real frame rate of the video.',
+                        default='linear',
+                        choices=INTERPOLATION_METHODS,
+                        type=str)
+    parser.add_argument('--queue_size',
+                        help='Maximum number of frames waiting for drawing and for encoding.',
+                        default=DEFAULT_QUEUE_SIZE,
+                        type=int)
+    parser.add_argument('--cache_dir',
+                        help='Path to the directory of cached projected points.',
+                        default=DEFAULT_CACHE_DIR,
+                        type=str)
+    parser.add_argument('--no_cache',
+                        help='Don\'t cache projected points on the disk.',
+                        action='store_true')
+    parser.add_argument('--profile_report',
+                        help='Path to the JSON report of stage timings, throughputs and peak memory.',
+                        type=str)
+    parser.add_argument('--cprofile',
+                        help='Path to the cProfile dump (pstats).',
+                        type=str)
     return parser
 
 
-def display_window(video_file_path, image_points):
-    """Display the player and run a video.
+def render_video(video_file_path, image_points, output_video_file_path=None, display=True, renderer=None,
+                 queue_size=DEFAULT_QUEUE_SIZE):
+    """Draw points on a video, display it and/or save it. The video is decoded once.
+
+    Frames are read through FrameSource (decoded ahead by its thread) and encoded by a separate thread,
+    drawing and displaying run in this thread (see FramePipeline).
 
     :param video_file_path: path to the video file
     :type video_file_path: str
     :param image_points: points for painting
     :type image_points: np.ndarray
+    :param output_video_file_path: path to the output video file, optional
+    :type output_video_file_path: str
+    :param display: display the player
+    :type display: bool
+    :param renderer: overlay renderer, joints only by default
+    :type renderer: OverlayRenderer
+    :param queue_size: maximum number of frames waiting for drawing and for encoding
+    :type queue_size: int
     """
-    cap = cv2.VideoCapture(video_file_path)
+    renderer = OverlayRenderer() if renderer is None else renderer
+    # Frames are read once in order, so no recently shown frames are kept (they are drawn on in place)
+    frame_source = FrameSource(video_file_path, prefetch=queue_size, cache_size=0)
+
+    video = None
+    if output_video_file_path:
+        fourcc = cv2.VideoWriter_fourcc(*'XVID')
+        video = cv2.VideoWriter(output_video_file_path, fourcc, frame_source.fps, frame_source.size)
+
+    def read_frames():
+        for frame_num in range(image_points.shape[0]):
+            try:
+                yield frame_source.get_data(frame_num)
+            except IndexError:
+                return
+
     current_frame_num = 0
-    while cap.isOpened():
-        ret, frame = cap.read()
-
-        if ret:
-            frame_points = image_points[current_frame_num]
-            for idx, val in enumerate(frame_points):
-                frame = cv2.circle(
-                    frame,
-                    (val[0], val[1]),
-                    radius=2,
-                    color=(124, 252, 0),
-                    lineType=cv2.LINE_AA,
-                    thickness=-1
-                )
 
-            # Display the resulting frame
-            cv2.imshow('Motion Capture', frame)
+    def process(frame):
+        nonlocal current_frame_num, display
+        with profiling.stage('draw', 1):
+            frame = renderer.draw(frame, image_points[current_frame_num])
+        current_frame_num = current_frame_num + 1
 
-            current_frame_num = current_frame_num + 1
+        if display:
+            # Display the resulting frame
+            with profiling.stage('display', 1):
+                cv2.imshow('Motion Capture', frame)
+                key = cv2.waitKey(10)
 
             # Close program by using key
-            if cv2.waitKey(10) & 0xFF == ord('q'):
-                break
-        else:
-            break
+            if key & 0xFF == ord('q'):
+                display = False
+                cv2.destroyAllWindows()
+                if video is None:
+                    pipeline.stop()
+        return frame
+
+    pipeline = FramePipeline(read_frames(), process, video.write if video is not None else None, queue_size)
+    try:
+        pipeline.run()
+    finally:
+        frame_source.close()
+        logging.info('Busy ratios of stages: ' + ', '.join(
+            '{} {:.2f}'.format(name, ratio) for name, ratio in pipeline.get_busy_ratios().items()
+        ))
+        if video is not None:
+            video.release()
+        if display:
+            cv2.destroyAllWindows()
+
+
+def display_window(video_file_path, image_points, renderer=None, queue_size=DEFAULT_QUEUE_SIZE):
+    """Display the player and run a video.
 
-    cap.release()
-    cv2.destroyAllWindows()
+    :param video_file_path: path to the video file
+    :type video_file_path: str
+    :param image_points: points for painting
+    :type image_points: np.ndarray
+    :param renderer: overlay renderer, optional
+    :type renderer: OverlayRenderer
+    :param queue_size: maximum number of frames waiting for drawing
+    :type queue_size: int
+    """
+    render_video(video_file_path, image_points, renderer=renderer, queue_size=queue_size)
 
 
-def save_video(output_video_file_path, video_file_path, image_points):
+def save_video(output_video_file_path, video_file_path, image_points, renderer=None, queue_size=DEFAULT_QUEUE_SIZE):
     """Save results into a video file.
 
     :param output_video_file_path: path to the output video file
@@ -91,37 +172,14 @@ def save_video(output_video_file_path, video_file_path, image_points):
     :type video_file_path: str
     :param image_points: points for painting
     :type image_points: np.ndarray
+    :param renderer: overlay renderer, optional
+    :type renderer: OverlayRenderer
+    :param queue_size: maximum number of frames waiting for drawing and for encoding
+    :type queue_size: int
     """
-    cap = cv2.VideoCapture(video_file_path)
-
-    width = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH))
-    height = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
-    fps = cap.get(cv2.CAP_PROP_FPS)
-    fourcc = cv2.VideoWriter_fourcc(*'XVID')
-    video = cv2.VideoWriter(output_video_file_path, fourcc, fps, (width, height))
-
-    current_frame_num = 0
-    while cap.isOpened():
-        ret, frame = cap.read()
-
-        if ret:
-            frame_points = image_points[current_frame_num]
-            for idx, val in enumerate(frame_points):
-                frame = cv2.circle(
-                    frame,
-                    (val[0], val[1]),
-                    radius=2,
-                    color=(124, 252, 0),
-                    lineType=cv2.LINE_AA,
-                    thickness=-1
-                )
-            video.write(frame)
-            current_frame_num = current_frame_num + 1
-        else:
-            break
-
-    cap.release()
-    video.release()
+    render_video(
+        video_file_path, image_points, output_video_file_path, display=False, renderer=renderer, queue_size=queue_size
+    )
 
 
 def run_opencv_player(camera, motion_capture, video_file_path, **kwargs):
@@ -134,16 +192,23 @@ def run_opencv_player(camera, motion_capture, video_file_path, **kwargs):
     :param video_file_path: path to the video file
     :type video_file_path: str
     :key output_video_file_path: path to the video file, optional
+    :key image_points: already projected points, optional
+    :key overlay_quality: 'fast' or 'quality', optional
+    :key method: resampling of motion capture frames at the real frame rate of the video, optional
+    :key queue_size: maximum number of frames waiting for drawing and for encoding, optional
     """
-    image_points = utils.adapt_motion_data_for_video(motion_capture, camera)
-    display_window(video_file_path, image_points)
-
+    image_points = kwargs.get('image_points', None)
+    if image_points is None:
+        fps = utils.get_video_fps(video_file_path)
+        method = kwargs.get('method', 'linear')
+        image_points = utils.adapt_motion_data_for_video(motion_capture, camera, fps, method=method)
+    renderer = OverlayRenderer(motion_capture.skeleton, kwargs.get('overlay_quality', 'quality'))
     output_video_file_path = kwargs.get('output_video_file_path', None)
-    if output_video_file_path:
-        save_video(output_video_file_path, video_file_path, image_points)
+    queue_size = kwargs.get('queue_size', DEFAULT_QUEUE_SIZE)
+    render_video(video_file_path, image_points, output_video_file_path, renderer=renderer, queue_size=queue_size)
 
 
-def run_3d_player(motion_capture, video_file_path, camera):
+def run_3d_player(motion_capture, video_file_path, camera, image_points=None, method='linear'):
     """Show motion capture date in a 3d plot.
 
     :param motion_capture: motion capture data
@@ -152,43 +217,68 @@ def run_3d_player(motion_capture, video_file_path, camera):
     :type video_file_path: str
     :param camera: camara params
     :type camera: Camera
+    :param image_points: already projected points, optional
+    :type image_points: np.ndarray
+    :param method: resampling of motion capture frames at the real frame rate of the video
+        (see MotionCapture.resample), every n-th frame is taken if None
+    :type method: str
     """
     fig = plt.figure()
     ax1 = fig.add_subplot(2, 1, 1)
-    video = imageio.get_reader(video_file_path, 'ffmpeg')
-    motion_capture_visualizer = MotionCaptureVisualizer(fig, ax1, motion_capture, video, camera)
+    video = FrameSource(video_file_path, rgb=True)
+    fps = video.fps
+    motion_capture_visualizer = MotionCaptureVisualizer(
+        fig, ax1, motion_capture, video, camera, image_points, fps=fps, method=method
+    )
 
     ax2 = fig.add_subplot(2, 1, 2, projection='3d')
-    pose_visualizer = Pose3DVisualizer(fig, ax2, motion_capture)
+    pose_visualizer = Pose3DVisualizer(fig, ax2, motion_capture, show_fps=False, fps=fps, method=method)
 
-    fps = 30
+    def init():
+        return motion_capture_visualizer.init() + pose_visualizer.init()
 
     def update(frame):
-        motion_capture_visualizer.update(frame)
-        pose_visualizer.update(frame)
+        with profiling.stage('visualizer_update', 1):
+            return motion_capture_visualizer.update(frame) + pose_visualizer.update(frame)
 
-    frames = np.arange(0, motion_capture.get_joints_reduced_by_fps(fps).shape[0])
-    interval = motion_capture.joints.shape[0] / fps
+    frames_num = min(motion_capture_visualizer.image_points.shape[0], pose_visualizer.joints.shape[0], len(video))
+    frames = np.arange(0, frames_num)
+    interval = 1000 / fps
 
     anim = FuncAnimation(
         fig,
         update,
         frames=frames,
+        init_func=init,
         interval=interval,
         repeat=True,
+        blit=True,
     )
     plt.show(block=True)
+    video.close()
 
 
 if __name__ == '__main__':
     args = get_flags().parse_args()
 
-    camera_params = utils.read_camera_params(args.extrinsic_data, args.camera_data)
-    motion_capture_data = utils.read_motion_capture_data(args.motion_capture_data)
-    run_3d_player(motion_capture_data, args.video_file, camera_params)
-    run_opencv_player(
-        camera_params,
-        motion_capture_data,
-        args.video_file,
-        output_video_file_path=args.output_video_file
-    )
+    with profiling.profile_run(args.profile_report, args.cprofile):
+        with profiling.stage('loading'):
+            camera_params = utils.read_camera_params(args.extrinsic_data, args.camera_data)
+            motion_capture_data = utils.read_motion_capture_data(args.motion_capture_data)
+        with profiling.stage('projection'):
+            projection_cache = ProjectionCache(None if args.no_cache else args.cache_dir)
+            projected_points = projection_cache.get(
+                args.motion_capture_data, args.extrinsic_data, args.camera_data, utils.get_video_fps(args.video_file),
+                args.resampling
+            )
+        run_3d_player(motion_capture_data, args.video_file, camera_params, projected_points, args.resampling)
+        run_opencv_player(
+            camera_params,
+            motion_capture_data,
+            args.video_file,
+            output_video_file_path=args.output_video_file,
+            image_points=projected_points,
+            overlay_quality=args.overlay_quality,
+            method=args.resampling,
+            queue_size=args.queue_size
+        )
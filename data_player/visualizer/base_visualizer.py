@@ -4,7 +4,20 @@ from abc import ABC, abstractmethod
 class BaseVisualizer(ABC):
     """
     Base class for visualizers.
+
+    Artists are created once in init and update only changes their data,
+    so animations can use blitting.
     """
+    @abstractmethod
+    def init(self):
+        """
+        Create artists of the animation.
+
+        :return: artists which are animated
+        :rtype: list of matplotlib.artist.Artist
+        """
+        pass
+
     @abstractmethod
     def update(self, frame):
         """
@@ -12,6 +25,8 @@ class BaseVisualizer(ABC):
 
         :param frame: frame number
         :type frame: int
+        :return: artists which were changed
+        :rtype: list of matplotlib.artist.Artist
         """
         pass
 
@@ -0,0 +1,29 @@
+import time
+
+
+class FpsCounter:
+    """
+    Measures frames per second of the playback (exponential moving average).
+
+    :param smoothing: weight of the latest frame, between 0 and 1
+    :type smoothing: float
+    """
+
+    def __init__(self, smoothing=0.1):
+        self.smoothing = smoothing
+        self.last_time = None
+        self.fps = 0.
+
+    def tick(self):
+        """
+        Register a shown frame.
+
+        :return: measured frames per second
+        :rtype: float
+        """
+        now = time.perf_counter()
+        if self.last_time is not None and now > self.last_time:
+            current_fps = 1. / (now - self.last_time)
+            self.fps = current_fps if self.fps == 0 else self.fps + self.smoothing * (current_fps - self.fps)
+        self.last_time = now
+        return self.fps
@@ -2,6 +2,7 @@ import numpy as np
 from matplotlib.animation import FuncAnimation
 from common import utils
 from .base_visualizer import BaseVisualizer
+from .fps_counter import FpsCounter
 
 
 class MotionCaptureVisualizer(BaseVisualizer):
@@ -15,21 +16,68 @@ class MotionCaptureVisualizer(BaseVisualizer):
     :type ax: matplotlib.axes._subplots.AxesSubplot
     :param motion_capture: motion capture data
     :type motion_capture: MotionCapture
-    :param video: video
-    :type video: imageio.plugins.ffmpeg.FfmpegFormat.Reader
+    :param video: video (anything with get_data(frame), e.g. FrameSource or imageio reader)
+    :type video: common.frame_source.FrameSource
     :param camera: camera params
     :type camera: Camera
+    :param image_points: already projected points, optional
+    :type image_points: np.ndarray
+    :param show_fps: show measured frames per second
+    :type show_fps: bool
+    :param fps: frames per second of the video
+    :type fps: float
+    :param method: resampling of motion capture frames (see utils.adapt_motion_data_for_video), optional
+    :type method: str
     """
 
-    def __init__(self, fig, ax, motion_capture, video, camera):
+    def __init__(self, fig, ax, motion_capture, video, camera, image_points=None, show_fps=True, fps=30,
+                 method=None):
         self.fig = fig
         self.ax = ax
-        self.image_points = utils.adapt_motion_data_for_video(
-            motion_capture,
-            camera
-        )
+        if image_points is None:
+            image_points = utils.adapt_motion_data_for_video(
+                motion_capture,
+                camera,
+                fps,
+                method=method
+            )
+        self.image_points = image_points
         self.video = video
         self.camera = camera
+        self.show_fps = show_fps
+        self.fps_counter = FpsCounter()
+        self.image = None
+        self.scatter = None
+        self.fps_text = None
+
+    def init(self):
+        """
+        Create artists of the animation.
+
+        :return: artists which are animated
+        :rtype: list of matplotlib.artist.Artist
+        """
+        if self.image is None:
+            self.image = self.ax.imshow(self.video.get_data(0), animated=True)
+            self.scatter = self.ax.scatter(
+                self.image_points[0, :, 0],
+                self.image_points[0, :, 1],
+                marker='o',
+                label='first',
+                s=20.,
+                c='r',
+                animated=True
+            )
+            self.fps_text = self.ax.text(
+                0.01,
+                0.99,
+                '',
+                transform=self.ax.transAxes,
+                va='top',
+                color='w',
+                animated=True
+            )
+        return [self.image, self.scatter, self.fps_text]
 
     def update(self, frame):
         """
@@ -37,16 +85,19 @@ class MotionCaptureVisualizer(BaseVisualizer):
 
         :param frame: frame number
         :type frame: int
+        :return: artists which were changed
+        :rtype: list of matplotlib.artist.Artist
         """
-        self.ax.clear()
-        image = self.video.get_data(frame)
-        self.ax.imshow(image)
+        if self.image is None:
+            self.init()
 
-        image_points = self.image_points[frame]
-        x_2d = image_points[:, 0]
-        y_2d = image_points[:, 1]
+        self.image.set_data(self.video.get_data(frame))
+        self.scatter.set_offsets(self.image_points[frame])
 
-        self.ax.scatter(x_2d, y_2d, marker='o', label='first', s=20., c='r')
+        fps = self.fps_counter.tick()
+        if self.show_fps:
+            self.fps_text.set_text('{:.1f} fps'.format(fps))
+        return [self.image, self.scatter, self.fps_text]
 
     def get_animation(self, fps=30):
         """
@@ -58,13 +109,15 @@ class MotionCaptureVisualizer(BaseVisualizer):
         :rtype: matplotlib.animation.FuncAnimation
         """
         frames = np.arange(0, self.image_points.shape[0])
-        interval = self.image_points.shape[0] / fps
+        interval = 1000 / fps
 
         anim = FuncAnimation(
             self.fig,
             self.update,
             frames=frames,
+            init_func=self.init,
             interval=interval,
             repeat=False,
+            blit=True,
         )
         return anim
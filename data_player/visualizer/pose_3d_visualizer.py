@@ -1,6 +1,9 @@
 import numpy as np
 from matplotlib.animation import FuncAnimation
+from mpl_toolkits.mplot3d.art3d import Line3DCollection
+from common import utils
 from .base_visualizer import BaseVisualizer
+from .fps_counter import FpsCounter
 
 
 class Pose3DVisualizer(BaseVisualizer):
@@ -8,19 +11,52 @@ class Pose3DVisualizer(BaseVisualizer):
     Class which helps to visualize motion capture
     pose in 3D space (matplotlib).
 
+    The pose is shown relative to its root joint, so axes limits stay the same
+    for the whole sequence and the animation can use blitting.
+
     :param fig: matplotlib figure
     :type fig: matplotlib.figure.Figure
     :param ax: matplotlib 3D axes
     :type ax: matplotlib.axes._subplots.Axes3DSubplot
     :param motion_capture: motion capture data
     :type motion_capture: MotionCapture
+    :param show_fps: show measured frames per second
+    :type show_fps: bool
+    :param fps: frames per second of the video
+    :type fps: float
+    :param method: resampling of motion capture frames (see utils.get_joints_for_video), optional
+    :type method: str
     """
 
-    def __init__(self, fig, ax, motion_capture):
+    def __init__(self, fig, ax, motion_capture, show_fps=True, fps=30, method=None):
         self.fig = fig
         self.ax = ax
-        self.joints = motion_capture.get_joints_reduced_by_fps(30)
-        self.skeleton = motion_capture.skeleton
+        joints = utils.get_joints_for_video(motion_capture, fps, method)
+        self.skeleton = motion_capture.get_skeleton()
+        self.joints = self.skeleton.get_root_relative(joints)
+        self.bone_pairs = self.skeleton.bone_pairs
+        self.root = 1 if np.max(joints[0, 0, :].astype(int)) <= 10 else 1000
+        self.show_fps = show_fps
+        self.fps_counter = FpsCounter()
+        self.bones = None
+        self.fps_text = None
+
+    def init(self):
+        """
+        Create artists of the animation.
+
+        :return: artists which are animated
+        :rtype: list of matplotlib.artist.Artist
+        """
+        if self.bones is None:
+            self.bones = Line3DCollection(self.joints[0][self.bone_pairs], colors='green', animated=True)
+            self.ax.add_collection3d(self.bones)
+            self.fps_text = self.ax.text2D(0.01, 0.99, '', transform=self.ax.transAxes, va='top', animated=True)
+
+            self.ax.set_xlim3d([-self.root, self.root])
+            self.ax.set_ylim3d([-self.root, self.root])
+            self.ax.set_zlim3d([-self.root, self.root])
+        return [self.bones, self.fps_text]
 
     def update(self, frame):
         """
@@ -28,28 +64,20 @@ class Pose3DVisualizer(BaseVisualizer):
 
         :param frame: frame number
         :type frame: int
+        :return: artists which were changed
+        :rtype: list of matplotlib.artist.Artist
         """
-        self.ax.clear()
-        joints = self.joints[frame]
-
-        for idx, val in enumerate(self.skeleton):
-            if idx == 0:
-                continue
-            x_line = [joints[val - 1, 0], joints[idx, 0]]
-            y_line = [joints[val - 1, 1], joints[idx, 1]]
-            z_line = [joints[val - 1, 2], joints[idx, 2]]
-            self.ax.plot3D(x_line, y_line, z_line, 'green')
-
-        x = joints[:, 0].astype(int)
-        y = joints[:, 1].astype(int)
-        z = joints[:, 2].astype(int)
+        if self.bones is None:
+            self.init()
 
-        root = 1 if np.max([x[0], y[0], z[0]]) <= 10 else 1000
-        x_root, y_root, z_root = x[0], y[0], z[0]
+        self.bones.set_segments(self.joints[frame][self.bone_pairs])
+        # set_segments clears the projected segments and blitting draws the artist without projecting it
+        self.bones.do_3d_projection()
 
-        self.ax.set_xlim3d([-root + x_root, root + x_root])
-        self.ax.set_zlim3d([-root + z_root, root + z_root])
-        self.ax.set_ylim3d([-root + y_root, root + y_root])
+        fps = self.fps_counter.tick()
+        if self.show_fps:
+            self.fps_text.set_text('{:.1f} fps'.format(fps))
+        return [self.bones, self.fps_text]
 
     def get_animation(self, fps=30):
         """
@@ -61,13 +89,15 @@ class Pose3DVisualizer(BaseVisualizer):
         :rtype: matplotlib.animation.FuncAnimation
         """
         frames = np.arange(0, self.joints.shape[0])
-        interval = self.joints.shape[0] / fps
+        interval = 1000 / fps
 
         anim = FuncAnimation(
             self.fig,
             self.update,
             frames=frames,
+            init_func=self.init,
             interval=interval,
             repeat=False,
+            blit=True,
         )
         return anim